@@ -1,6 +1,10 @@
 import os
+import sys
 import statistics
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from collection_manifest import load_collection_manifest
+
 def sortLongest(my_dict):
     dict_lengths = {key: len(value) for key, value in my_dict.items()}
     sorted_keys = sorted(dict_lengths, key=lambda k: dict_lengths[k], reverse=True)
@@ -9,21 +13,11 @@ def sortLongest(my_dict):
 
 def getSushiFiles(dir):
     fullCollection = {}
-    print("Starting walk of", dir)
+    print("Loading collection manifest of", dir)
     try:
-        for box in os.listdir(dir):
-            box_path = os.path.join(dir, box)
-            if not os.path.isdir(box_path): continue
-            
-            fullCollection[box] = {}
-            for folder in os.listdir(box_path):
-                folder_path = os.path.join(box_path, folder)
-                if not os.path.isdir(folder_path): continue
-                
-                fullCollection[box][folder] = []
-                for file in os.listdir(folder_path):
-                    fullCollection[box][folder].append(file)
-                    
+        # The manifest is only rebuilt (walking the directory tree) when the collection changed
+        fullCollection = load_collection_manifest(dir).collection(sort_folders=False)
+
         for box in fullCollection:
             fullCollection[box] = sortLongest(fullCollection[box])
             
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_loader import sample_training_documents
+from collection_manifest import CollectionManifest, MANIFEST_FILENAME
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, 'data', MANIFEST_FILENAME)
+RG_DISTRIBUTION_PATH = os.path.join(PROJECT_ROOT, 'src', 'RGdistribution.xlsx')
+
+# Size of the current collection (used when no manifest is available)
+NUM_BOXES = 126
+NUM_FOLDERS = 1336
+NUM_DOCS = 31684
+
+SCALES = [1, 10, 100]
+SEEDS = [1, 42, 100]
+
+def base_collection():
+    """
+    Returns the real collection listing (from the manifest) or a synthetic one of the same size.
+    """
+    manifest = CollectionManifest.load(MANIFEST_PATH)
+    if manifest is not None:
+        return manifest.collection(sort_folders=True)
+
+    rng = random.Random(0)
+    folder_boxes = [rng.randrange(NUM_BOXES) for _ in range(NUM_FOLDERS)]
+    doc_folders = [rng.randrange(NUM_FOLDERS) for _ in range(NUM_DOCS)]
+
+    folders = {}
+    for doc, folder in enumerate(doc_folders):
+        folders.setdefault(folder, []).append(f"S{doc:06d}.pdf")
+
+    collection = {}
+    for folder, box in enumerate(folder_boxes):
+        if folder in folders:
+            collection.setdefault(f"B{box:04d}", {})[f"N{folder:08d}"] = folders[folder]
+    for box in collection:
+        collection[box] = dict(sorted(collection[box].items(), key=lambda item: len(item[1]), reverse=True))
+    return collection
+
+def scale_collection(collection, scale):
+    """
+    Replicates every box `scale` times (with distinct box, folder and file names).
+    """
+    scaled = {}
+    for copy in range(scale):
+        for box, folders in collection.items():
+            scaled[f"{box}-{copy}"] = {
+                f"{folder}-{copy}": [f"{copy}-{doc}" for doc in docs]
+                for folder, docs in folders.items()
+            }
+    return scaled
+
+def uneven_targets():
+    """
+    Per-box sampling targets of the 'uneven' strategy (RGdistribution.xlsx, or a similar long-tailed list).
+    """
+    if os.path.exists(RG_DISTRIBUTION_PATH):
+        import pandas as pd
+        return pd.read_excel(RG_DISTRIBUTION_PATH)["Samples/Box"].dropna().astype(int).tolist()[:-1]
+    return [44, 41, 40, 37, 32, 30, 29, 28, 26, 25, 25, 19, 15, 14, 12, 11, 9, 8, 8, 8, 7, 6, 6] + [4] * 6 + [3] * 8 + [2] * 13 + [1] * 76
+
+def main():
+    parser = argparse.ArgumentParser(description="Times ECF sampling (DataLoader.create_random_ecf) on collections 1x, 10x and 100x the current size.")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--docs-per-box', type=int, default=5)
+    args = parser.parse_args()
+
+    collection = base_collection()
+    targets = uneven_targets()
+
+    print(f"{'scale':>6} {'boxes':>7} {'docs':>9} {'sampling':>9} {'sampled':>8} {'median s':>9}")
+    for scale in args.scales:
+        scaled = scale_collection(collection, scale)
+        num_docs = sum(len(docs) for folders in scaled.values() for docs in folders.values())
+
+        for sampling in ['uniform', 'uneven']:
+            timings = []
+            for seed in SEEDS:
+                start = time.perf_counter()
+                training_set = sample_training_documents(scaled, random.Random(seed), sampling,
+                                                         docs_per_box=args.docs_per_box,
+                                                         uneven_targets=targets * scale)
+                timings.append(time.perf_counter() - start)
+            print(f"{scale:>6} {len(scaled):>7} {num_docs:>9} {sampling:>9} {len(training_set):>8} {statistics.median(timings):>9.4f}")
+
+if __name__ == '__main__':
+    main()
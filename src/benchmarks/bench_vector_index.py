@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from run_generator import RunGenerator, RANDOM_SEED_LIST
+from vector_index import make_vector_index
+
+# None = brute force on the model's device (the default EmbeddingsModel search)
+INDEX_CONFIGS = [
+    None,
+    {'backend': 'numpy'},
+    {'backend': 'faiss-flat'},
+    {'backend': 'faiss-ivf', 'nprobe': 4},
+    {'backend': 'faiss-ivf', 'nprobe': 16},
+    {'backend': 'faiss-hnsw', 'M': 32, 'ef_search': 32},
+    {'backend': 'faiss-hnsw', 'M': 32, 'ef_search': 128},
+]
+
+def config_name(config):
+    if config is None:
+        return 'brute-force'
+    knobs = ','.join(f"{key}={value}" for key, value in config.items() if key != 'backend')
+    return f"{config['backend']}({knobs})" if knobs else config['backend']
+
+def mean_ndcg5(generator, seeds, searching_field, query_field):
+    """
+    Mean nDCG@5 over the SUSHI topics, averaged across `seeds` (the full pipeline of `run_single_seed`).
+    """
+    seed_means = []
+    for seed in seeds:
+        results = generator.run_single_seed(seed, searching_field, query_field)
+        metrics = generator.evaluator.evaluate_results(results)
+        seed_means.append(np.mean([topic['ndcg_cut_5'] for topic in metrics.values()]))
+    return float(np.mean(seed_means))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares EmbeddingsModel vector index backends: recall@k against brute force on the full collection, latency, and nDCG@5 on the SUSHI topics (run from src/).")
+    parser.add_argument('--k', type=int, default=100)
+    parser.add_argument('--num-seeds', type=int, default=5)
+    parser.add_argument('--searching-field', nargs='+', default=['title', 'ocr', 'folderlabel', 'summary'])
+    parser.add_argument('--query-field', default='TD')
+    args = parser.parse_args()
+
+    seeds = RANDOM_SEED_LIST[:args.num_seeds]
+    generator = RunGenerator(searching_fields=[args.searching_field],
+                             query_fields=[args.query_field],
+                             models=['embeddings'],
+                             encode_once=True)
+    generator.current_searching_field = args.searching_field
+    generator.current_query_field = args.query_field
+
+    # Full collection encoded once (embedding cache), shared by every backend
+    model = generator.get_full_collection_model('embeddings')
+    embeddings = model.doc_embeddings.cpu().numpy()
+    queries = generator.build_queries(generator.loader.load_all_docs_ecf())
+    query_embeddings = model.model.encode(list(queries.values()), convert_to_numpy=True)
+
+    _, exact_rows = make_vector_index('numpy').build(embeddings).search(query_embeddings, args.k)
+
+    print(f"{len(embeddings)} documents, {len(queries)} topics, k={args.k}, nDCG@5 over {len(seeds)} seeds")
+    print(f"{'index':<36} {'build s':>8} {'query ms':>9} {'recall@k':>9} {'nDCG@5':>7}")
+    for config in INDEX_CONFIGS:
+        if config is None:
+            model.vector_index = None
+            build_seconds, query_ms, recall = 0.0, float('nan'), 1.0
+        else:
+            start = time.perf_counter()
+            model.build_vector_index(config)
+            build_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, rows = model.vector_index.search(query_embeddings, args.k)
+            query_ms = (time.perf_counter() - start) * 1000 / len(query_embeddings)
+            recall = np.mean([len(set(found[found >= 0]) & set(exact)) / len(exact) for found, exact in zip(rows, exact_rows)])
+
+        ndcg = mean_ndcg5(generator, seeds, args.searching_field, args.query_field)
+        print(f"{config_name(config):<36} {build_seconds:>8.2f} {query_ms:>9.3f} {recall:>9.3f} {ndcg:>7.4f}")
+
+if __name__ == '__main__':
+    main()
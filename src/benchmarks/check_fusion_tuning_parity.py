@@ -0,0 +1,88 @@
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from run_generator import RANDOM_SEED_LIST, RFF_WEIGHTS, RRF_R_PARAMETER, FOLDER_QRELS_PATH, BOX_QRELS_PATH
+from evaluator import Evaluator
+from folder_relations import FolderRelationGraph
+from fusion import fuse_runs, run_to_ranked_lists
+from tuning_fusion.fusion_tuning import FusionTuner, NDCG_CUTOFF, parse_weight_grid
+
+EXPANSION_CEILING_K = 2 # RunGenerator's default expansion_ceiling_k
+NDCG_TOLERANCE = 1e-9
+
+def pipeline_results(tuner, seed, config):
+    """
+    Fuses and expands the cached rankings of one seed like `RunGenerator.produce_topics_results` (`fuse_runs`, then `FolderRelationGraph.expand_batch`, or the reverse with rrf_input='folders').
+    """
+    runs = {model_name: pd.read_feather(tuner.ranking_path(model_name, seed)) for model_name in tuner.models}
+    graph = FolderRelationGraph.load(tuner.graph_path(seed)) if tuner.expansion else None
+    weights, k, ceiling_k = config['weights'], config['k'], config['ceiling_k']
+
+    if tuner.rrf_input == 'folders':
+        expanded = {model_name: graph.expand_batch(run, tuner.expansion, ceiling_k) if graph is not None else run[['qid', 'folder', 'score']]
+                    for model_name, run in runs.items()}
+        final_ranked_df = fuse_runs(expanded, keys=['folder'], weights=weights, method='rrf', k=k) if len(runs) > 1 else expanded[tuner.models[0]]
+    else:
+        fused_docs_df = fuse_runs(runs, keys=['docno', 'folder'], weights=weights, method='rrf', k=k) if len(runs) > 1 else runs[tuner.models[0]]
+        if graph is not None:
+            final_ranked_df = graph.expand_batch(fused_docs_df, tuner.expansion, ceiling_k)
+        else:
+            final_ranked_df = fused_docs_df.groupby(['qid', 'folder'], as_index=False, sort=False)['score'].max()
+    return run_to_ranked_lists(final_ranked_df, tuner.state['topics'])
+
+def compare(tuner, seed, config):
+    """
+    Checks that the tuner's replay gives the pipeline's top-5 and nDCG@5 on every topic. Returns the number of mismatching topics.
+    """
+    tuned_top = tuner.top_folders(config, seed)
+    tuned_ndcg = tuner.evaluate([config])[0, tuner.seeds.index(seed)]
+
+    results = pipeline_results(tuner, seed, config)
+    metrics = Evaluator(FOLDER_QRELS_PATH, BOX_QRELS_PATH).evaluate_results(results)
+
+    mismatches = 0
+    for t, item in enumerate(results):
+        topic, pipeline_top = item['Id'], item['RankedList'][:NDCG_CUTOFF]
+        pipeline_ndcg = metrics.get(str(topic), {}).get('ndcg_cut_5', 0.0)
+        if tuned_top[topic] != pipeline_top or abs(tuned_ndcg[t] - pipeline_ndcg) > NDCG_TOLERANCE:
+            mismatches += 1
+            print(f"  {topic}: tuner={tuned_top[topic]} ({tuned_ndcg[t]:.4f}) pipeline={pipeline_top} ({pipeline_ndcg:.4f})")
+    print(f"Seed {seed}, {config}: {len(results) - mismatches}/{len(results)} topics with identical top-{NDCG_CUTOFF} and nDCG@{NDCG_CUTOFF}")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that FusionTuner's vectorized replay ranks and scores one cached seed like RunGenerator's fusion and expansion (run from src/).")
+    parser.add_argument('--searching-field', nargs='+', default=['title', 'ocr', 'folderlabel', 'summary'])
+    parser.add_argument('--query-field', default='TD')
+    parser.add_argument('--models', nargs='+', default=['bm25', 'embeddings', 'colbert'])
+    parser.add_argument('--expansion', nargs='*', default=['similar_snc'])
+    parser.add_argument('--rrf-input', choices=['docs', 'folders'], default='docs')
+    parser.add_argument('--sampling', choices=['uniform', 'uneven'], default='uniform')
+    parser.add_argument('--seed', type=int, default=RANDOM_SEED_LIST[0])
+    parser.add_argument('--weights', nargs='*', help="Weight per model, e.g. embeddings=0.5 (defaults to RFF_WEIGHTS)")
+    parser.add_argument('--k', type=float, default=RRF_R_PARAMETER)
+    parser.add_argument('--ceiling', type=int, default=EXPANSION_CEILING_K)
+    args = parser.parse_args()
+
+    tuner = FusionTuner(searching_field=args.searching_field,
+                        query_field=args.query_field,
+                        models=args.models,
+                        expansion=args.expansion,
+                        rrf_input=args.rrf_input,
+                        sampling=args.sampling,
+                        seeds=[args.seed])
+    # Only runs the seed if its rankings are not cached yet
+    tuner.collect_rankings()
+    tuner.load()
+
+    weights = {model_name: RFF_WEIGHTS.get(model_name, 1.0) for model_name in args.models}
+    weights.update({model_name: values[0] for model_name, values in (parse_weight_grid(args.weights) or {}).items()})
+    config = {'weights': weights, 'k': args.k, 'ceiling_k': args.ceiling if args.expansion else None}
+
+    sys.exit(1 if compare(tuner, args.seed, config) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import pyterrier as pt
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from sparse_bm25 import SparseBM25
+
+FIELDS = ['title', 'folderlabel', 'summary']
+FIELD_PARAMS = [(3.0, 0.5), (1.3, 0.65), (1.0, 0.85)]
+TOP_K = 10
+SCORE_TOLERANCE = 1e-4
+
+# Small archival fixture: stopword-like content words (system, fire, bill, found...) and stemming edge cases (dying, news)
+FIXTURE = [
+    ("D01", "Telegram on the fire at the embassy", "POLITICAL -> GENERAL", "Report of a fire that damaged the embassy archive system."),
+    ("D02", "Bill of lading for grain shipments", "ECONOMIC -> TRADE", "Shipping bill detailing grain exports and customs interest."),
+    ("D03", "News summary for the Secretary", "POLITICAL -> NEWS MEDIA", "Daily news digest found in the Secretary's office files."),
+    ("D04", "Dying ambassador recalled", "POLITICAL -> DIPLOMATIC REPRESENTATION", "The ambassador, dying of illness, was called home."),
+    ("D05", "Call for a conference on nuclear testing", "DEFENSE -> NUCLEAR", "Memo calling for talks on a nuclear test ban system."),
+    ("D06", "Show of force in the strait", "DEFENSE -> NAVAL", "Naval show of force detailed in a cable to the embassy."),
+    ("D07", "Interest rates and foreign loans", "FINANCE -> LOANS", "Analysis of interest payments on foreign loans and credits."),
+    ("D08", "Refugees found near the border", "SOCIAL -> REFUGEES", "Refugees found crossing the border; details of the camps."),
+    ("D09", "Fire control system purchase", "DEFENSE -> ARMAMENTS", "Purchase of a fire control system for the navy."),
+    ("D10", "Embassy newsletter", "CULTURE -> INFORMATION", "Newsletter with news of embassy staff and visitors."),
+    ("D11", "Trade bill before Congress", "ECONOMIC -> TRADE", "Congressional bill on tariffs; the embassy shows interest."),
+    ("D12", "Detailed report on elections", "POLITICAL -> ELECTIONS", "Election results detailed by province, with turnout."),
+]
+QUERIES = {
+    "Q1": "embassy fire",
+    "Q2": "bill of lading grain",
+    "Q3": "news found in the office",
+    "Q4": "dying ambassador",
+    "Q5": "nuclear test ban system",
+    "Q6": "interest on foreign loans",
+    "Q7": "show of force naval",
+    "Q8": "detailed election results",
+}
+
+def fixture_documents():
+    return [{'docno': docno, 'title': title, 'folderlabel': label, 'summary': summary}
+            for docno, title, label, summary in FIXTURE]
+
+def terrier_rankings(index, field_params):
+    """
+    Ranks the fixture queries with Terrier's BM25 (field_params None) or BM25F.
+    """
+    if field_params is None:
+        retriever = pt.BatchRetrieve(index, wmodel="BM25", num_results=TOP_K)
+    else:
+        controls = {}
+        for i, (w, c) in enumerate(field_params):
+            controls[f'w.{i}'] = w
+            controls[f'c.{i}'] = c
+        retriever = pt.BatchRetrieve(index, wmodel="BM25F", controls=controls, num_results=TOP_K)
+    results = retriever.transform(pd.DataFrame({'qid': list(QUERIES), 'query': list(QUERIES.values())}))
+    return {qid: dict(zip(group['docno'], group['score'])) for qid, group in results.groupby('qid')}
+
+def sparse_rankings(documents, field_params):
+    """
+    Ranks the fixture queries with `SparseBM25` (same model and parameters).
+    """
+    engine = SparseBM25(field_params=field_params).fit(documents, FIELDS)
+    docnos = np.array([doc['docno'] for doc in documents])
+    rankings = engine.rank(list(QUERIES.values()), num_results=TOP_K)
+    return {qid: dict(zip(docnos[rows], scores)) for qid, (rows, scores) in zip(QUERIES, rankings)}
+
+def compare(name, terrier, sparse):
+    """
+    Checks that both backends return the same top-k documents with the same scores. Returns the number of mismatching queries.
+    """
+    mismatches = 0
+    for qid in QUERIES:
+        expected, actual = terrier.get(qid, {}), sparse.get(qid, {})
+        same_docs = set(expected) == set(actual)
+        same_scores = same_docs and all(abs(expected[docno] - actual[docno]) <= SCORE_TOLERANCE for docno in expected)
+        if not (same_docs and same_scores):
+            mismatches += 1
+            print(f"  [{name}] {qid} '{QUERIES[qid]}': terrier={sorted(expected.items(), key=lambda x: -x[1])} sparse={sorted(actual.items(), key=lambda x: -x[1])}")
+    print(f"{name}: {len(QUERIES) - mismatches}/{len(QUERIES)} queries with identical top-{TOP_K}")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that SparseBM25 ranks like Terrier (BM25 and BM25F) on a small fixture index.")
+    parser.parse_args()
+
+    if not pt.java.started():
+        pt.java.init()
+    documents = fixture_documents()
+
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        indexer = pt.IterDictIndexer(os.path.join(tmp, 'index'), meta={'docno': 20}, text_attrs=FIELDS, fields=True, overwrite=True)
+        index = pt.IndexFactory.of(indexer.index(documents))
+
+        mismatches += compare("BM25", terrier_rankings(index, None), sparse_rankings(documents, None))
+        mismatches += compare("BM25F", terrier_rankings(index, FIELD_PARAMS), sparse_rankings(documents, FIELD_PARAMS))
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+
+MANIFEST_FILENAME = 'collection_manifest.json'
+MANIFEST_VERSION = 1
+
+class CollectionManifest:
+    """
+    Cached listing of the raw collection (box -> folder -> files), replacing the `os.listdir` walk over `data/raw`.
+
+    The manifest keeps the directory listing order of boxes, folders and files (so sampling from it is identical to sampling from a fresh walk) together with the modification time of every directory.
+    Adding or removing a box, folder or file changes the mtime of its parent directory, so comparing the stored mtimes with the current ones (`is_fresh`) is enough to know when the manifest must be rebuilt.
+
+    Attributes:
+        boxes (dict): {box_id: {folder_id: [file_names]}} in directory listing order.
+        mtimes (dict): {relative_dir: mtime_ns} for the root, every box and every folder directory. Empty for manifests built from metadata.
+        source (str): 'raw' (scanned from the directory tree) or 'metadata' (rebuilt from the items metadata).
+    """
+    def __init__(self,
+                 boxes,
+                 mtimes=None,
+                 source='raw'):
+        self.boxes = boxes
+        self.mtimes = mtimes or {}
+        self.source = source
+
+    @property
+    def counts(self):
+        """Number of boxes, folders and files in the collection."""
+        return {
+            'boxes': len(self.boxes),
+            'folders': sum(len(folders) for folders in self.boxes.values()),
+            'files': sum(len(files) for folders in self.boxes.values() for files in folders.values())
+        }
+
+    @property
+    def hash(self):
+        """SHA-1 of the collection structure (ignores mtimes), identifying the exact set and order of documents."""
+        payload = json.dumps(self.boxes, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def collection(self, sort_folders=True):
+        """
+        Returns a fresh {box_id: {folder_id: [file_names]}} copy of the collection.
+
+        Args:
+            sort_folders (bool): If True, the folders of each box are sorted by number of files (longest first, ties in listing order), as the collection walkers always did.
+        """
+        collection = {}
+        for box, folders in self.boxes.items():
+            folder_names = list(folders)
+            if sort_folders:
+                folder_names = sorted(folder_names, key=lambda k: len(folders[k]), reverse=True)
+            collection[box] = {folder: list(folders[folder]) for folder in folder_names}
+        return collection
+
+    @classmethod
+    def scan(cls, raw_dir):
+        """
+        Walks `raw_dir` (boxes -> folders -> files) and records the listing and the directory mtimes.
+        """
+        boxes = {}
+        mtimes = {'.': os.stat(raw_dir).st_mtime_ns}
+        for box in os.listdir(raw_dir):
+            box_path = os.path.join(raw_dir, box)
+            if not os.path.isdir(box_path): continue
+
+            boxes[box] = {}
+            mtimes[box] = os.stat(box_path).st_mtime_ns
+            for folder in os.listdir(box_path):
+                folder_path = os.path.join(box_path, folder)
+                if not os.path.isdir(folder_path): continue
+
+                boxes[box][folder] = os.listdir(folder_path)
+                mtimes[f"{box}/{folder}"] = os.stat(folder_path).st_mtime_ns
+        return cls(boxes, mtimes, source='raw')
+
+    @classmethod
+    def from_metadata(cls, items):
+        """
+        Rebuilds the collection from the items metadata ('Sushi Box', 'Sushi Folder' and '<docno>.pdf'), for machines without `data/raw`.
+
+        Files follow the metadata order instead of the directory listing order, so random ECFs may differ from the ones sampled from the raw tree.
+        """
+        boxes = {}
+        for docno in items:
+            item = items[docno]
+            boxes.setdefault(item['Sushi Box'], {}).setdefault(item['Sushi Folder'], []).append(f"{docno}.pdf")
+        return cls(boxes, source='metadata')
+
+    def is_fresh(self, raw_dir):
+        """
+        Checks whether the manifest still matches `raw_dir` (no directory was added, removed or modified).
+        """
+        if self.source != 'raw':
+            return False
+        for rel_dir, mtime in self.mtimes.items():
+            try:
+                if os.stat(os.path.join(raw_dir, rel_dir)).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def save(self, path):
+        """
+        Writes the manifest as JSON (to a temporary file first, so readers never see a partial manifest).
+        """
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'source': self.source,
+            'hash': self.hash,
+            'counts': self.counts,
+            'mtimes': self.mtimes,
+            'boxes': self.boxes
+        }
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a manifest written by `save`. Returns None if it is missing or from another manifest version.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return cls(manifest['boxes'], manifest['mtimes'], manifest['source'])
+
+def load_collection_manifest(raw_dir, manifest_path=None, items=None):
+    """
+    Returns the manifest of `raw_dir`, rescanning the directory tree only when the cached manifest is missing or stale.
+
+    Args:
+        raw_dir (str): Root of the raw collection (`data/raw`).
+        manifest_path (str, optional): Manifest file. Defaults to `collection_manifest.json` next to `raw_dir` (i.e. in `data/`).
+        items (Mapping, optional): Items metadata, used to rebuild the collection when `raw_dir` is absent and no manifest was copied from a machine with the PDFs.
+
+    Returns:
+        CollectionManifest: The collection listing.
+
+    Raises:
+        FileNotFoundError: If `raw_dir` is absent and neither a manifest nor `items` are available.
+    """
+    raw_dir = os.path.normpath(raw_dir)
+    manifest_path = manifest_path or os.path.join(os.path.dirname(raw_dir), MANIFEST_FILENAME)
+    manifest = CollectionManifest.load(manifest_path)
+
+    if os.path.isdir(raw_dir):
+        if manifest is None or not manifest.is_fresh(raw_dir):
+            manifest = CollectionManifest.scan(raw_dir)
+            manifest.save(manifest_path)
+        return manifest
+
+    # No PDFs on this machine: use a manifest copied from a machine that has them, or rebuild the listing from the metadata
+    if manifest is not None:
+        return manifest
+    if items is not None:
+        return CollectionManifest.from_metadata(items)
+    raise FileNotFoundError(f"Directory '{raw_dir}' not found and no collection manifest at '{manifest_path}'.")
+
+if __name__ == '__main__':
+    # Builds (or refreshes) the manifest of the project's raw collection
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    manifest = load_collection_manifest(os.path.join(project_root, 'data', 'raw'))
+    print(f"Collection manifest ({manifest.source}): {manifest.counts} - hash {manifest.hash}")
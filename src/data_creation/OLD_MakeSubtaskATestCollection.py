@@ -1,8 +1,12 @@
 import os
+import sys
 import json
 import pandas as pd
 import random
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from collection_manifest import load_collection_manifest
+
 RANDOM_SEED = 150
 
 def sortLongest(my_dict):
@@ -13,16 +17,8 @@ def sortLongest(my_dict):
 
 def getSushiFiles(dir):
     fullCollection = {}
-    print("Starting walk of", dir)
-    for box in os.listdir(dir):
-        #print(f'Reading SUSHI collection box {box}')
-        fullCollection[box] = {}
-        for folder in os.listdir(os.path.join(dir,box)):
-            fullCollection[box][folder] = []
-#            print(f'Read box {box}, folder {folder}')
-            for file in os.listdir(os.path.join(dir,box,folder)):
-#                print(f'Read file {os.path.join(dir,box,folder,file)}')
-                fullCollection[box][folder].append(file)
+    print("Loading collection manifest of", dir)
+    fullCollection = load_collection_manifest(dir).collection(sort_folders=False)
     for box in fullCollection:
         fullCollection[box] = sortLongest(fullCollection[box])
     print("Finished getting documents")
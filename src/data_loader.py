@@ -1,9 +1,155 @@
 import os
 import json
 import random
+import hashlib
 
 import pandas as pd
 
+from metadata_store import MetadataStore
+from collection_manifest import load_collection_manifest
+
+RANDOM_SEED_LIST = [1, 42, 100, 300, 333, 777, 999, 2025, 6159, 12345, 19865, 53819,
+                    56782, 62537, 72738, 75259, 81236, 91823, 98665, 98765, 99009, 999777333,
+                    120302, 123865, 170302, 180803, 5122025, 12052024, 12052025, 99000011]
+
+def training_documents_hash(training_set):
+    """
+    Returns the SHA-1 of an ECF training set (documents and their order), to check that two runs used the same training documents.
+    """
+    return hashlib.sha1("\n".join(training_set).encode('utf-8')).hexdigest()
+
+def sample_training_documents(full_collection, rng, sampling='uniform', max_docs=300, docs_per_box=5, uneven_targets=None):
+    """
+    Samples the training documents of an ECF from the collection.
+
+    Used documents are tracked in a set and exhausted folders are dropped from the rotation by index, so the cost grows linearly with the number of sampled documents.
+    The sequence of random calls is the same as in the original list-based sampler, so a given seed always yields the same (byte-identical) ECF.
+
+    Args:
+        full_collection (dict): Collection structure {box_id: {folder_id: [file_names]}}.
+        rng (random.Random): Random generator, seeded by the caller.
+        sampling (str, optional): 'uniform' (same number of documents in every box) or 'uneven' (per-box targets from `uneven_targets`). Defaults to 'uniform'.
+        max_docs (int, optional): The hard limit on documents to sample per box. Defaults to 300.
+        docs_per_box (int, optional): The target number of documents to select from each box ('uniform'). Defaults to 5.
+        uneven_targets (list[int], optional): Number of documents to sample from each (randomly ordered) box ('uneven').
+
+    Returns:
+        list[str]: Training documents as 'box/folder/file' paths, in sampling order.
+    """
+    training_set = []
+    training_files = set()
+
+    def _sample_round_robin(box_id, target_count):
+        """
+        Selects 'target_count' documents from 'box_id' using round-robin
+        across folders to handle uneven folder sizes correctly.
+        """
+        folders = full_collection[box_id]
+        
+        # 1. Map valid candidates per folder
+        valid_folders_map = {}
+        for f_name, f_docs in folders.items():
+            # Only consider docs that haven't been used yet
+            cands = [doc for doc in f_docs if doc not in training_files]
+            if cands:
+                valid_folders_map[f_name] = cands
+        
+        # 2. Prepare rotation list
+        active_folders = list(valid_folders_map.keys())
+        rng.shuffle(active_folders)
+
+        docs_selected_count = 0
+        folder_idx = 0
+
+        # 3. Round-Robin Loop
+        while docs_selected_count < target_count and active_folders:
+            # Get current folder from rotation
+            position = folder_idx % len(active_folders)
+            current_f_name = active_folders[position]
+            
+            # Pick a document
+            if valid_folders_map[current_f_name]:
+                rand_idx = rng.randrange(len(valid_folders_map[current_f_name]))
+                selected_doc = valid_folders_map[current_f_name].pop(rand_idx)
+                
+                # Add to global lists
+                training_files.add(selected_doc)
+                training_set.append(f"{box_id}/{current_f_name}/{selected_doc}")
+                docs_selected_count += 1
+            
+            # Cleanup: If folder is now empty, remove from rotation
+            if not valid_folders_map[current_f_name]:
+                del active_folders[position]
+                # Adjust index to avoid skipping the next folder since list shrank
+                if len(active_folders) > 0:
+                    folder_idx = folder_idx % len(active_folders)
+            else:
+                # Move to next folder
+                folder_idx += 1
+
+    if sampling == 'uniform':
+        for box, folders in full_collection.items():
+            folder_docs_limit = [0] * max_docs
+            total_selected = 0
+            
+            # Determine how many docs per folder to pick
+            num_folders = len(folders)
+            for _ in range(docs_per_box):
+                for i in range(min(num_folders, docs_per_box, max_docs)):
+                    if total_selected < docs_per_box:
+                        folder_docs_limit[i] += 1
+                        total_selected += 1
+            
+            folder_names = list(folders.keys())
+            rng.shuffle(folder_names)
+            
+            for i, folder in enumerate(folder_names):
+                limit = folder_docs_limit[i] if i < len(folder_docs_limit) else 0
+                if limit == 0:
+                    continue
+                candidates = [doc for doc in folders[folder] if doc not in training_files]
+                num_to_pick = min(limit, len(candidates))
+                
+                if num_to_pick > 0:
+                    selected = rng.sample(candidates, num_to_pick)
+                    for doc in selected:
+                        training_files.add(doc)
+                        training_set.append(f"{box}/{folder}/{doc}")
+
+    elif sampling == "uneven":
+        # 1. Randomly order boxes
+        available_boxes = list(full_collection.keys())
+        rng.shuffle(available_boxes)
+        box_sizes = {box: sum(len(files) for files in folders.values()) for box, folders in full_collection.items()}
+
+        for i in range(min(len(uneven_targets), len(available_boxes))):
+            target = uneven_targets[i]
+            current_box_id = available_boxes[i]
+
+            total_docs_in_current = box_sizes[current_box_id]
+
+            # 2. Swap Logic: If current box doesn't have enough docs, find one that does
+            if total_docs_in_current < target:
+                swap_index = -1
+                # Look ahead in the list for a suitable candidate
+                for j in range(i + 1, len(available_boxes)):
+                    if box_sizes[available_boxes[j]] >= target:
+                        swap_index = j
+                        break
+                
+                if swap_index != -1:
+                    # Perform the swap
+                    available_boxes[i], available_boxes[swap_index] = available_boxes[swap_index], available_boxes[i]
+                    current_box_id = available_boxes[i]
+                else:
+                    # Edge case: No box remaining has enough documents. 
+                    target = total_docs_in_current
+
+            # 3. Sampling Logic: Use the unified helper
+            _sample_round_robin(current_box_id, target)
+
+    return training_set
+
 class DataLoader:
     """
     Central data management utility for the experiment pipeline.
@@ -21,12 +167,16 @@ class DataLoader:
         self.sushi_files_path = os.path.join(project_root, 'data', 'raw')
         self.topics_path = os.path.join(project_root, "src", "data_creation", "topics_output.txt")
         self.all_docs_ecf_path = os.path.join(project_root, 'ecf', 'random_generated', 'ECF_ALL_TRAINING_SET.json')
+        self.ecf_cache_dir = os.path.join(project_root, 'ecf', 'random_generated')
+        self.uneven_distribution_path = os.path.join(project_root, 'src', 'RGdistribution.xlsx')
         
-        self.items = self._load_json(self.items_metadata_path)
-        self.folder_metadata = self._load_json(self.folder_metadata_path)
+        # Memory-mapped columnar stores (converted from the JSON files on first use)
+        self.items = MetadataStore.open(self.items_metadata_path)
+        self.folder_metadata = MetadataStore.open(self.folder_metadata_path)
+        self.manifest = load_collection_manifest(self.sushi_files_path, items=self.items)
         self.full_collection = self._build_full_collection()
 
-        self.df_uneven_distribution = pd.read_excel("RGdistribution.xlsx")
+        self.df_uneven_distribution = pd.read_excel(self.uneven_distribution_path)
 
     def _load_json(self, path):
         """
@@ -37,30 +187,15 @@ class DataLoader:
 
     def _build_full_collection(self):
         """
-        Scans the raw data directory to build a complete hierarchy of the collection.
+        Builds the complete hierarchy of the collection from the collection manifest.
 
-        Iterates through every box and folder in the `data/raw` path to collect filenames. It sorts folders within each box by the number of files (descending) to optimize processing order during sampling.
+        The manifest lists every box and folder of the `data/raw` path (see `collection_manifest.load_collection_manifest`), so the directory tree is only walked again when it changes; without `data/raw`, the hierarchy comes from the items metadata. Folders within each box are sorted by the number of files (descending) to optimize processing order during sampling.
 
         Returns:
             dict: The collection structure in the format: {box_id: {folder_id: [file_names]}}.
         """
-        collection = {}
-        for box in os.listdir(self.sushi_files_path):
-            box_path = os.path.join(self.sushi_files_path, box)
-            if not os.path.isdir(box_path): continue
-            
-            collection[box] = {}
-            for folder in os.listdir(box_path):
-                folder_path = os.path.join(box_path, folder)
-                if not os.path.isdir(folder_path): continue
-                
-                files = os.listdir(folder_path)
-                collection[box][folder] = files
-        
         # Sort folders by number of files (longest first)
-        for box in collection:
-            sorted_folders = sorted(collection[box], key=lambda k: len(collection[box][k]), reverse=True)
-            collection[box] = {k: collection[box][k] for k in sorted_folders}
+        collection = self.manifest.collection(sort_folders=True)
 
         printSort = False
         if printSort:
@@ -79,155 +214,82 @@ class DataLoader:
         with open(self.topics_path, 'r', encoding='utf-8') as f:
             return list(json.load(f).values())
 
-    def create_random_ecf(self, seed, sampling='uniform', max_docs=300, docs_per_box=5):
+    def uneven_targets(self):
+        """
+        Returns the per-box document targets of the 'uneven' sampling (from RGdistribution.xlsx).
+        """
+        return self.df_uneven_distribution["Samples/Box"].dropna().astype(int).tolist()[:-1]
+
+    def ecf_cache_path(self, seed, sampling='uniform', max_docs=300, docs_per_box=5):
+        """
+        Returns the cache file of a random ECF.
+
+        The file name is keyed by (seed, sampling, docs_per_box, max_docs, collection manifest hash), plus the per-box targets for 'uneven' sampling, so a changed collection or configuration never reuses a stale ECF.
+        """
+        key_parts = {
+            'seed': seed,
+            'sampling': sampling,
+            'docs_per_box': docs_per_box,
+            'max_docs': max_docs,
+            'collection': self.manifest.hash
+        }
+        if sampling == 'uneven':
+            key_parts['uneven_targets'] = self.uneven_targets()
+        key = hashlib.sha1(json.dumps(key_parts, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.ecf_cache_dir, f"ECF_Random_Seed_{seed}_{sampling}_{key[:12]}.json")
+
+    def create_random_ecf(self, seed, sampling='uniform', max_docs=300, docs_per_box=5, use_cache=True):
         """
         Generates a randomized "Experimental Collection Format" (ECF) object.
 
+        Generated ECFs are cached in `ecf/random_generated` (see `ecf_cache_path`) and loaded from there on later calls. Topics are always taken from the current topics file.
+        Each ECF records the sampling configuration and a `TrainingDocumentsHash`, so runs can verify they used identical training sets.
+
         Args:
             seed (int): The random seed to ensure the selection is reproducible.
             sampling (str, optional): The strategy for selecting documents. Defaults to 'uniform'.
             max_docs (int, optional): The hard limit on documents to sample per box. Defaults to 300.
             docs_per_box (int, optional): The target number of documents to select from each box. Defaults to 5.
+            use_cache (bool, optional): If False, the ECF is sampled again and the cache is left untouched. Defaults to True.
 
         Returns:
             dict: An ECF dictionary containing the 'ExperimentName', the list of 
                   selected 'TrainingDocuments', and the 'Topics'.
         """
-        random.seed(seed)
         topics = self.get_topics()
+        cache_path = self.ecf_cache_path(seed, sampling, max_docs, docs_per_box)
 
-        training_set = []
-        training_files = []
-
-        def _sample_round_robin(box_id, target_count):
-            """
-            Selects 'target_count' documents from 'box_id' using round-robin
-            across folders to handle uneven folder sizes correctly.
-            """
-            folders = self.full_collection[box_id]
-            
-            # 1. Map valid candidates per folder
-            valid_folders_map = {}
-            for f_name, f_docs in folders.items():
-                # Only consider docs that haven't been used yet
-                cands = [doc for doc in f_docs if doc not in training_files]
-                if cands:
-                    valid_folders_map[f_name] = cands
-            
-            # 2. Prepare rotation list
-            active_folders = list(valid_folders_map.keys())
-            random.shuffle(active_folders)
-
-            docs_selected_count = 0
-            folder_idx = 0
+        if use_cache and os.path.exists(cache_path):
+            ecf = self._load_json(cache_path)
+            ecf['ExperimentSets'][0]['Topics'] = {topic['ID']: topic for topic in topics}
+            return ecf
 
-            # 3. Round-Robin Loop
-            while docs_selected_count < target_count and active_folders:
-                # Get current folder from rotation
-                current_f_name = active_folders[folder_idx % len(active_folders)]
-                
-                # Pick a document
-                if valid_folders_map[current_f_name]:
-                    rand_idx = random.randrange(len(valid_folders_map[current_f_name]))
-                    selected_doc = valid_folders_map[current_f_name].pop(rand_idx)
-                    
-                    # Add to global lists
-                    training_files.append(selected_doc)
-                    training_set.append(f"{box_id}/{current_f_name}/{selected_doc}")
-                    docs_selected_count += 1
-                
-                # Cleanup: If folder is now empty, remove from rotation
-                if not valid_folders_map[current_f_name]:
-                    active_folders.remove(current_f_name)
-                    # Adjust index to avoid skipping the next folder since list shrank
-                    if len(active_folders) > 0:
-                        folder_idx = folder_idx % len(active_folders)
-                else:
-                    # Move to next folder
-                    folder_idx += 1
-
-        if sampling == 'uniform':
-            for box, folders in self.full_collection.items():
-                folder_docs_limit = [0] * max_docs
-                total_selected = 0
-                
-                # Determine how many docs per folder to pick
-                num_folders = len(folders)
-                for _ in range(docs_per_box):
-                    for i in range(min(num_folders, docs_per_box, max_docs)):
-                        if total_selected < docs_per_box:
-                            folder_docs_limit[i] += 1
-                            total_selected += 1
-                
-                folder_names = list(folders.keys())
-                random.shuffle(folder_names)
-                
-                for i, folder in enumerate(folder_names):
-                    candidates = [doc for doc in folders[folder] if doc not in training_files]
-                    limit = folder_docs_limit[i] if i < len(folder_docs_limit) else 0
-                    num_to_pick = min(limit, len(candidates))
-                    
-                    if num_to_pick > 0:
-                        selected = random.sample(candidates, num_to_pick)
-                        for doc in selected:
-                            training_files.append(doc)
-                            training_set.append(f"{box}/{folder}/{doc}")
-
-        elif sampling == "uneven":
-            # 1. Load distribution targets
-            target_counts = self.df_uneven_distribution["Samples/Box"].dropna().astype(int).tolist()[:-1]
-
-            # 2. Randomly order boxes
-            available_boxes = list(self.full_collection.keys())
-            random.shuffle(available_boxes)
-
-            for i in range(min(len(target_counts), len(available_boxes))):
-                target = target_counts[i]
-                current_box_id = available_boxes[i]
-
-                total_docs_in_current = sum(len(files) for files in self.full_collection[current_box_id].values())
-
-                # 3. Swap Logic: If current box doesn't have enough docs, find one that does
-                if total_docs_in_current < target:
-                    swap_index = -1
-                    # Look ahead in the list for a suitable candidate
-                    for j in range(i + 1, len(available_boxes)):
-                        candidate_box_id = available_boxes[j]
-                        total_docs_candidate = sum(len(files) for files in self.full_collection[candidate_box_id].values())
-                        
-                        if total_docs_candidate >= target:
-                            swap_index = j
-                            break
-                    
-                    if swap_index != -1:
-                        # Perform the swap
-                        available_boxes[i], available_boxes[swap_index] = available_boxes[swap_index], available_boxes[i]
-                        current_box_id = available_boxes[i]
-                    else:
-                        # Edge case: No box remaining has enough documents. 
-                        target = total_docs_in_current
-
-                # 4. Sampling Logic: Use the unified helper
-                _sample_round_robin(current_box_id, target)
+        rng = random.Random(seed)
+        uneven_targets = self.uneven_targets() if sampling == "uneven" else None
+        training_set = sample_training_documents(self.full_collection, rng, sampling, max_docs, docs_per_box, uneven_targets)
 
         ecf = {
             'ExperimentName': f'ECF {sampling} w/ Random Seed {seed}',
+            'Sampling': {
+                'seed': seed,
+                'sampling': sampling,
+                'docs_per_box': docs_per_box,
+                'max_docs': max_docs,
+                'collection_hash': self.manifest.hash
+            },
+            'TrainingDocumentsHash': training_documents_hash(training_set),
             'ExperimentSets': [{'TrainingDocuments': training_set, 'Topics': {}}]
         }
         for topic in topics:
             ecf['ExperimentSets'][0]['Topics'][topic['ID']] = topic
 
-        saveJson = False
-
-        if saveJson:
-            output_dir = os.path.join(self.project_root, 'ecf', 'random_generated')
-            os.makedirs(output_dir, exist_ok=True)
-            
-            filename = f"ECF_Random_Seed_{seed}.json"
-            output_path = os.path.join(output_dir, filename)
-
-            with open(output_path, 'w', encoding='utf-8') as f:
+        if use_cache:
+            os.makedirs(self.ecf_cache_dir, exist_ok=True)
+            # Write to a temporary name first, so parallel runs never read a partial ECF
+            tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(ecf, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
         
         return ecf
 
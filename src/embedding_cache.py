@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import time
+import hashlib
+
+import numpy as np
+
+def text_hash(text):
+    """
+    Returns the content address (SHA-1 hex digest) used as cache key for a text.
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of document embeddings.
+
+    Embeddings are keyed by (model name, text hash): each model gets its own sub-directory, and every text is addressed by the hash of its content, so the same document is only encoded once no matter how many ECFs (random seeds) it appears in.
+
+    On disk, the store is a set of immutable float16 NumPy shards, each one paired with a JSON sidecar listing the text hashes of its rows:
+
+        <cache_dir>/<model>/shard_<id>.npy   (rows x dim, float16)
+        <cache_dir>/<model>/shard_<id>.json  ([hash_row_0, hash_row_1, ...])
+
+    Shards are memory-mapped at load, and new embeddings are always written to a new shard, so concurrent writers never modify each other's files.
+
+    Attributes:
+        model_dir (str): Directory holding the shards of this model.
+        index (dict): Maps a text hash to its (shard name, row) location.
+    """
+    def __init__(self,
+                 cache_dir,
+                 model_name,
+                 dtype=np.float16):
+        self.model_dir = os.path.join(cache_dir, re.sub(r'[^a-zA-Z0-9_.-]', '_', model_name))
+        self.dtype = dtype
+        os.makedirs(self.model_dir, exist_ok=True)
+
+        self._shards = {}
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """
+        Reads every shard sidecar and builds the hash -> (shard, row) lookup.
+
+        Sidecars are written after their shard, so only fully written shards are indexed.
+        """
+        index = {}
+        for filename in sorted(os.listdir(self.model_dir)):
+            if not (filename.startswith('shard_') and filename.endswith('.json')):
+                continue
+            shard_name = filename[:-5]
+            with open(os.path.join(self.model_dir, filename), 'r', encoding='utf-8') as f:
+                hashes = json.load(f)
+            for row, key in enumerate(hashes):
+                index.setdefault(key, (shard_name, row))
+        return index
+
+    def _shard(self, shard_name):
+        """
+        Opens (memory-mapped, read-only) and memoizes a shard.
+        """
+        if shard_name not in self._shards:
+            path = os.path.join(self.model_dir, f"{shard_name}.npy")
+            self._shards[shard_name] = np.load(path, mmap_mode='r')
+        return self._shards[shard_name]
+
+    def missing(self, hashes):
+        """
+        Returns the unique hashes (in first-seen order) that are not stored yet.
+        """
+        return [key for key in dict.fromkeys(hashes) if key not in self.index]
+
+    def add(self, hashes, embeddings):
+        """
+        Stores the embeddings of `hashes` in a new shard.
+
+        Args:
+            hashes (list[str]): Text hashes, one per row of `embeddings`.
+            embeddings (np.ndarray): Matrix of shape (len(hashes), dim).
+        """
+        if len(hashes) == 0:
+            return
+        shard_name = f"shard_{time.time_ns()}_{os.getpid()}"
+        shard_path = os.path.join(self.model_dir, f"{shard_name}.npy")
+        sidecar_path = os.path.join(self.model_dir, f"{shard_name}.json")
+
+        # Write to temporary names first so readers never see partial files
+        with open(shard_path + '.tmp', 'wb') as f:
+            np.save(f, np.asarray(embeddings, dtype=self.dtype))
+        os.replace(shard_path + '.tmp', shard_path)
+
+        with open(sidecar_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(list(hashes), f)
+        os.replace(sidecar_path + '.tmp', sidecar_path)
+
+        for row, key in enumerate(hashes):
+            self.index.setdefault(key, (shard_name, row))
+
+    def gather(self, hashes):
+        """
+        Collects the stored embeddings of `hashes` into a float32 matrix (in the given order).
+
+        Rows are read shard by shard, so only the requested rows are paged in from disk.
+        """
+        locations = [self.index[key] for key in hashes]
+        by_shard = {}
+        for position, (shard_name, row) in enumerate(locations):
+            by_shard.setdefault(shard_name, ([], []))
+            by_shard[shard_name][0].append(position)
+            by_shard[shard_name][1].append(row)
+
+        dim = self._shard(locations[0][0]).shape[1] if locations else 0
+        matrix = np.empty((len(hashes), dim), dtype=np.float32)
+        for shard_name, (positions, rows) in by_shard.items():
+            matrix[positions] = self._shard(shard_name)[rows]
+        return matrix
+
+class TokenEmbeddingCache(EmbeddingCache):
+    """
+    Persistent, content-addressed store of token embeddings (one variable-length matrix per text, e.g. ColBERT document encodings).
+
+    Same layout and guarantees as `EmbeddingCache`, except that each shard stacks the token rows of all its texts, and the sidecar records where every text starts:
+
+        <cache_dir>/<model>/shard_<id>.npy   (total tokens x dim, float16)
+        <cache_dir>/<model>/shard_<id>.json  ({"hashes": [...], "offsets": [0, end_0, end_1, ...]})
+
+    Attributes:
+        model_dir (str): Directory holding the shards of this model.
+        index (dict): Maps a text hash to its (shard name, start row, end row) location.
+    """
+    def _load_index(self):
+        """
+        Reads every shard sidecar and builds the hash -> (shard, start, end) lookup.
+        """
+        index = {}
+        for filename in sorted(os.listdir(self.model_dir)):
+            if not (filename.startswith('shard_') and filename.endswith('.json')):
+                continue
+            shard_name = filename[:-5]
+            with open(os.path.join(self.model_dir, filename), 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+            offsets = sidecar['offsets']
+            for position, key in enumerate(sidecar['hashes']):
+                index.setdefault(key, (shard_name, offsets[position], offsets[position + 1]))
+        return index
+
+    def add(self, hashes, embeddings):
+        """
+        Stores the token embeddings of `hashes` in a new shard.
+
+        Args:
+            hashes (list[str]): Text hashes, one per matrix of `embeddings`.
+            embeddings (list[np.ndarray]): One (tokens x dim) matrix per text.
+        """
+        if len(hashes) == 0:
+            return
+        shard_name = f"shard_{time.time_ns()}_{os.getpid()}"
+        shard_path = os.path.join(self.model_dir, f"{shard_name}.npy")
+        sidecar_path = os.path.join(self.model_dir, f"{shard_name}.json")
+        offsets = np.concatenate([[0], np.cumsum([len(matrix) for matrix in embeddings])]).tolist()
+
+        # Write to temporary names first so readers never see partial files
+        with open(shard_path + '.tmp', 'wb') as f:
+            np.save(f, np.concatenate([np.asarray(matrix, dtype=self.dtype) for matrix in embeddings]))
+        os.replace(shard_path + '.tmp', shard_path)
+
+        with open(sidecar_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'hashes': list(hashes), 'offsets': offsets}, f)
+        os.replace(sidecar_path + '.tmp', sidecar_path)
+
+        for position, key in enumerate(hashes):
+            self.index.setdefault(key, (shard_name, offsets[position], offsets[position + 1]))
+
+    def gather(self, hashes):
+        """
+        Collects the stored token embeddings of `hashes` as float32 matrices (in the given order).
+        """
+        matrices = []
+        for key in hashes:
+            shard_name, start, end = self.index[key]
+            matrices.append(np.asarray(self._shard(shard_name)[start:end], dtype=np.float32))
+        return matrices
@@ -11,8 +11,8 @@ class Evaluator:
     Handles the evaluation of retrieval results against ground truth (QRELs).
 
     This class is responsible for:
-    1. Saving search results in the standard TREC format.
-    2. evaluating individual run files using `pytrec_eval` metrics (nDCG, MAP, etc.).
+    1. Saving search results in the standard TREC format (optional side output).
+    2. evaluating individual runs (in memory or from run files) using `pytrec_eval` metrics (nDCG, MAP, etc.).
     3. Calculating custom metrics, such as the count of relevant folders in the Top 5.
     4. Aggregating results across multiple random seeds to produce statistical summaries (Mean/Margin).
 
@@ -20,6 +20,8 @@ class Evaluator:
         folder_qrels_path (str): Path to the QREL file defining relevant folders.
         box_qrels_path (str): Path to the QREL file defining relevant boxes (unused in folder eval).
         measures (set): The set of pytrec_eval metrics to calculate (e.g., 'ndcg_cut_5').
+        qrels (dict): Folder QRELs parsed once at construction ({topic_id: {folder_id: relevance}}).
+        relevance_evaluator (pytrec_eval.RelevanceEvaluator): Evaluator built once over `qrels` and reused for every run.
     """
     def __init__(self, 
                  folder_qrels_path, 
@@ -28,6 +30,22 @@ class Evaluator:
         self.box_qrels_path = box_qrels_path
         self.measures = {'ndcg_cut', 'map', 'recip_rank', 'success'}
 
+        self.qrels = self._load_qrels(self.folder_qrels_path)
+        self.relevance_evaluator = pytrec_eval.RelevanceEvaluator(self.qrels, self.measures)
+
+    def _load_qrels(self, qrels_path):
+        """
+        Parses a QRELs file into the {topic_id: {item_id: relevance}} format of `pytrec_eval`.
+        """
+        with open(qrels_path) as qrelsFile:
+            qrels_data = {}
+            for line in qrelsFile:
+                topicId, _, folderId, relevanceLevel = line.split('\t')
+                if topicId not in qrels_data:
+                    qrels_data[topicId] = {}
+                qrels_data[topicId][folderId] = int(relevanceLevel.strip())
+        return qrels_data
+
     def save_run_file(self, results, output_path, run_name):
         """
         Writes the search results to a standard TREC run file.
@@ -45,9 +63,7 @@ class Evaluator:
         """
         Evaluates a single run file against QRELs.
 
-        This method performs two types of evaluation:
-        1. Standard Information Retrieval metrics (nDCG@5, MAP, MRR) using `pytrec_eval`.
-        2. A custom metric: `count_relevant_top5`, which counts how many relevant items appear strictly within the top 5 results.
+        Parses the TREC run file and evaluates it with the same logic as `evaluate_results`.
         """
         # 1. Load Run
         with open(run_file_path) as runFile:
@@ -61,25 +77,50 @@ class Evaluator:
                 run_data[topicId][folderId] = float(score)
                 run_lists[topicId].append(folderId)
 
-        # 2. Load QRELs
-        with open(self.folder_qrels_path) as qrelsFile:
-            qrels_data = {}
-            for line in qrelsFile:
-                topicId, _, folderId, relevanceLevel = line.split('\t')
-                if topicId not in qrels_data:
-                    qrels_data[topicId] = {}
-                qrels_data[topicId][folderId] = int(relevanceLevel.strip())
+        return self._evaluate_run(run_data, run_lists, output_json_path)
 
-        # 3. Evaluate
-        evaluator = pytrec_eval.RelevanceEvaluator(qrels_data, self.measures)
-        results = evaluator.evaluate(run_data)
+    def evaluate_results(self, results, output_json_path=None):
+        """
+        Evaluates ranked results directly in memory, without a run file round-trip.
+
+        The scores are the same rank-derived values (1/rank, rounded to 4 decimals) that `save_run_file` writes, so the metrics are identical to evaluating the saved run file.
+
+        Args:
+            results (list[dict]): One dict per topic with its 'Id' and 'RankedList' of folders.
+            output_json_path (str, optional): Where to save the metrics JSON. If None, nothing is written.
+
+        Returns:
+            dict: Metrics per topic.
+        """
+        run_data = {}
+        run_lists = {}
+        for topic in results:
+            topicId = str(topic['Id'])
+            for i, folderId in enumerate(topic['RankedList']):
+                if topicId not in run_data:
+                    run_data[topicId] = {}
+                    run_lists[topicId] = []
+                run_data[topicId][folderId] = float(f'{1/(i+1):.4f}')
+                run_lists[topicId].append(folderId)
+
+        return self._evaluate_run(run_data, run_lists, output_json_path)
+
+    def _evaluate_run(self, run_data, run_lists, output_json_path):
+        """
+        Evaluates a parsed run against QRELs.
+
+        This method performs two types of evaluation:
+        1. Standard Information Retrieval metrics (nDCG@5, MAP, MRR) using `pytrec_eval`.
+        2. A custom metric: `count_relevant_top5`, which counts how many relevant items appear strictly within the top 5 results.
+        """
+        results = self.relevance_evaluator.evaluate(run_data)
 
         for topic_id in results:
             # Get the top 5 folders for this topic (sorted list)
             top_5_folders = run_lists.get(topic_id, [])[:5]
             
             relevant_count_top5 = 0
-            topic_qrels = qrels_data.get(topic_id, {})
+            topic_qrels = self.qrels.get(topic_id, {})
             
             for folder in top_5_folders:
                 if folder in topic_qrels and topic_qrels[folder] > 0:
@@ -87,10 +128,12 @@ class Evaluator:
             
             results[topic_id]['count_relevant_top5'] = relevant_count_top5
 
-        # 4. Save
-        os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
-        with open(output_json_path, 'w') as f:
-            json.dump(results, f, indent=4)
+        # Save
+        if output_json_path is not None:
+            os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
+            with open(output_json_path, 'w') as f:
+                json.dump(results, f, indent=4)
+        return results
 
     def generate_aggregated_metrics(self, folder_path, run_type):
         """
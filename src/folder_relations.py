@@ -0,0 +1,327 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+RELATION_NAMES = ['same folder', 'same box', 'adjacent box', 'same snc close date', 'same snc', 'similar snc']
+
+# Expansion technique (RunGenerator argument) -> relation used as evidence
+TECHNIQUE_RELATIONS = {
+    'same_box': 'same box',
+    'same_snc': 'same snc',
+    'close_date': 'same snc close date',
+    'similar_snc': 'similar snc'
+}
+
+def parse_snc(snc):
+    """
+    Splits an SNC code into its [subject, level, sublevel] parts (e.g. 'POL 15-1' -> ['POL', '15', '1']).
+    """
+    parts = [snc, '', '']
+    if ' ' in snc:
+        parts[0], parts[1] = snc.split()
+        if '-' in parts[1]:
+            parts[1], parts[2] = parts[1].split('-')
+    return parts
+
+def similar_snc_key(snc):
+    """
+    Returns the key shared by all "similar" SNC codes.
+
+    Two codes are similar when they have the same subject; for 'POL' (the largest subject) the first level must match too.
+    """
+    parts = parse_snc(snc)
+    if parts[0] != 'POL':
+        return (parts[0],)
+    return (parts[0], parts[1])
+
+def build_folder_relations(training_set, folder_metadata):
+    """
+    Builds the graph of relationships between training documents and all known folders.
+
+    Instead of comparing every folder with every training document, the training documents are first grouped into indexes (folder -> docs, box -> docs, box number -> docs, SNC -> docs, similar-SNC key -> docs, and a per-SNC interval index of pre-parsed document dates).
+    Each folder then assembles its relations with a few lookups, so the cost grows linearly with folders + documents.
+
+    Args:
+        training_set (list[dict]): Training documents with 'docno', 'folder', 'box' and 'date'.
+        folder_metadata (dict): Folder metadata with 'box', 'snc', 'date' and 'endDate' per folder.
+
+    Returns:
+        dict: {folder_id: {relation_name: [docno, ...]}} for every relation in `RELATION_NAMES`, with docnos in training set order.
+    """
+    # 1. Indexes over the training documents (lists of positions in the training set)
+    by_folder = defaultdict(list)
+    by_box = defaultdict(list)
+    by_box_number = defaultdict(list)
+    by_snc = defaultdict(list)
+    by_similar_snc = defaultdict(list)
+
+    for pos, doc in enumerate(training_set):
+        by_folder[doc['folder']].append(pos)
+        by_box[doc['box']].append(pos)
+        by_box_number[(doc['box'][0], int(doc['box'][1:]))].append(pos)
+
+        file_snc = folder_metadata[doc['folder']]['snc']
+        if file_snc != 'Unknown':
+            by_snc[file_snc].append(pos)
+            by_similar_snc[similar_snc_key(file_snc)].append(pos)
+
+    # 2. Interval index: dated documents of each SNC sorted by date (built on first use)
+    snc_dates = {}
+
+    def documents_between(snc, start, end):
+        """Positions of the documents of `snc` dated strictly between `start` and `end`."""
+        if snc not in snc_dates:
+            dated = sorted(
+                (datetime.strptime(training_set[pos]['date'], '%Y-%m-%d'), pos)
+                for pos in by_snc[snc] if training_set[pos]['date'] != 'Unknown'
+            )
+            snc_dates[snc] = ([date for date, _ in dated], [pos for _, pos in dated])
+        dates, positions = snc_dates[snc]
+        return sorted(positions[bisect_right(dates, start):bisect_left(dates, end)])
+
+    # 3. Relations per folder
+    def docnos(positions):
+        return [training_set[pos]['docno'] for pos in positions]
+
+    relations = {}
+    for folder, meta in folder_metadata.items():
+        box_prefix, box_number = meta['box'][0], int(meta['box'][1:])
+        folder_snc = meta['snc']
+
+        adjacent = sorted(
+            by_box_number.get((box_prefix, box_number - 1), []) +
+            by_box_number.get((box_prefix, box_number), []) +
+            by_box_number.get((box_prefix, box_number + 1), [])
+        )
+
+        same_snc = []
+        similar_snc = []
+        close_date = []
+        if folder_snc != 'Unknown':
+            same_snc = by_snc.get(folder_snc, [])
+            similar_snc = by_similar_snc.get(similar_snc_key(folder_snc), [])
+            if same_snc and meta['date'] != 'Unknown' and meta['endDate'] != 'Unknown':
+                close_date = documents_between(
+                    folder_snc,
+                    datetime.strptime(meta['date'], '%m/%d/%Y'),
+                    datetime.strptime(meta['endDate'], '%m/%d/%Y')
+                )
+
+        relations[folder] = {
+            'same folder': docnos(by_folder.get(folder, [])),
+            'same box': docnos(by_box.get(meta['box'], [])),
+            'adjacent box': docnos(adjacent),
+            'same snc close date': docnos(close_date),
+            'same snc': docnos(same_snc),
+            'similar snc': docnos(similar_snc),
+        }
+
+    return relations
+
+class FolderRelationGraph:
+    """
+    Array-backed version of the relation graph, used by the expansion engine.
+
+    Folders and training documents are integer-coded, and every relation is stored as a sparse (folders x documents) incidence matrix.
+    Expanding a ranking then reduces to a few sparse products: the intersection of the techniques is the element-wise product of their incidence matrices, and the evidence sum/count of every unretrieved folder is that product times the (documents x queries) score matrix.
+
+    Attributes:
+        folders (np.ndarray): Folder IDs, in folder metadata order (row order of the matrices).
+        docnos (np.ndarray): Training document IDs, in training set order (column order of the matrices).
+        incidence (dict): Maps each name of `RELATION_NAMES` to its CSR incidence matrix.
+    """
+    def __init__(self, folders, docnos, incidence):
+        self.folders = np.asarray(folders, dtype=object)
+        self.docnos = np.asarray(docnos, dtype=object)
+        self.incidence = incidence
+        self.folder_index = {folder: idx for idx, folder in enumerate(self.folders)}
+        self.doc_index = {docno: idx for idx, docno in enumerate(self.docnos)}
+
+    @classmethod
+    def build(cls, training_set, folder_metadata):
+        """
+        Builds the graph of a training set (see `build_folder_relations`).
+        """
+        relations = build_folder_relations(training_set, folder_metadata)
+        return cls.from_relations(relations, [doc['docno'] for doc in training_set])
+
+    @classmethod
+    def from_relations(cls, relations, docnos):
+        """
+        Converts a {folder: {relation: [docno, ...]}} graph into incidence matrices.
+        """
+        folders = list(relations.keys())
+        doc_index = {docno: idx for idx, docno in enumerate(docnos)}
+
+        incidence = {}
+        for relation in RELATION_NAMES:
+            rows, cols = [], []
+            for row, folder in enumerate(folders):
+                for docno in relations[folder][relation]:
+                    rows.append(row)
+                    cols.append(doc_index[docno])
+            incidence[relation] = sp.csr_matrix(
+                (np.ones(len(rows)), (rows, cols)), shape=(len(folders), len(docnos))
+            )
+        return cls(folders, docnos, incidence)
+
+    def save(self, path):
+        """
+        Serializes the graph to a compressed NPZ file (folder/document IDs plus the CSR structure of every relation).
+
+        Incidence matrices are binary, so only their `indptr`/`indices` arrays are stored.
+        """
+        arrays = {
+            'folders': self.folders.astype(str),
+            'docnos': self.docnos.astype(str)
+        }
+        for idx, relation in enumerate(RELATION_NAMES):
+            matrix = self.incidence[relation]
+            arrays[f'indptr_{idx}'] = matrix.indptr.astype(np.int64)
+            arrays[f'indices_{idx}'] = matrix.indices.astype(np.int32)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a graph written by `save`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            folders = data['folders'].astype(object)
+            docnos = data['docnos'].astype(object)
+            incidence = {}
+            for idx, relation in enumerate(RELATION_NAMES):
+                indices = data[f'indices_{idx}']
+                incidence[relation] = sp.csr_matrix(
+                    (np.ones(len(indices)), indices, data[f'indptr_{idx}']), shape=(len(folders), len(docnos))
+                )
+        return cls(folders, docnos, incidence)
+
+    def relations_of(self, folder):
+        """
+        Returns the {relation: [docno, ...]} neighbours of one folder.
+        """
+        row = self.folder_index[folder]
+        return {
+            relation: self.docnos[matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]].tolist()
+            for relation, matrix in self.incidence.items()
+        }
+
+    def expand(self, result, techniques, ceiling_k):
+        """
+        Applies the expansion logic to the ranking of a single query.
+
+        Args:
+            result (pd.DataFrame): Retrieved documents with 'docno', 'folder' and 'score'.
+            techniques (list[str]): Expansion techniques (keys of `TECHNIQUE_RELATIONS`) whose evidence must all hold.
+            ceiling_k (int): Rank of the direct hits that inferred folders cannot outrank.
+
+        Returns:
+            pd.DataFrame: Folders ('folder', 'score') sorted by score, direct hits and inferred folders together.
+        """
+        expanded = self.expand_batch(result.assign(qid=0), techniques, ceiling_k)
+        return expanded[['folder', 'score']].reset_index(drop=True)
+
+    def expand_batch(self, results, techniques, ceiling_k):
+        """
+        Applies the expansion logic to the rankings of many queries at once.
+
+        1. Direct hits: each retrieved folder gets the max score of its documents.
+        2. Inferred folders: each unretrieved folder gets the mean score of the retrieved documents related to it by all `techniques`.
+        3. Safety ceiling: if the best inferred folder beats the `ceiling_k`-th best document score, all inferred scores of that query are shifted down (and clipped at 0).
+
+        Output order matches the dictionary-based implementation: within a query, ties keep direct hits in order of first appearance, followed by inferred folders in folder metadata order.
+
+        Args:
+            results (pd.DataFrame): Retrieved documents with 'qid', 'docno', 'folder' and 'score'.
+
+        Returns:
+            pd.DataFrame: 'qid', 'folder' and 'score', sorted by score within each qid (qids in order of first appearance).
+        """
+        qid_codes, qids = pd.factorize(results['qid'], sort=False)
+        num_queries = len(qids)
+        num_folders = len(self.folders)
+
+        # 1. Direct hits: folder max, per query, in order of first appearance
+        retrieved = (results.assign(q=qid_codes)
+                     .groupby(['q', 'folder'], sort=False)['score'].max()
+                     .reset_index())
+        retrieved_q = retrieved['q'].to_numpy()
+        retrieved_codes = np.array([self.folder_index.get(folder, -1) for folder in retrieved['folder']], dtype=np.int64)
+        # Folders missing from the metadata (code -1) can never be inferred, and their key would alias the previous query's last folder
+        retrieved_known = retrieved_codes >= 0
+        retrieved_keys = retrieved_q[retrieved_known] * num_folders + retrieved_codes[retrieved_known]
+
+        # Document scores per query (a document retrieved twice keeps its last score)
+        doc_scores = results.assign(q=qid_codes).drop_duplicates(subset=['q', 'docno'], keep='last')
+        doc_q = doc_scores['q'].to_numpy()
+        doc_values = doc_scores['score'].to_numpy(dtype=np.float64)
+        doc_codes = np.array([self.doc_index.get(docno, -1) for docno in doc_scores['docno']], dtype=np.int64)
+
+        # 2. Inferred folders: evidence sum / count from sparse products
+        new_q = np.array([], dtype=np.int64)
+        new_codes = np.array([], dtype=np.int64)
+        new_values = np.array([], dtype=np.float64)
+
+        relation_keys = [TECHNIQUE_RELATIONS[tech] for tech in techniques if tech in TECHNIQUE_RELATIONS]
+        known = doc_codes >= 0
+        if relation_keys and known.any():
+            evidence = self.incidence[relation_keys[0]]
+            for relation in relation_keys[1:]:
+                evidence = evidence.multiply(self.incidence[relation])
+            evidence = sp.csr_matrix(evidence)
+
+            # Sums are accumulated in extended precision so that means which are mathematically equal
+            # (e.g. RRF scores 1/2 and 1/6 vs 1/3) round to the same float, as with statistics.mean
+            shape = (len(self.docnos), num_queries)
+            score_matrix = sp.csr_matrix(
+                (doc_values[known].astype(np.longdouble), (doc_codes[known], doc_q[known])), shape=shape
+            )
+            hit_matrix = sp.csr_matrix((np.ones(known.sum()), (doc_codes[known], doc_q[known])), shape=shape)
+
+            counts = (evidence @ hit_matrix).tocoo()
+            sums = (evidence.astype(np.longdouble) @ score_matrix).tocsr()
+
+            candidate_keys = counts.col.astype(np.int64) * num_folders + counts.row
+            is_new = (counts.data > 0) & ~np.isin(candidate_keys, retrieved_keys)
+
+            new_q = counts.col[is_new].astype(np.int64)
+            new_codes = counts.row[is_new].astype(np.int64)
+            new_sums = np.asarray(sums[new_codes, new_q]).ravel()
+            new_values = (new_sums / counts.data[is_new].astype(np.longdouble)).astype(np.float64)
+
+            # 3. Safety ceiling, per query
+            if len(new_values) > 0:
+                order = np.lexsort((-doc_values, doc_q))
+                sorted_q, sorted_values = doc_q[order], doc_values[order]
+                starts = np.searchsorted(sorted_q, np.arange(num_queries), side='left')
+                ends = np.searchsorted(sorted_q, np.arange(num_queries), side='right')
+                ceiling_pos = starts + np.minimum(ceiling_k - 1, ends - starts - 1)
+                top_score = sorted_values[np.clip(ceiling_pos, 0, len(sorted_values) - 1)]
+
+                best_new = np.full(num_queries, -np.inf)
+                np.maximum.at(best_new, new_q, new_values)
+                penalty = np.where(best_new > top_score, best_new - top_score + 0.001, 0.0)
+                new_values = np.where(penalty[new_q] > 0, np.maximum(0, new_values - penalty[new_q]), new_values)
+
+            # Inferred folders follow folder metadata order within each query
+            new_order = np.lexsort((new_codes, new_q))
+            new_q, new_codes, new_values = new_q[new_order], new_codes[new_order], new_values[new_order]
+
+        # 4. Merge and sort (stable: direct hits first, then inferred folders)
+        all_q = np.concatenate([retrieved_q, new_q])
+        all_folders = np.concatenate([retrieved['folder'].to_numpy(dtype=object), self.folders[new_codes]])
+        all_values = np.concatenate([retrieved['score'].to_numpy(dtype=np.float64), new_values])
+        tie_order = np.arange(len(all_q))
+
+        order = np.lexsort((tie_order, -all_values, all_q))
+        return pd.DataFrame({
+            'qid': qids[all_q[order]],
+            'folder': all_folders[order],
+            'score': all_values[order]
+        })
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+FUSION_METHODS = ['rrf', 'combsum', 'combmnz']
+SCORE_NORMALIZATIONS = [None, 'minmax', 'zscore', 'sum']
+
+def rank_within_groups(groups, scores):
+    """
+    Ranks scores (1 = best) within each group, in one stable sort over all groups.
+
+    Ties keep their order of appearance, so a run that is already sorted keeps its ranks.
+
+    Args:
+        groups (np.ndarray): Integer group code of every row (e.g. run x query).
+        scores (np.ndarray): Score of every row (higher is better).
+
+    Returns:
+        np.ndarray: The rank of every row within its group.
+    """
+    order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    first = np.searchsorted(sorted_groups, sorted_groups, side='left')
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(len(scores)) - first + 1
+    return ranks
+
+def normalize_scores(groups, scores, normalization=None):
+    """
+    Normalizes scores within each group, so runs with different score scales can be summed.
+
+    Args:
+        groups (np.ndarray): Integer group code of every row (e.g. run x query), from 0 to num_groups - 1.
+        scores (np.ndarray): Score of every row.
+        normalization (str | None): None (raw scores), 'minmax' (best = 1, worst = 0; 1 when all scores are equal), 'zscore' (zero mean, unit deviation) or 'sum' (scores sum to 1).
+
+    Returns:
+        np.ndarray: The normalized scores (float64).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if normalization is None or len(scores) == 0:
+        return scores
+
+    num_groups = groups.max() + 1
+    if normalization == 'minmax':
+        low = np.full(num_groups, np.inf)
+        high = np.full(num_groups, -np.inf)
+        np.minimum.at(low, groups, scores)
+        np.maximum.at(high, groups, scores)
+        spread = (high - low)[groups]
+        return np.divide(scores - low[groups], spread, out=np.ones_like(scores), where=spread > 0)
+    if normalization == 'zscore':
+        counts = np.bincount(groups, minlength=num_groups)
+        mean = np.bincount(groups, weights=scores, minlength=num_groups) / counts
+        centered = scores - mean[groups]
+        std = np.sqrt(np.bincount(groups, weights=centered ** 2, minlength=num_groups) / counts)[groups]
+        return np.divide(centered, std, out=np.zeros_like(scores), where=std > 0)
+    if normalization == 'sum':
+        total = np.bincount(groups, weights=scores, minlength=num_groups)[groups]
+        return np.divide(scores, total, out=np.zeros_like(scores), where=total != 0)
+    raise ValueError(f"Unknown score normalization '{normalization}'. Options: {SCORE_NORMALIZATIONS}.")
+
+def _factorize_keys(frame, keys):
+    """
+    Integer-codes the rows of `frame` by the values of the `keys` columns (codes in order of first appearance).
+    """
+    codes, uniques = pd.factorize(frame[keys[0]], sort=False)
+    for key in keys[1:]:
+        key_codes, key_uniques = pd.factorize(frame[key], sort=False)
+        codes, _ = pd.factorize(codes * len(key_uniques) + key_codes, sort=False)
+    return codes
+
+def fuse_runs(runs, keys=['docno'], weights=None, method='rrf', k=0, normalization=None):
+    """
+    Fuses the rankings of several models, for all queries at once.
+
+    Every run is integer-coded (query, item) and the per-row contributions are summed with a single `np.bincount`, instead of one pandas groupby per query.
+
+    Methods:
+    - 'rrf': weighted Reciprocal Rank Fusion, sum of weight / (k + rank). Ranks come from the scores of each run (ties keep their order of appearance).
+    - 'combsum': sum of weight * (normalized) score.
+    - 'combmnz': CombSUM times the number of runs that retrieved the item.
+
+    Rows of one run sharing the same item (e.g. several documents of the same folder) all contribute to that item.
+
+    Args:
+        runs (dict): {model_name: pd.DataFrame} with 'qid', the `keys` columns and 'score'.
+        keys (list[str], optional): Columns identifying a fused item (e.g. ['docno', 'folder'] or ['folder']). Defaults to ['docno'].
+        weights (dict, optional): {model_name: weight} (e.g. `RFF_WEIGHTS`). Missing models weigh 1.0.
+        method (str, optional): One of `FUSION_METHODS`. Defaults to 'rrf'.
+        k (float, optional): RRF rank constant. Defaults to 0.
+        normalization (str, optional): Score normalization of 'combsum'/'combmnz' (see `normalize_scores`). Defaults to None.
+
+    Returns:
+        pd.DataFrame: 'qid', the `keys` columns and the fused 'score', sorted by score within each qid (qids in order of first appearance; ties in order of first appearance).
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}'. Options: {FUSION_METHODS}.")
+    weights = weights or {}
+    columns = ['qid'] + list(keys) + ['score']
+
+    frames = [run[columns] for run in runs.values()]
+    run_weights = np.array([weights.get(name, 1.0) for name in runs], dtype=np.float64)
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+
+    run_ids = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    qid_codes, qids = pd.factorize(rows['qid'], sort=False)
+    item_codes = _factorize_keys(rows, list(keys))
+    scores = rows['score'].to_numpy(dtype=np.float64)
+
+    # One group per (run, query): ranks and normalizations never cross runs or queries
+    groups = run_ids * len(qids) + qid_codes
+    if method == 'rrf':
+        values = 1.0 / (k + rank_within_groups(groups, scores))
+    else:
+        values = normalize_scores(groups, scores, normalization)
+    values = values * run_weights[run_ids]
+
+    # Sum the contributions of every (query, item) pair
+    pair_codes, pairs = pd.factorize(qid_codes.astype(np.int64) * (item_codes.max() + 1) + item_codes, sort=False)
+    fused = np.bincount(pair_codes, weights=values)
+    if method == 'combmnz':
+        hits = np.unique(pair_codes.astype(np.int64) * len(frames) + run_ids) // len(frames)
+        fused = fused * np.bincount(hits, minlength=len(pairs))
+
+    first_rows = np.unique(pair_codes, return_index=True)[1]
+    pair_qids = qid_codes[first_rows]
+    order = np.lexsort((-fused, pair_qids))
+
+    fused_df = rows.iloc[first_rows[order]][columns[:-1]].reset_index(drop=True)
+    fused_df['score'] = fused[order]
+    return fused_df
+
+def ranked_lists_to_run(results, key='folder'):
+    """
+    Converts ranked lists ([{'Id': qid, 'RankedList': [...]}, ...]) into a run frame ('qid', `key`, 'score'), with scores decreasing along each list.
+    """
+    qids = [item['Id'] for item in results for _ in item['RankedList']]
+    ranked = [value for item in results for value in item['RankedList']]
+    positions = [position for item in results for position in range(len(item['RankedList']))]
+    return pd.DataFrame({'qid': qids, key: ranked, 'score': -np.asarray(positions, dtype=np.float64)})
+
+def run_to_ranked_lists(run, qids, key='folder'):
+    """
+    Converts a run frame ('qid', `key`, 'score') into ranked lists ([{'Id': qid, 'RankedList': [...]}, ...]).
+
+    Each list is sorted by score (stable, so ties keep their order in `run`) and keeps the first occurrence of every value. Queries without rows get an empty list.
+
+    Args:
+        run (pd.DataFrame): Run with 'qid', `key` and 'score'.
+        qids (list): Query IDs, in output order.
+        key (str, optional): Column holding the ranked values. Defaults to 'folder'.
+    """
+    qid_codes = pd.Index(qids).get_indexer(run['qid'])
+    order = np.lexsort((-run['score'].to_numpy(dtype=np.float64), qid_codes))
+    ranked = run.iloc[order].drop_duplicates(subset=['qid', key])
+    lists = ranked.groupby('qid', sort=False)[key].agg(list).to_dict()
+    return [{'Id': qid, 'RankedList': lists.get(qid, [])} for qid in qids]
@@ -0,0 +1,52 @@
+import os
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from data_loader import DataLoader, RANDOM_SEED_LIST
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# One DataLoader per worker process (metadata and collection manifest are loaded once per worker)
+_WORKER_LOADER = None
+
+def _init_worker():
+    global _WORKER_LOADER
+    _WORKER_LOADER = DataLoader(PROJECT_ROOT)
+
+def _generate(seed, sampling, max_docs, docs_per_box, force):
+    """
+    Generates (or regenerates, if `force`) the cached ECF of one seed and returns its training set hash.
+    """
+    cache_path = _WORKER_LOADER.ecf_cache_path(seed, sampling, max_docs, docs_per_box)
+    if force and os.path.exists(cache_path):
+        os.remove(cache_path)
+    ecf = _WORKER_LOADER.create_random_ecf(seed, sampling, max_docs=max_docs, docs_per_box=docs_per_box)
+    return seed, sampling, ecf['TrainingDocumentsHash'], cache_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generates the cached random ECFs of every seed in RANDOM_SEED_LIST (run from src/).")
+    parser.add_argument('--sampling', nargs='+', choices=['uniform', 'uneven'], default=['uniform', 'uneven'])
+    parser.add_argument('--seeds', type=int, nargs='+', default=RANDOM_SEED_LIST)
+    parser.add_argument('--docs-per-box', type=int, default=5)
+    parser.add_argument('--max-docs', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help="Regenerate ECFs that are already cached.")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(_generate, seed, sampling, args.max_docs, args.docs_per_box, args.force)
+            for sampling in args.sampling
+            for seed in args.seeds
+        ]
+        results = [future.result() for future in tqdm(as_completed(futures), total=len(futures), desc="ECFs")]
+
+    for seed, sampling, training_hash, cache_path in sorted(results, key=lambda r: (r[1], args.seeds.index(r[0]))):
+        print(f"{sampling:>8} seed {seed:>10}: {training_hash[:12]}  {os.path.basename(cache_path)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,12 @@
 import os
 from tqdm import tqdm
 
-from run_generator import RunGenerator, Style, RANDOM_SEED_LIST, RESULTS_PATH
+from run_generator import RunGenerator, Style, RANDOM_SEED_LIST
+from fusion import fuse_runs, ranked_lists_to_run, run_to_ranked_lists
 
 def perform_hybrid_fusion(results_a, results_b, k=0, weight_a=1.0, weight_b=0.65):
     """
-    Combines two lists of results using Weighted Reciprocal Rank Fusion.
+    Combines two lists of results using Weighted Reciprocal Rank Fusion (all topics at once, see `fusion.fuse_runs`).
     
     Args:
         results_a (list): List of results for model A.
@@ -15,37 +16,11 @@ def perform_hybrid_fusion(results_a, results_b, k=0, weight_a=1.0, weight_b=0.65
         weight_b (float): Weight for results_b (default 0.65).
 
     Returns:
-        list: The merged results.
+        list: The merged results, in the topic order of results_a.
     """
-    merged_results = []
-    
-    dict_b = {item['Id']: item['RankedList'] for item in results_b}
-
-    for item_a in results_a:
-        topic_id = item_a['Id']
-        list_a = item_a['RankedList']
-        list_b = dict_b.get(topic_id, [])
-
-        scores = {}
-        
-        # Helper to add scores with a specific weight
-        def add_scores(doc_list, weight):
-            for rank, doc in enumerate(doc_list):
-                # RRF Formula: weight * (1 / (k + rank))
-                score = weight * (1 / (k + (rank + 1)))
-                scores[doc] = scores.get(doc, 0.0) + score
-
-        # Apply weighting
-        add_scores(list_a, weight_a)
-        add_scores(list_b, weight_b)
-
-        # Sort by accumulated score
-        sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        final_list = [doc for doc, score in sorted_docs]
-        
-        merged_results.append({'Id': topic_id, 'RankedList': final_list})
-        
-    return merged_results
+    runs = {'a': ranked_lists_to_run(results_a), 'b': ranked_lists_to_run(results_b)}
+    fused = fuse_runs(runs, keys=['folder'], weights={'a': weight_a, 'b': weight_b}, method='rrf', k=k)
+    return run_to_ranked_lists(fused, [item['Id'] for item in results_a])
 
 def run_hybrid_experiment():
     """
@@ -91,12 +66,9 @@ def run_hybrid_experiment():
         # 3. Fuse Results (RRF)
         final_results = perform_hybrid_fusion(results_A, results_B)
 
-        # 4. Save & Evaluate
-        run_name = f'45-Topics-Random-{random_seed}'
-        gen_A.evaluator.save_run_file(final_results, RESULTS_PATH, run_name)
-        
+        # 4. Evaluate (in memory)
         json_path = os.path.join(metrics_output_folder, f'Random{random_seed}_TopicsFolderMetrics.json')
-        gen_A.evaluator.evaluate(RESULTS_PATH, json_path)
+        gen_A.evaluator.evaluate_results(final_results, json_path)
 
     # 5. Aggregate
     print(f"> Generating Aggregated Metrics in {metrics_output_folder}...")
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+EVICTION_GRACE_SECONDS = 6 * 60 * 60 # Entries used more recently than this are never evicted (they may be open in another process)
+
+class IndexCache:
+    """
+    On-disk cache of index directories addressed by a configuration key.
+
+    Each entry lives in `<cache_dir>/<key>/`. Entries are built in a temporary directory and renamed into place, so an entry directory that exists is always complete, and two processes building the same key never corrupt each other.
+    Every hit refreshes the entry's last-used time; when the total size of the cache exceeds `max_bytes`, the least recently used entries are evicted (LRU by disk size).
+    Entries used within the last `grace_seconds` are never evicted, since another worker of a process pool may have them open mid-retrieval; the cache can then stay above `max_bytes` until they go idle.
+
+    Attributes:
+        cache_dir (str): Root directory of the cache.
+        max_bytes (int): Disk budget of the cache. None disables eviction.
+        grace_seconds (float): Minimum idle time before an entry can be evicted.
+    """
+    LAST_USED_FILE = '.last_used'
+
+    def __init__(self,
+                 cache_dir,
+                 max_bytes=None,
+                 grace_seconds=EVICTION_GRACE_SECONDS):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Hashes any JSON-serializable configuration into a stable cache key.
+        """
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        """Returns the directory of the entry `key` (whether it exists or not)."""
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """
+        Returns the directory of a cached entry (refreshing its last-used time), or None on a miss.
+        """
+        entry_path = self.path(key)
+        if not os.path.isdir(entry_path):
+            return None
+        self._touch(entry_path)
+        return entry_path
+
+    def get_or_build(self, key, build_fn):
+        """
+        Returns the directory of the entry `key`, building it with `build_fn(directory)` on a miss.
+
+        After a build, the cache is trimmed back to `max_bytes`.
+        """
+        entry_path = self.get(key)
+        if entry_path is not None:
+            return entry_path
+
+        entry_path = self.path(key)
+        tmp_path = f"{entry_path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+
+        build_fn(tmp_path)
+        try:
+            os.rename(tmp_path, entry_path)
+        except OSError:
+            # Another process finished the same entry first: keep theirs
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self._touch(entry_path)
+
+        self.evict(keep=key)
+        return entry_path
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`, skipping entries used within `grace_seconds`.
+
+        Args:
+            keep (str, optional): Key that must never be evicted (e.g. the entry that is about to be used).
+        """
+        if self.max_bytes is None:
+            return
+
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_path = self.path(key)
+            if '.tmp-' in key or not os.path.isdir(entry_path):
+                continue
+            entries.append((self._last_used(entry_path), self._size(entry_path), key))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            # Re-read the last-used time: another process may have picked the entry up since the listing
+            if time.time() - self._last_used(self.path(key)) < self.grace_seconds:
+                continue
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            total -= size
+
+    def _touch(self, entry_path):
+        with open(os.path.join(entry_path, self.LAST_USED_FILE), 'w'):
+            pass
+
+    def _last_used(self, entry_path):
+        marker = os.path.join(entry_path, self.LAST_USED_FILE)
+        return os.path.getmtime(marker if os.path.exists(marker) else entry_path)
+
+    def _size(self, entry_path):
+        total = 0
+        for root, _, files in os.walk(entry_path):
+            for filename in files:
+                total += os.path.getsize(os.path.join(root, filename))
+        return total
@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import hashlib
+from collections.abc import Mapping
+
+import pyarrow as pa
+
+KEY_COLUMN = '__key__'
+JSON_ENCODING = b'json'
+
+def _is_native(values):
+    """
+    Checks whether field values can be stored in a native Arrow column without changing their Python type.
+    """
+    types = {type(value) for value in values}
+    if types == {list}:
+        return all(isinstance(item, str) for value in values for item in value)
+    return len(types) == 1 and types <= {str, int, float, bool}
+
+class MetadataRecord(Mapping):
+    """
+    Read-only view of one row of a `MetadataStore`, behaving like the original JSON dictionary.
+
+    Values are read from the memory-mapped columns on access. Fields the record does not have (null cells) raise KeyError, as missing dictionary keys do.
+    """
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field):
+        return self._store._value(field, self._row)
+
+    def __iter__(self):
+        return (field for field in self._store.fields if self._store._has_value(field, self._row))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"MetadataRecord({dict(self)!r})"
+
+class MetadataStore(Mapping):
+    """
+    Columnar, memory-mapped replacement for the items/folders metadata JSON files.
+
+    Each JSON file ({id: {field: value}}) is converted once into an Arrow IPC file next to it (e.g. `itemsV1.2.arrow`): one row per id, one column per field.
+    Opening the store only memory-maps that file, so startup does not parse the JSON and every process (e.g. seed workers) shares the same pages instead of holding its own copy of the metadata.
+
+    The store is a Mapping with the same lookups as the nested dictionaries: `store[id][field]`, `id in store`, `store.get(id)` and iteration over the ids in their original JSON order.
+    Fields whose values do not share one Arrow type (e.g. strings mixed with NaN) are stored JSON-encoded and decoded on access.
+
+    Attributes:
+        path (str): Path of the Arrow file.
+        fields (list[str]): Field names, in order of first appearance in the JSON.
+        fingerprint (str): SHA-1 of the source JSON, usable as a cache key for the metadata contents.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+        self.fields = [name for name in self.table.column_names if name != KEY_COLUMN]
+        self.fingerprint = self.table.schema.metadata[b'fingerprint'].decode('utf-8')
+        self._json_fields = {
+            field.name for field in self.table.schema
+            if field.metadata and field.metadata.get(b'encoding') == JSON_ENCODING
+        }
+        self._columns = {name: self._single_chunk(self.table.column(name)) for name in self.fields}
+        self._rows = {key: row for row, key in enumerate(self.table.column(KEY_COLUMN).to_pylist())}
+
+    @staticmethod
+    def _single_chunk(column):
+        return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+
+    @classmethod
+    def open(cls, json_path, store_path=None):
+        """
+        Opens the store of `json_path`, converting the JSON first if the store is missing or older than it (an existing store is used as is when the JSON is absent).
+
+        Args:
+            json_path (str): Source metadata JSON.
+            store_path (str, optional): Arrow file to use. Defaults to the JSON path with an '.arrow' extension.
+        """
+        store_path = store_path or os.path.splitext(json_path)[0] + '.arrow'
+        if not os.path.exists(store_path) or (os.path.exists(json_path) and os.path.getmtime(store_path) < os.path.getmtime(json_path)):
+            cls.convert(json_path, store_path)
+        return cls(store_path)
+
+    @classmethod
+    def convert(cls, json_path, store_path):
+        """
+        Converts a {id: {field: value}} JSON file into an Arrow IPC file.
+
+        The file is written to a temporary name and renamed into place, so concurrent readers never see a partial store.
+        """
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        records = json.loads(raw)
+
+        fields = list(dict.fromkeys(field for record in records.values() for field in record))
+        arrays = [pa.array(list(records.keys()), type=pa.string())]
+        schema_fields = [pa.field(KEY_COLUMN, pa.string())]
+
+        for field in fields:
+            values = [record.get(field) for record in records.values()]
+            present = [record[field] for record in records.values() if field in record]
+
+            # Only single-typed scalar/string-list fields get a native column; anything else (mixed types,
+            # explicit nulls, nested objects) is JSON-encoded so that values round-trip exactly
+            array = None
+            if _is_native(present):
+                array = pa.array(values)
+
+            metadata = None
+            if array is None:
+                array = pa.array(
+                    [json.dumps(record[field]) if field in record else None for record in records.values()],
+                    type=pa.string()
+                )
+                metadata = {b'encoding': JSON_ENCODING}
+            arrays.append(array)
+            schema_fields.append(pa.field(field, array.type, metadata=metadata))
+
+        schema = pa.schema(schema_fields, metadata={b'fingerprint': hashlib.sha1(raw).hexdigest().encode('utf-8')})
+        table = pa.Table.from_arrays(arrays, schema=schema)
+
+        tmp_path = f"{store_path}.tmp-{os.getpid()}"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table, max_chunksize=max(len(table), 1))
+        os.replace(tmp_path, store_path)
+
+    def _has_value(self, field, row):
+        return self._columns[field][row].is_valid
+
+    def _value(self, field, row):
+        if field not in self._columns:
+            raise KeyError(field)
+        cell = self._columns[field][row]
+        if not cell.is_valid:
+            raise KeyError(field)
+        value = cell.as_py()
+        return json.loads(value) if field in self._json_fields else value
+
+    def __getitem__(self, key):
+        return MetadataRecord(self, self._rows[key])
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+if __name__ == '__main__':
+    # Converts the metadata JSON files given as arguments (defaults to the project's items and folders metadata)
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    json_paths = sys.argv[1:] or [
+        os.path.join(project_root, 'data', 'items_metadata', 'itemsV1.2.json'),
+        os.path.join(project_root, 'data', 'folders_metadata', 'FoldersV1.3.json')
+    ]
+    for json_path in json_paths:
+        store_path = os.path.splitext(json_path)[0] + '.arrow'
+        MetadataStore.convert(json_path, store_path)
+        print(f"{json_path} -> {store_path}")
@@ -0,0 +1,76 @@
+import time
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded encoders (SentenceTransformer, ColBERT, ...).
+
+    Each encoder is loaded once per process, the first time it is requested, and then shared by every model object that asks for it. Per-seed retrieval models therefore only hold their own index/embeddings, not a private copy of the weights.
+    Loading is instrumented: wall-clock load time, resident memory growth of the process (when `psutil` is installed), size of the parameters, and how many times the encoder was reused.
+
+    Attributes:
+        encoders (dict): Maps an encoder key to the loaded encoder.
+        stats (dict): Maps an encoder key to its load metrics.
+    """
+    def __init__(self):
+        self.encoders = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, load_fn):
+        """
+        Returns the encoder registered under `key`, loading it with `load_fn()` on the first request.
+
+        Args:
+            key (tuple): Identifies the encoder (e.g. ('sentence-transformers', 'all-mpnet-base-v2', 'cuda')).
+            load_fn (callable): Builds the encoder; only called on a miss.
+        """
+        with self._lock:
+            if key in self.encoders:
+                self.stats[key]['hits'] += 1
+                return self.encoders[key]
+
+            rss_before = self._rss()
+            start = time.perf_counter()
+            encoder = load_fn()
+            load_seconds = time.perf_counter() - start
+            rss_after = self._rss()
+
+            self.encoders[key] = encoder
+            self.stats[key] = {
+                'load_seconds': load_seconds,
+                'rss_delta_bytes': None if rss_before is None else rss_after - rss_before,
+                'parameter_bytes': self._parameter_bytes(encoder),
+                'hits': 0
+            }
+            return encoder
+
+    def metrics(self):
+        """
+        Returns one dict of load metrics per loaded encoder (key, load time, memory, reuse count).
+        """
+        return [{'encoder': '/'.join(str(part) for part in key), **stats} for key, stats in self.stats.items()]
+
+    def clear(self):
+        """Drops every loaded encoder (their memory is released once no model references them)."""
+        with self._lock:
+            self.encoders.clear()
+            self.stats.clear()
+
+    def _rss(self):
+        if psutil is None:
+            return None
+        return psutil.Process().memory_info().rss
+
+    def _parameter_bytes(self, encoder):
+        parameters = getattr(encoder, 'parameters', None)
+        if parameters is None:
+            return None
+        return sum(param.numel() * param.element_size() for param in parameters())
+
+ENCODER_REGISTRY = ModelRegistry()
@@ -1,15 +1,24 @@
 import os
 import re
-import time
+import json
+import uuid
 import shutil
+import hashlib
 from abc import ABC, abstractmethod
 
+import numpy as np
 import pandas as pd
 import pyterrier as pt
 from sentence_transformers import SentenceTransformer, util
 from pylate import indexes, models, retrieve
 import torch
 
+from embedding_cache import EmbeddingCache, TokenEmbeddingCache, text_hash
+from index_cache import IndexCache
+from sparse_bm25 import SparseBM25
+from model_registry import ENCODER_REGISTRY
+from vector_index import make_vector_index
+
 # --- Configuration Constants ---
 ## TOFS Tuned
 BM_25_FIELD_WEIGHTS = {
@@ -26,6 +35,18 @@ BM_25_FIELD_WEIGHTS = {
 #     'summary':     {'index_col': 'summary',     'w': 1.0, 'c': 0.85}
 # }
 
+BATCH_RESULT_COLUMNS = ['qid', 'docno', 'folder', 'score']
+
+TERRIER_INDEX_CACHE_DIR = "terrierindex"
+TERRIER_INDEX_CACHE_MAX_BYTES = 5 * 1024 ** 3
+TERRIER_META_FIELDS = ['docno', 'folder', 'box', 'date']
+BM25_NUM_RESULTS = 1000
+COLBERT_MODEL_NAME = "lightonai/colbertv2.0"
+COLBERT_INDEX_DIR = "pylate-index"
+COLBERT_INDEX_MANIFEST = "indexed_docs.json"
+# The PLAID codebook is retrained (full rebuild) once the index outgrows the documents it was trained on by this factor
+COLBERT_REBUILD_GROWTH = 2.0
+
 def get_best_device():
     """
     Detects the best available hardware accelerator for PyTorch operations.
@@ -83,23 +104,66 @@ class RetrievalModel(ABC):
         """
         pass
 
+    def search_batch(self, queries: dict) -> pd.DataFrame:
+        """
+        Performs several search queries at once.
+
+        The default implementation calls `search` once per query; models that can share work across queries (one encoder forward pass, one Terrier transform) override it.
+
+        Args:
+            queries (dict): Maps each query ID (qid) to its query string.
+
+        Returns:
+            pd.DataFrame: Results of all queries with the columns 'qid', 'docno', 'folder' and 'score', ranked (descending score) within each qid.
+        """
+        frames = []
+        for qid, query in queries.items():
+            result = self.search(query)
+            if len(result) > 0:
+                frames.append(result.assign(qid=qid))
+
+        if not frames:
+            return pd.DataFrame(columns=BATCH_RESULT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)[BATCH_RESULT_COLUMNS]
+
 class BM25Model(RetrievalModel):
     """
     Wrapper for PyTerrier's BM25 and BM25F implementations.
     
     Automatically switches between standard BM25 (single field) and BM25F (multifield) based on the number of searching fields provided.
+
+    Two backends are available: 'terrier' (PyTerrier, default) and 'sparse' (`SparseBM25`, an in-memory engine over SciPy sparse matrices that needs no JVM and can be forked into worker processes).
+
+    A model trained once on the full collection can serve every seed through `set_active_documents`. Results are then filtered to the seed's documents after retrieval, so term statistics (IDF, average field lengths) are those of the full collection ("global statistics") rather than of the seed's ECF.
     """
     def __init__(self, 
-                 searching_fields):
+                 searching_fields,
+                 backend='terrier',
+                 index_cache_dir=TERRIER_INDEX_CACHE_DIR,
+                 index_cache_max_bytes=TERRIER_INDEX_CACHE_MAX_BYTES):
         """
         Initializes the BM25/BM25F model configuration.
 
         Args:
             searching_fields (list): List of fields to index (e.g., ['title', 'ocr']).
+            backend (str): 'terrier' (PyTerrier) or 'sparse' (in-memory SciPy engine).
+            index_cache_dir (str): Directory of the Terrier index cache.
+            index_cache_max_bytes (int): Disk budget of the index cache; least recently used indexes are evicted beyond it.
         """
         self.searching_fields = searching_fields
+        self.backend = backend
         self.retriever = None
-        self._init_pyterrier()
+        self.filtered_retriever = None
+        self.active_docnos = None
+
+        # Sparse backend state
+        self.engine = None
+        self.docnos = np.array([], dtype=object)
+        self.folders = np.array([], dtype=object)
+
+        if self.backend == 'terrier':
+            self.index_cache = IndexCache(index_cache_dir, max_bytes=index_cache_max_bytes)
+            self._init_pyterrier()
 
     def _init_pyterrier(self):
         """
@@ -122,7 +186,10 @@ class BM25Model(RetrievalModel):
         1. Checks `self.searching_fields`.
         2. If > 1 field is used, it configures **BM25F** using weights `w` and saturation params `c` defined in `BM_25_FIELD_WEIGHTS`.
         3. If 1 field is used, it configures standard **BM25**.
-        4. Creates an IterDictIndexer to build the index on disk.
+        4. Reopens the cached index of this exact configuration, or creates an IterDictIndexer to build it on disk.
+
+        Indexes are cached by a hash of (training documents, active text attrs, BM25 vs BM25F), so re-running the same seeds skips indexing entirely.
+        With the 'sparse' backend, step 4 builds the in-memory `SparseBM25` matrices instead.
         """
         # 1. Determine Weights (BM25 vs BM25F)
         current_fields = self.searching_fields
@@ -144,28 +211,76 @@ class BM25Model(RetrievalModel):
             # Simple BM25 on the specific field
             active_text_attrs = [BM_25_FIELD_WEIGHTS[f]['index_col'] for f in current_fields if f in BM_25_FIELD_WEIGHTS]
 
-        # 2. Indexing
-        index_dir = os.path.abspath(os.path.join("terrierindex", str(int(time.time()))))
-        indexer = pt.IterDictIndexer(
-            index_dir, 
-            meta={'docno': 20, 'folder': 20, 'box': 20, 'date': 10}, 
-            text_attrs=active_text_attrs,
-            meta_reverse=['docno'], 
-            overwrite=True,
-            fields=(wmodel == "BM25F")
-        )
-        indexref = indexer.index(training_data)
-        index = pt.IndexFactory.of(indexref)
+        self.active_docnos = None
+        if self.backend == 'sparse':
+            field_params = None
+            if wmodel == "BM25F":
+                field_params = [(BM_25_FIELD_WEIGHTS[f]['w'], BM_25_FIELD_WEIGHTS[f]['c']) for f in current_fields if f in BM_25_FIELD_WEIGHTS]
+            self.engine = SparseBM25(field_params=field_params).fit(training_data, active_text_attrs)
+            self.docnos = np.array([doc['docno'] for doc in training_data], dtype=object)
+            self.folders = np.array([doc['folder'] for doc in training_data], dtype=object)
+            return
+
+        # 2. Indexing (reused from the cache when the same configuration was already indexed)
+        index_key = self._index_key(training_data, active_text_attrs, wmodel)
+
+        def build_index(index_dir):
+            indexer = pt.IterDictIndexer(
+                index_dir, 
+                meta={'docno': 20, 'folder': 20, 'box': 20, 'date': 10}, 
+                text_attrs=active_text_attrs,
+                meta_reverse=['docno'], 
+                overwrite=True,
+                fields=(wmodel == "BM25F")
+            )
+            indexer.index(training_data)
+
+        index_dir = self.index_cache.get_or_build(index_key, build_index)
+        index = pt.IndexFactory.of(os.path.join(index_dir, 'data.properties'))
 
         # 3. Retriever Setup
         self.retriever = pt.terrier.Retriever(
             index, 
             wmodel=wmodel,
             controls=controls, 
-            metadata=['docno', 'folder', 'box', 'date'], 
-            num_results=1000
+            metadata=TERRIER_META_FIELDS, 
+            num_results=BM25_NUM_RESULTS
         )
 
+        # Retrieves every matching document, so filtering to a seed never starves the top results
+        self.filtered_retriever = pt.terrier.Retriever(
+            index, 
+            wmodel=wmodel,
+            controls=controls, 
+            metadata=TERRIER_META_FIELDS, 
+            num_results=max(BM25_NUM_RESULTS, index.getCollectionStatistics().getNumberOfDocuments())
+        )
+
+    def set_active_documents(self, docnos):
+        """
+        Restricts retrieval to a subset of the indexed documents (e.g. one seed's ECF).
+
+        Documents outside the subset are masked out of the results after retrieval; scores keep the global statistics of the indexed collection.
+
+        Args:
+            docnos (list | None): Document IDs to keep searchable. None makes every indexed document searchable again.
+        """
+        self.active_docnos = None if docnos is None else set(docnos)
+
+    def _index_key(self, training_data, active_text_attrs, wmodel):
+        """
+        Computes the index cache key: a hash of the indexed documents (docnos, metadata and text of the active attrs), the active text attrs and the weighting model.
+        """
+        content_hash = hashlib.sha1()
+        for doc in training_data:
+            values = [doc[field] for field in TERRIER_META_FIELDS] + [doc[attr] for attr in active_text_attrs]
+            content_hash.update(json.dumps(values, ensure_ascii=False).encode('utf-8'))
+        return IndexCache.make_key(content_hash.hexdigest(), active_text_attrs, wmodel)
+
+    def _clean_query(self, query):
+        """Removes special characters to prevent PyTerrier query parser errors."""
+        return re.sub(r'[^a-zA-Z0-9\s]', '', query)
+
     def search(self, query):
         """
         Cleans the query string and executes retrieval.
@@ -173,73 +288,229 @@ class BM25Model(RetrievalModel):
         Removes special characters to prevent PyTerrier query parser errors.
         Returns a formatted DataFrame with standard columns.
         """
-        clean_query = re.sub(r'[^a-zA-Z0-9\s]', '', query)
-        if not clean_query.strip(): 
+        result = self.search_batch({'1': query})
+        if result.empty:
             return pd.DataFrame()
-        
-        result = self.retriever.search(clean_query)
         return result[['folder', 'score', 'docno']]
 
+    def search_batch(self, queries):
+        """
+        Executes all queries with a single PyTerrier `transform` over a topics frame.
+
+        Queries that are empty after cleaning are skipped (they produce no results).
+        If a subset of documents is active, results outside it are dropped and the top `BM25_NUM_RESULTS` of the subset are kept per query.
+        """
+        topics = pd.DataFrame({
+            'qid': list(queries.keys()),
+            'query': [self._clean_query(query) for query in queries.values()]
+        })
+        topics = topics[topics['query'].str.strip() != '']
+        if topics.empty:
+            return pd.DataFrame(columns=BATCH_RESULT_COLUMNS)
+
+        if self.backend == 'sparse':
+            return self._sparse_search_batch(topics)
+
+        if self.active_docnos is None:
+            result = self.retriever.transform(topics)
+        else:
+            result = self.filtered_retriever.transform(topics)
+            result = result[result['docno'].isin(self.active_docnos)]
+            result = result.groupby('qid', sort=False).head(BM25_NUM_RESULTS)
+        return result[BATCH_RESULT_COLUMNS].reset_index(drop=True)
+
+    def _sparse_search_batch(self, topics):
+        """
+        Scores all topics with one sparse matrix product of the `SparseBM25` engine.
+        """
+        active_rows = None
+        if self.active_docnos is not None:
+            active_rows = np.isin(self.docnos, list(self.active_docnos))
+
+        rankings = self.engine.rank(topics['query'].tolist(), num_results=BM25_NUM_RESULTS, active_rows=active_rows)
+        rows = np.concatenate([ranked_rows for ranked_rows, _ in rankings])
+        return pd.DataFrame({
+            'qid': np.repeat(topics['qid'].to_numpy(dtype=object), [len(ranked_rows) for ranked_rows, _ in rankings]),
+            'docno': self.docnos[rows],
+            'folder': self.folders[rows],
+            'score': np.concatenate([scores for _, scores in rankings])
+        })
+
 class EmbeddingsModel(RetrievalModel):
     """
     Dense Retrieval model using SentenceTransformers (Bi-Encoder).
     
     Encodes all documents into vector embeddings and performs 
     Cosine Similarity search for retrieval.
+    Document embeddings are persisted in a content-addressed `EmbeddingCache`, so a document is encoded only once across seeds and runs.
+    By default, search is brute force on the model's device; with `vector_index`, it goes through a pluggable (exact or approximate) nearest-neighbour index instead (see `vector_index.py`).
     """
     def __init__(self, 
-                 model_name='all-mpnet-base-v2'):
+                 model_name='all-mpnet-base-v2',
+                 cache_dir="embeddings-cache",
+                 top_k=None,
+                 encoder=None,
+                 vector_index=None):
         """
         Initializes the SentenceTransformer model.
         
         Args:
             model_name (str): HuggingFace model identifier.
+            cache_dir (str): Directory of the on-disk embedding cache. If None, documents are always re-encoded.
+            top_k (int): Number of documents returned per query. If None, every (active) document is ranked.
+            encoder (SentenceTransformer, optional): Already loaded encoder. Defaults to the process-wide instance of `model_name` from `ENCODER_REGISTRY` (weights are loaded once per process).
+            vector_index (dict, optional): Nearest-neighbour index configuration, e.g. {'backend': 'faiss-hnsw', 'M': 32, 'ef_search': 128} (see `vector_index.make_vector_index`). If None, search is brute force with `util.cos_sim`.
         """
-        self.model = SentenceTransformer(model_name, 
-                                         device=get_best_device())
+        if encoder is None:
+            device = get_best_device()
+            encoder = ENCODER_REGISTRY.get(
+                ('sentence-transformers', model_name, device),
+                lambda: SentenceTransformer(model_name, device=device)
+            )
+        self.model = encoder
+        self.vector_index_config = vector_index
+        self.vector_index = None
+        self.cache = EmbeddingCache(cache_dir, model_name) if cache_dir else None
+        self.top_k = top_k
         self.doc_embeddings = None
-        self.metadata_map = []
+        self.docnos = np.array([], dtype=object)
+        self.folders = np.array([], dtype=object)
+        self.active_rows = None
+        self.active_embeddings = None
 
     def train(self, training_data):
         """
         Encodes the document collection into a tensor matrix.
         
         It expects a 'text_blob' field in `training_data` which contains the concatenated text representation of the document.
+        When the cache is enabled, only texts that were never seen before are encoded; the rest are gathered from the cache.
         """
-        texts = []
-        self.metadata_map = []
-        
-        for doc in training_data:
-            texts.append(doc['text_blob'])
-            self.metadata_map.append({
-                'docno': doc['docno'],
-                'folder': doc['folder']
-            })
+        texts = [doc['text_blob'] for doc in training_data]
+        self.docnos = np.array([doc['docno'] for doc in training_data], dtype=object)
+        self.folders = np.array([doc['folder'] for doc in training_data], dtype=object)
+
+        if self.cache is None:
+            self.doc_embeddings = self.model.encode(texts, convert_to_tensor=True)
+        else:
+            self.doc_embeddings = self._encode_with_cache(texts)
+        if self.vector_index_config is not None:
+            self.build_vector_index(self.vector_index_config)
+        self.set_active_documents(None)
 
-        self.doc_embeddings = self.model.encode(texts, convert_to_tensor=True)
+    def build_vector_index(self, config):
+        """
+        (Re)builds the nearest-neighbour index over the trained document embeddings.
+
+        Args:
+            config (dict): Index configuration: 'backend' plus its knobs (see `vector_index.make_vector_index`).
+        """
+        config = dict(config)
+        self.vector_index_config = dict(config)
+        self.vector_index = make_vector_index(config.pop('backend', 'numpy'), **config)
+        self.vector_index.build(self.doc_embeddings.cpu().numpy())
+
+    def _encode_with_cache(self, texts):
+        """
+        Encodes the texts missing from the cache, stores them and gathers the full embedding matrix.
+        """
+        hashes = [text_hash(text) for text in texts]
+        missing = self.cache.missing(hashes)
+        if missing:
+            text_by_hash = dict(zip(hashes, texts))
+            new_embeddings = self.model.encode([text_by_hash[key] for key in missing], convert_to_numpy=True)
+            self.cache.add(missing, new_embeddings)
+
+        doc_embeddings = self.cache.gather(hashes)
+        return torch.from_numpy(doc_embeddings).to(self.model.device)
+
+    def set_active_documents(self, docnos):
+        """
+        Restricts retrieval to a subset of the trained documents (e.g. one seed's ECF).
+
+        Lets a model trained once on the full collection serve every seed by masking rows instead of re-encoding.
+
+        Args:
+            docnos (list | None): Document IDs to keep searchable. None makes every trained document searchable again.
+        """
+        if docnos is None:
+            self.active_rows = np.arange(len(self.docnos))
+            self.active_embeddings = self.doc_embeddings
+            return
+        self.active_rows = np.flatnonzero(np.isin(self.docnos, list(docnos)))
+        self.active_embeddings = self.doc_embeddings[torch.as_tensor(self.active_rows, device=self.doc_embeddings.device)]
 
     def search(self, query):
         """
-        Encodes the query and calculates Cosine Similarity against all docs.
+        Encodes the query and calculates Cosine Similarity against all docs (only the active ones, if a subset was set).
+
+        Only the `top_k` best scores are selected (`torch.topk`), so the cost of building the result grows with k rather than with the collection size.
         
         Returns:
             pd.DataFrame: Ranked results sorted by similarity score (descending).
         """
+        if self.vector_index is not None:
+            return self.search_batch({'1': query})[['docno', 'folder', 'score']]
+
         query_embedding = self.model.encode(query, convert_to_tensor=True)
-        cosine_scores = util.cos_sim(query_embedding, self.doc_embeddings)[0]
-        
-        scores = cosine_scores.tolist()
-        
-        results = []
-        for idx, score in enumerate(scores):
-            results.append({
-                'docno': self.metadata_map[idx]['docno'],
-                'folder': self.metadata_map[idx]['folder'],
-                'score': score
-            })
-            
-        df = pd.DataFrame(results)
-        return df.sort_values(by='score', ascending=False)
+        cosine_scores = util.cos_sim(query_embedding, self.active_embeddings)[0]
+        return self._top_k_frame(cosine_scores)
+
+    def search_batch(self, queries):
+        """
+        Encodes all queries in one batch and scores them with a single matrix product against the active documents.
+        """
+        qids = list(queries.keys())
+        if not qids:
+            return pd.DataFrame(columns=BATCH_RESULT_COLUMNS)
+
+        if self.vector_index is not None:
+            return self._vector_index_search_batch(qids, list(queries.values()))
+
+        query_embeddings = self.model.encode(list(queries.values()), convert_to_tensor=True)
+        cosine_scores = util.cos_sim(query_embeddings, self.active_embeddings)
+
+        k = cosine_scores.shape[1] if self.top_k is None else min(self.top_k, cosine_scores.shape[1])
+        top_scores, top_positions = torch.topk(cosine_scores, k, dim=1)
+        rows = self.active_rows[top_positions.cpu().numpy().ravel()]
+
+        return pd.DataFrame({
+            'qid': np.repeat(np.array(qids, dtype=object), k),
+            'docno': self.docnos[rows],
+            'folder': self.folders[rows],
+            'score': top_scores.cpu().numpy().ravel().astype(np.float64)
+        })
+
+    def _vector_index_search_batch(self, qids, query_texts):
+        """
+        Searches all queries in the vector index (masked to the active documents) and drops padded (-1) results.
+        """
+        query_embeddings = self.model.encode(query_texts, convert_to_numpy=True)
+        active_rows = None if len(self.active_rows) == len(self.docnos) else self.active_rows
+        k = len(self.active_rows) if self.top_k is None else self.top_k
+        scores, rows = self.vector_index.search(query_embeddings, k, active_rows)
+
+        found = rows >= 0
+        rows = rows[found]
+        return pd.DataFrame({
+            'qid': np.repeat(np.array(qids, dtype=object), found.sum(axis=1)),
+            'docno': self.docnos[rows],
+            'folder': self.folders[rows],
+            'score': scores[found].astype(np.float64)
+        })
+
+    def _top_k_frame(self, cosine_scores):
+        """
+        Builds the ranked DataFrame of the `top_k` highest scores of a single query.
+        """
+        k = len(cosine_scores) if self.top_k is None else min(self.top_k, len(cosine_scores))
+        top_scores, top_positions = torch.topk(cosine_scores, k)
+        rows = self.active_rows[top_positions.cpu().numpy()]
+
+        return pd.DataFrame({
+            'docno': self.docnos[rows],
+            'folder': self.folders[rows],
+            'score': top_scores.cpu().numpy().astype(np.float64)
+        })
 
 class ColBERTModel(RetrievalModel):
     """
@@ -247,64 +518,220 @@ class ColBERTModel(RetrievalModel):
     
     ColBERT computes embeddings for every token and performs "MaxSim" interaction, offering high precision but higher computational cost.
     Uses PLAID indexing for efficiency.
+
+    The PLAID index is persistent and incremental: `train` only encodes and adds the documents that are not indexed yet, and retrieval is restricted to the documents of the last `train` call (or of `set_active_documents`) with PLAID's `subset` filter, so one index serves every seed of a run.
+    New documents are compressed with the existing codebook (centroids); the index is only rebuilt from scratch once it has grown past `COLBERT_REBUILD_GROWTH` times the documents the codebook was trained on, or when the text of an indexed document changed.
+    The indexed documents are recorded in a sidecar JSON (`COLBERT_INDEX_MANIFEST`), so a model opened on an existing `index_path` picks the index up where it was left.
+    Token embeddings are persisted in a content-addressed `TokenEmbeddingCache` (float16), so a document is encoded only once across seeds and runs, and rebuilds gather the embeddings from disk instead of re-encoding.
+
+    Attributes:
+        index_path (str): Folder of the PLAID index. Defaults to a new folder per model under `COLBERT_INDEX_DIR`, so concurrent runs never share an index.
+        indexed_docs (dict): Maps every indexed docno to the hash of its text.
+        codebook_docs (int): Number of documents the PLAID codebook was trained on.
     """
     def __init__(self, 
-                 index_path="pylate-index"):
-        self.index_path = index_path
-        self.colbert_model = models.ColBERT(model_name_or_path="lightonai/colbertv2.0", 
-                                            device=get_best_device())
+                 index_path=None,
+                 model_name=COLBERT_MODEL_NAME,
+                 cache_dir="embeddings-cache",
+                 encoder=None):
+        """
+        Args:
+            index_path (str, optional): Folder of the PLAID index. Defaults to `COLBERT_INDEX_DIR/run-<pid>-<random id>`.
+            model_name (str): HuggingFace identifier of the ColBERT checkpoint.
+            cache_dir (str): Directory of the on-disk token embedding cache. If None, documents are always re-encoded (and their embeddings are kept in memory for rebuilds).
+            encoder (models.ColBERT, optional): Already loaded encoder. Defaults to the process-wide instance of `model_name` from `ENCODER_REGISTRY` (weights are loaded once per process).
+        """
+        self.index_path = index_path or os.path.join(COLBERT_INDEX_DIR, f"run-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        self.model_name = model_name
+        if encoder is None:
+            device = get_best_device()
+            encoder = ENCODER_REGISTRY.get(
+                ('colbert', model_name, device),
+                lambda: models.ColBERT(model_name_or_path=model_name, device=device)
+            )
+        self.colbert_model = encoder
+        self.cache = TokenEmbeddingCache(cache_dir, model_name) if cache_dir else None
         self.colbert_retriever = None
         self.doc_map = {} # Maps docid -> folder
+        self.indexed_docs = {}
+        self.codebook_docs = 0
+        self.doc_embeddings = {} # Token embeddings encoded by this process, kept for rebuilds when there is no cache
+        self.active_docs = None
 
-    def train(self, training_data):
+        self._open_index()
+
+    def _manifest_path(self):
+        return os.path.join(self.index_path, COLBERT_INDEX_MANIFEST)
+
+    def _open_index(self):
         """
-        Builds a PLAID index for ColBERT.
-        
-        1. Clears any existing index at `self.index_path`.
-        2. Encodes document `text_blob`s using ColBERT.
-        3. Adds document embeddings to the index.
+        Reopens the PLAID index at `self.index_path` if its sidecar manifest belongs to this checkpoint.
         """
-        if os.path.exists(self.index_path):
-            shutil.rmtree(self.index_path)
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if manifest.get('model_name') != self.model_name:
+            return
 
         colbert_index = indexes.PLAID(
             index_folder=self.index_path,
             index_name="index",
-            override=True,
+            override=False,
         )
         self.colbert_retriever = retrieve.ColBERT(index=colbert_index)
+        self.indexed_docs = {docno: doc['hash'] for docno, doc in manifest['docs'].items()}
+        self.doc_map = {docno: doc['folder'] for docno, doc in manifest['docs'].items()}
+        self.codebook_docs = manifest['codebook_docs']
 
-        texts = []
-        ids = []
-        self.doc_map = {}
+    def _save_manifest(self):
+        """
+        Writes the sidecar manifest of the indexed documents (to a temporary file first, so readers never see a partial manifest).
+        """
+        manifest = {
+            'model_name': self.model_name,
+            'codebook_docs': self.codebook_docs,
+            'docs': {docno: {'hash': key, 'folder': self.doc_map[docno]} for docno, key in self.indexed_docs.items()}
+        }
+        tmp_path = f"{self._manifest_path()}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
 
-        for doc in training_data:
-            texts.append(doc['text_blob'])
-            ids.append(str(doc['docno']))
-            self.doc_map[str(doc['docno'])] = doc['folder']
+    def _encode_documents(self, texts):
+        """
+        Returns the token embeddings of `texts`, encoding only the texts missing from the cache (all of them without a cache).
+        """
+        if self.cache is None:
+            return self.colbert_model.encode(
+                texts,
+                batch_size=512,
+                is_query=False,
+                show_progress_bar=False,
+            )
 
-        doc_embeddings = self.colbert_model.encode(
-            texts,
-            batch_size=512,
-            is_query=False,
-            show_progress_bar=False,
+        hashes = [text_hash(text) for text in texts]
+        missing = self.cache.missing(hashes)
+        if missing:
+            text_by_hash = dict(zip(hashes, texts))
+            new_embeddings = self.colbert_model.encode(
+                [text_by_hash[key] for key in missing],
+                batch_size=512,
+                is_query=False,
+                show_progress_bar=False,
+            )
+            self.cache.add(missing, new_embeddings)
+        return self.cache.gather(hashes)
+
+    def _stored_embeddings(self, docnos):
+        """
+        Returns the token embeddings of `docnos` from memory or from the cache.
+        """
+        if self.cache is None:
+            return [self.doc_embeddings[docno] for docno in docnos]
+        return self.cache.gather([self.indexed_docs[docno] for docno in docnos])
+
+    def _rebuild_index(self):
+        """
+        Builds a new PLAID index (new codebook) from the stored token embeddings (cache, or memory without a cache).
+
+        Without a cache, documents indexed by another process (reopened index) have no embeddings here and are dropped; `train` adds them back when they are requested again.
+        """
+        if os.path.exists(self.index_path):
+            shutil.rmtree(self.index_path)
+
+        colbert_index = indexes.PLAID(
+            index_folder=self.index_path,
+            index_name="index",
+            override=True,
         )
+        self.colbert_retriever = retrieve.ColBERT(index=colbert_index)
 
+        if self.cache is None:
+            ids = [docno for docno in self.indexed_docs if docno in self.doc_embeddings]
+        else:
+            ids = [docno for docno, key in self.indexed_docs.items() if key in self.cache.index]
         colbert_index.add_documents(
             documents_ids=ids,
-            documents_embeddings=doc_embeddings,
+            documents_embeddings=self._stored_embeddings(ids),
         )
+        self.indexed_docs = {docno: self.indexed_docs[docno] for docno in ids}
+        self.codebook_docs = len(ids)
+
+    def train(self, training_data):
+        """
+        Adds the documents of `training_data` to the PLAID index and restricts retrieval to them.
+        
+        1. Hashes every `text_blob` and keeps only the documents that are new (or whose text changed).
+        2. Encodes those documents using ColBERT (or gathers their token embeddings from the cache).
+        3. Adds their embeddings to the index with the existing codebook, or rebuilds the index when it has none yet, a text changed, or it outgrew the codebook (`COLBERT_REBUILD_GROWTH`).
+        4. Masks every other indexed document (`set_active_documents`).
+        """
+        new_docs = {}
+        changed = False
+        for doc in training_data:
+            docno = str(doc['docno'])
+            key = text_hash(doc['text_blob'])
+            if self.indexed_docs.get(docno) == key:
+                continue
+            changed = changed or docno in self.indexed_docs
+            new_docs[docno] = (doc['text_blob'], key, doc['folder'])
+
+        if new_docs:
+            ids = list(new_docs)
+            doc_embeddings = self._encode_documents([new_docs[docno][0] for docno in ids])
+            for docno, embedding in zip(ids, doc_embeddings):
+                if self.cache is None:
+                    self.doc_embeddings[docno] = embedding
+                self.indexed_docs[docno] = new_docs[docno][1]
+                self.doc_map[docno] = new_docs[docno][2]
+
+            if changed or self.colbert_retriever is None or len(self.indexed_docs) > COLBERT_REBUILD_GROWTH * self.codebook_docs:
+                self._rebuild_index()
+            else:
+                self.colbert_retriever.index.add_documents(
+                    documents_ids=ids,
+                    documents_embeddings=doc_embeddings,
+                )
+            self._save_manifest()
+
+        self.set_active_documents([doc['docno'] for doc in training_data])
+
+    def set_active_documents(self, docnos):
+        """
+        Restricts retrieval to a subset of the indexed documents (e.g. one seed's ECF).
+
+        The subset is passed to PLAID as a `subset` filter, so masked documents are never scored.
+
+        Args:
+            docnos (list | None): Document IDs to keep searchable. None searches the whole PLAID index again.
+        """
+        if docnos is None:
+            self.active_docs = None
+            return
+        self.active_docs = [docno for docno in dict.fromkeys(str(docno) for docno in docnos) if docno in self.indexed_docs]
 
     def search(self, query):
         """
         Retrieves top-k documents using ColBERT interaction.
         
         1. Encodes the query.
-        2. Retrieves results from the PLAID index.
+        2. Retrieves results from the PLAID index (only among the active documents, if a subset is set).
         3. Maps internal IDs back to `docno` and `folder`.
         """
+        return self.search_batch({'query': query})[['docno', 'folder', 'score']]
+
+    def search_batch(self, queries):
+        """
+        Encodes all queries in one batch and passes every query embedding to a single `retrieve` call.
+        """
+        qids = list(queries.keys())
+        if not qids or self.active_docs == []:
+            return pd.DataFrame(columns=BATCH_RESULT_COLUMNS)
+
         query_embeddings = self.colbert_model.encode(
-            [query],
+            list(queries.values()),
             batch_size=512,
             is_query=True,
             show_progress_bar=False,
@@ -313,15 +740,18 @@ class ColBERTModel(RetrievalModel):
         results = self.colbert_retriever.retrieve(
             queries_embeddings=query_embeddings,
             k=100, # or 1000
+            subset=self.active_docs,
         )
         
         data = []
-        for item in results[0]:
-            doc_id = str(item['id'])
-            data.append({
-                'docno': doc_id,
-                'folder': self.doc_map.get(doc_id, "Unknown"),
-                'score': item['score']
-            })
+        for qid, query_results in zip(qids, results):
+            for item in query_results:
+                doc_id = str(item['id'])
+                data.append({
+                    'qid': qid,
+                    'docno': doc_id,
+                    'folder': self.doc_map.get(doc_id, "Unknown"),
+                    'score': item['score']
+                })
             
-        return pd.DataFrame(data)
\ No newline at end of file
+        return pd.DataFrame(data, columns=BATCH_RESULT_COLUMNS)
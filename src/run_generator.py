@@ -1,13 +1,19 @@
 import os
-import statistics
+import uuid
 import warnings
-import pandas as pd
-from datetime import datetime
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import torch
 from tqdm import tqdm
 
-from models import BM25Model, EmbeddingsModel, ColBERTModel
+from models import BM25Model, EmbeddingsModel, ColBERTModel, COLBERT_INDEX_DIR
 from evaluator import Evaluator
-from data_loader import DataLoader
+from data_loader import DataLoader, RANDOM_SEED_LIST
+from folder_relations import FolderRelationGraph
+from fusion import fuse_runs, run_to_ranked_lists
+from index_cache import IndexCache
+from model_registry import ENCODER_REGISTRY
 
 warnings.filterwarnings("ignore")
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -28,14 +34,13 @@ RESULTS_PATH = os.path.join(PROJECT_ROOT, 'results', 'RunResults.tsv')
 FOLDER_QRELS_PATH = os.path.join(PROJECT_ROOT, 'qrels', 'formal-folder-qrel.txt')
 BOX_QRELS_PATH = os.path.join(PROJECT_ROOT, 'qrels', 'formal-box-qrel.txt')
 
-RANDOM_SEED_LIST = [1, 42, 100, 300, 333, 777, 999, 2025, 6159, 12345, 19865, 53819,
-                    56782, 62537, 72738, 75259, 81236, 91823, 98665, 98765, 99009, 999777333,
-                    120302, 123865, 170302, 180803, 5122025, 12052024, 12052025, 99000011]
-
 SEARCHING_FIELD_MAP = {'folderlabel': 'F', 'ocr': 'O', 'summary': 'S', 'title': 'T'}
 EXPANSION_NAME_MAP = {'same_box': 'SB', 'same_snc': 'SS', 'similar_snc': 'SMS', 'close_date': 'CD'}
 RFF_WEIGHTS = {'bm25': 1.0, 'embeddings': 0.65, 'colbert': 0.65}
 RRF_R_PARAMETER = 0 
+SHARED_ENCODING_MODELS = ['embeddings', 'colbert']
+RELATION_GRAPH_CACHE_DIR = "relation-graphs"
+RELATION_GRAPH_FILE = 'graph.npz'
 
 class RunGenerator:
     """
@@ -57,6 +62,11 @@ class RunGenerator:
         expansion (list): List of expansion techniques to apply (e.g., ['same_box', 'similar_snc']).
         rrf_input (str): Strategy for fusion ('docs' = Early Fusion, 'folders' = Late Fusion).
         expansion_ceiling_k (int): Rank threshold that expanded results cannot surpass.
+        encode_once (bool): If True, dense models ('embeddings', 'colbert') encode the full collection once per searching field and each seed only masks its ECF documents.
+        bm25_backend (str): 'terrier' (PyTerrier) or 'sparse' (in-memory SciPy engine, no JVM).
+        save_run_files (bool): If True, each seed's ranked lists are also written as a TREC run file (evaluation itself is done in memory).
+        bm25_statistics (str): 'seed' builds one BM25 index per seed (term statistics of the seed's ECF); 'global' indexes the full collection once and filters each seed's results (term statistics of the full collection).
+        embeddings_index (dict): Vector index configuration of the 'embeddings' model (e.g. {'backend': 'faiss-hnsw', 'ef_search': 128}). None keeps brute-force search.
     """
     def __init__(self, 
                  searching_fields=[['title', 'ocr', 'folderlabel', 'summary']],
@@ -67,8 +77,31 @@ class RunGenerator:
                  expansion=[],
                  all_folders_folder_label=False,
                  rrf_input='docs',
-                 expansion_ceiling_k=2
+                 expansion_ceiling_k=2,
+                 encode_once=False,
+                 bm25_backend='terrier',
+                 bm25_statistics='seed',
+                 save_run_files=False,
+                 embeddings_index=None
                  ):
+        # Constructor arguments, used to rebuild the generator inside worker processes
+        self.config = {
+            'searching_fields': searching_fields,
+            'query_fields': query_fields,
+            'run_type': run_type,
+            'models': models,
+            'sampling': sampling,
+            'expansion': expansion,
+            'all_folders_folder_label': all_folders_folder_label,
+            'rrf_input': rrf_input,
+            'expansion_ceiling_k': expansion_ceiling_k,
+            'encode_once': encode_once,
+            'bm25_backend': bm25_backend,
+            'bm25_statistics': bm25_statistics,
+            'save_run_files': save_run_files,
+            'embeddings_index': embeddings_index
+        }
+
         self.searching_fields = searching_fields
         self.query_fields = query_fields
         self.run_type = run_type
@@ -78,68 +111,167 @@ class RunGenerator:
         self.all_folders_folder_label = all_folders_folder_label
         self.rrf_input = rrf_input
         self.expansion_ceiling_k = expansion_ceiling_k
+        self.encode_once = encode_once
+        self.bm25_backend = bm25_backend
+        self.bm25_statistics = bm25_statistics
+        self.save_run_files = save_run_files
+        self.embeddings_index = embeddings_index
+        self.full_collection_models = {}
+        self.colbert_models = {}
+        # PLAID indexes of this run (one per searching field), never shared with concurrent runs
+        self.colbert_index_path = os.path.join(COLBERT_INDEX_DIR, f"run-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+
+        # Expansion relation graphs, built once per ECF (on disk) and shared by every field/model combination
+        self.relation_graph_cache = IndexCache(RELATION_GRAPH_CACHE_DIR)
+        self.relation_graphs = {}
+        self.relations = None
+        self.relations_key = None
+
+        # Models trained once on the full collection and sliced per seed
+        self.full_collection_model_names = []
+        if self.encode_once:
+            self.full_collection_model_names += SHARED_ENCODING_MODELS
+        if self.bm25_statistics == 'global':
+            self.full_collection_model_names.append('bm25')
 
         self.loader = DataLoader(PROJECT_ROOT)
         self.items = self.loader.items
         self.folderMetadata = self.loader.folder_metadata
+        self.folder_metadata_key = self.folderMetadata.fingerprint
         
         self.evaluator = Evaluator(FOLDER_QRELS_PATH, BOX_QRELS_PATH)
     
-    def run_experiments(self):
+    def run_experiments(self, workers=1):
         """
         Main execution loop.
         
         Iterates through all configured field combinations and query types. 
         For 'random' runs, it iterates through a fixed list of random seeds to ensure statistical significance. For 'all_documents', it runs once.
-        Results are saved to disk and evaluated immediately.
+        Results are evaluated immediately, in memory (and optionally saved as TREC run files).
+
+        Args:
+            workers (int): Number of worker processes for 'random' runs. With more than one, seeds run in a process pool (each worker loads the models once and reuses them across its seeds), and the aggregated metrics are computed once all seeds are done.
+                The pool is started once and shared by every searching field / query field combination, so workers are only spawned (and load their models) once.
         """
-        for searching_field in self.searching_fields:
-            for query_field in self.query_fields:
-                # Set current context
-                self.current_searching_field = searching_field
-                self.current_query_field = query_field
+        # One pool for every combination (see `seed_pool`)
+        pool = self.seed_pool(workers) if self.run_type == 'random' and workers > 1 else contextlib.nullcontext()
+        with pool as executor:
+            for searching_field in self.searching_fields:
+                for query_field in self.query_fields:
+                    # Set current context
+                    self.current_searching_field = searching_field
+                    self.current_query_field = query_field
                 
-                print(f"{Style.BOLD}{Style.GREEN}> Running Experiments for:{Style.RESET}")
-                s_fields_str = ', '.join([f for f in searching_field]) if isinstance(searching_field[0], str) else str(searching_field)
-                print(f"\t- {Style.BOLD}Searching fields:{Style.RESET}  {Style.CYAN}{s_fields_str}{Style.RESET}")
-                print(f"\t- {Style.BOLD}Query fields:{Style.RESET}      {Style.CYAN}{self.current_query_field}{Style.RESET}")
-                print(f"\t- {Style.BOLD}Run type:{Style.RESET}          {Style.CYAN}{self.run_type}{Style.RESET}")
-                print(f"\t- {Style.BOLD}Model:{Style.RESET}             {Style.CYAN}{', '.join(self.models)}{Style.RESET}")
-                print(f"\t- {Style.BOLD}Expansion:{Style.RESET}         {Style.CYAN}{', '.join(self.expansion) if self.expansion else 'None'}{Style.RESET}")
-                print(f"\t- {Style.BOLD}RRF Input:{Style.RESET}         {Style.CYAN}{self.rrf_input}{Style.RESET}")
-
-                # Setup Output Directory
-                run_folder_name = self.saving_folder_name()
-                metrics_output_folder = os.path.abspath(f'../all_runs/{run_folder_name}')
-                os.makedirs(metrics_output_folder, exist_ok=True)
-
-                if self.run_type == 'random':
-                    for random_seed in tqdm(RANDOM_SEED_LIST, desc=f"Runs ({run_folder_name})"):
-                        # 1. Execute Run (Delegated to run_single_seed)
-                        results = self.run_single_seed(random_seed, searching_field, query_field)
-
-                        # 2. Save Run File
-                        run_name = f'45-Topics-Random-{random_seed}'
-                        self.evaluator.save_run_file(results, RESULTS_PATH, run_name)
-
-                        # 3. Evaluate & Save Metrics
-                        json_path = os.path.join(metrics_output_folder, f'Random{random_seed}_TopicsFolderMetrics.json')
-                        self.evaluator.evaluate(RESULTS_PATH, json_path)
-
-                    # 4. Generate Aggregate Stats (After all seeds are done)
-                    self.evaluator.generate_aggregated_metrics(metrics_output_folder, 'random')
-
-                elif self.run_type == 'all_documents':
-                    # Single execution
-                    results = self.run_single_seed(0, searching_field, query_field)
-
-                    run_name = '45-Topics-AllDocuments'
-                    self.evaluator.save_run_file(results, RESULTS_PATH, run_name)
-
-                    json_path = os.path.join(metrics_output_folder, 'AllDocuments_TopicsFolderMetrics.json')
-                    self.evaluator.evaluate(RESULTS_PATH, json_path)
+                    print(f"{Style.BOLD}{Style.GREEN}> Running Experiments for:{Style.RESET}")
+                    s_fields_str = ', '.join([f for f in searching_field]) if isinstance(searching_field[0], str) else str(searching_field)
+                    print(f"\t- {Style.BOLD}Searching fields:{Style.RESET}  {Style.CYAN}{s_fields_str}{Style.RESET}")
+                    print(f"\t- {Style.BOLD}Query fields:{Style.RESET}      {Style.CYAN}{self.current_query_field}{Style.RESET}")
+                    print(f"\t- {Style.BOLD}Run type:{Style.RESET}          {Style.CYAN}{self.run_type}{Style.RESET}")
+                    print(f"\t- {Style.BOLD}Model:{Style.RESET}             {Style.CYAN}{', '.join(self.models)}{Style.RESET}")
+                    print(f"\t- {Style.BOLD}Expansion:{Style.RESET}         {Style.CYAN}{', '.join(self.expansion) if self.expansion else 'None'}{Style.RESET}")
+                    print(f"\t- {Style.BOLD}RRF Input:{Style.RESET}         {Style.CYAN}{self.rrf_input}{Style.RESET}")
+
+                    # Setup Output Directory
+                    run_folder_name = self.saving_folder_name()
+                    metrics_output_folder = os.path.abspath(f'../all_runs/{run_folder_name}')
+                    os.makedirs(metrics_output_folder, exist_ok=True)
+
+                    if self.run_type == 'random':
+                        if workers > 1:
+                            self.run_seeds_in_pool(executor, workers, searching_field, query_field, metrics_output_folder, run_folder_name)
+                        else:
+                            for random_seed in tqdm(RANDOM_SEED_LIST, desc=f"Runs ({run_folder_name})"):
+                                self.run_and_evaluate_seed(random_seed, searching_field, query_field, metrics_output_folder, RESULTS_PATH)
+
+                        # 4. Generate Aggregate Stats (After all seeds are done)
+                        self.evaluator.generate_aggregated_metrics(metrics_output_folder, 'random')
+
+                    elif self.run_type == 'all_documents':
+                        # Single execution
+                        results = self.run_single_seed(0, searching_field, query_field)
+
+                        if self.save_run_files:
+                            run_name = '45-Topics-AllDocuments'
+                            self.evaluator.save_run_file(results, RESULTS_PATH, run_name)
+
+                        json_path = os.path.join(metrics_output_folder, 'AllDocuments_TopicsFolderMetrics.json')
+                        self.evaluator.evaluate_results(results, json_path)
                     
-                    self.evaluator.generate_aggregated_metrics(metrics_output_folder, 'all_documents')
+                        self.evaluator.generate_aggregated_metrics(metrics_output_folder, 'all_documents')
+
+        self.print_encoder_metrics()
+
+    def print_encoder_metrics(self):
+        """
+        Prints the load time and memory of every encoder loaded by this process (see `model_registry.ModelRegistry`).
+        """
+        for metrics in ENCODER_REGISTRY.metrics():
+            rss = 'n/a' if metrics['rss_delta_bytes'] is None else f"{metrics['rss_delta_bytes'] / 1024 ** 2:.0f} MB"
+            params = 'n/a' if metrics['parameter_bytes'] is None else f"{metrics['parameter_bytes'] / 1024 ** 2:.0f} MB"
+            print(f"\t- {Style.BOLD}Encoder {metrics['encoder']}:{Style.RESET} {Style.CYAN}loaded in {metrics['load_seconds']:.1f}s, RSS +{rss}, parameters {params}, reused {metrics['hits']}x{Style.RESET}")
+
+    def run_and_evaluate_seed(self, random_seed, searching_field, query_field, metrics_output_folder, run_file_path):
+        """
+        Runs a single random seed and evaluates it (in memory) into its metrics JSON.
+
+        The run file is only written to `run_file_path` when `save_run_files` is enabled.
+        """
+        # 1. Execute Run (Delegated to run_single_seed)
+        results = self.run_single_seed(random_seed, searching_field, query_field)
+
+        # 2. Save Run File (optional side output)
+        if self.save_run_files:
+            run_name = f'45-Topics-Random-{random_seed}'
+            self.evaluator.save_run_file(results, run_file_path, run_name)
+
+        # 3. Evaluate & Save Metrics
+        json_path = os.path.join(metrics_output_folder, f'Random{random_seed}_TopicsFolderMetrics.json')
+        self.evaluator.evaluate_results(results, json_path)
+        return random_seed
+
+    def seed_pool(self, workers):
+        """
+        Starts the process pool that runs the random seeds (see `run_seeds_in_pool`).
+
+        Each worker builds its own RunGenerator (so models are loaded once per worker).
+        Workers are spawned (not forked), since neither the JVM nor CUDA survive a fork.
+        """
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(max_workers=workers, 
+                                   mp_context=context, 
+                                   initializer=_init_seed_worker, 
+                                   initargs=(self.config, workers))
+
+    def run_seeds_in_pool(self, executor, workers, searching_field, query_field, metrics_output_folder, run_folder_name):
+        """
+        Runs every seed of `RANDOM_SEED_LIST` in `executor` (a pool of `workers` processes started by `seed_pool`).
+
+        When run files are saved, each seed writes its own instead of sharing `RESULTS_PATH`.
+        """
+        futures = []
+        for random_seed in RANDOM_SEED_LIST:
+            run_file_path = os.path.join(PROJECT_ROOT, 'results', f'RunResults-Random{random_seed}.tsv')
+            futures.append(executor.submit(_run_seed_worker, random_seed, searching_field, query_field, metrics_output_folder, run_file_path))
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc=f"Runs ({run_folder_name}, {workers} workers)"):
+            future.result()
+
+    def get_seed_model(self, model_name):
+        """
+        Returns the model instance to train on the current seed's ECF.
+
+        Instances are lightweight: encoder weights come from the process-wide `ENCODER_REGISTRY`, so they are loaded once per process and each seed only builds its own index/embeddings.
+        ColBERT is the exception: its incremental PLAID index is kept per searching field and reused by every seed, which only adds the documents not indexed yet.
+        """
+        if model_name == 'bm25':
+            return BM25Model(self.current_searching_field, backend=self.bm25_backend)
+        elif model_name == 'embeddings':
+            return EmbeddingsModel(vector_index=self.embeddings_index)
+        elif model_name == 'colbert':
+            field_key = "-".join(self.current_searching_field)
+            if field_key not in self.colbert_models:
+                self.colbert_models[field_key] = ColBERTModel(index_path=os.path.join(self.colbert_index_path, field_key))
+            return self.colbert_models[field_key]
 
     def run_single_seed(self, random_seed, searching_field, query_field):
         """
@@ -148,13 +280,27 @@ class RunGenerator:
         Steps:
         1. Generates the ECF (sample of training docs).
         2. Prepares training data.
-        3. Builds relations for expansion (if enabled).
+        3. Selects the relation graph for expansion (if enabled; loaded on first use).
         4. Trains all active models.
         5. Generates topic search results.
 
         Returns:
             list: Ranked results for all topics.
         """
+        # 1-4. ECF, training data, relations and models
+        self.train_seed_models(random_seed, searching_field, query_field)
+        
+        # 5. Generate Results
+        results = self.produce_topics_results()
+        return results
+
+    def train_seed_models(self, random_seed, searching_field, query_field):
+        """
+        Prepares a seed for retrieval (steps 1-4 of `run_single_seed`): loads its ECF, formats the training data, selects the expansion relations and trains every active model.
+
+        Returns:
+            list[dict]: The seed's training data.
+        """
         self.current_searching_field = searching_field
         self.current_query_field = query_field
         self.random_seed = random_seed
@@ -168,28 +314,45 @@ class RunGenerator:
         # 2. Prepare Data
         clean_data = self.prepare_training_data()
 
-        # Create relations for expansion
+        # Select relations for expansion (the graph itself is loaded on first use)
         if self.run_type != "all_documents" and self.all_folders_folder_label == False:
-            self.relations = self.create_folder_relations_for_expansion(clean_data)
+            self.select_relations(clean_data)
 
         # 3. Train Models
         self.active_models = {}
         for model_name in self.models:
+            if model_name in self.full_collection_model_names:
+                # Full collection is encoded/indexed once; the seed only selects its documents
+                model = self.get_full_collection_model(model_name)
+                model.set_active_documents([doc['docno'] for doc in clean_data])
+                self.active_models[model_name] = model
+                continue
+
+            model = self.get_seed_model(model_name)
+            model.train(clean_data)
+            self.active_models[model_name] = model
+        return clean_data
+
+    def get_full_collection_model(self, model_name):
+        """
+        Returns a model trained on the full collection for the current searching field (used by `encode_once` and `bm25_statistics='global'`).
+
+        The model is trained on the first request and memoized per (model, searching field), so every seed reuses the same encoded collection.
+        """
+        key = (model_name, tuple(self.current_searching_field))
+        if key not in self.full_collection_models:
             if model_name == 'bm25':
-                model = BM25Model(self.current_searching_field)
+                model = BM25Model(self.current_searching_field, backend=self.bm25_backend)
             elif model_name == 'embeddings':
-                model = EmbeddingsModel()
+                model = EmbeddingsModel(vector_index=self.embeddings_index)
             elif model_name == 'colbert':
-                model = ColBERTModel()
+                model = ColBERTModel(index_path=os.path.join(self.colbert_index_path, "full-" + "-".join(self.current_searching_field)))
 
-            model.train(clean_data)
-            self.active_models[model_name] = model
-        
-        # 4. Generate Results
-        results = self.produce_topics_results()
-        return results
+            model.train(self.prepare_training_data(self.loader.load_all_docs_ecf()))
+            self.full_collection_models[key] = model
+        return self.full_collection_models[key]
 
-    def prepare_training_data(self):
+    def prepare_training_data(self, ecf=None):
         """
         Formats raw metadata into a list of training dictionaries for the models.
         
@@ -197,7 +360,11 @@ class RunGenerator:
         - Text concatenation for dense models ('text_blob').
         - Field selection based on configuration.
         - Special handling for 'ALLFL' (All Folders Label) mode.
+
+        Args:
+            ecf (dict, optional): ECF whose training documents are formatted. Defaults to the current seed's ECF.
         """
+        ecf = ecf if ecf is not None else self.ecf
         trainingSet = []
         current_fields = self.current_searching_field
 
@@ -219,7 +386,7 @@ class RunGenerator:
                 })
         else:
             # Standard Document-level Training
-            for trainingDoc in self.ecf["ExperimentSets"][0]["TrainingDocuments"]: 
+            for trainingDoc in ecf["ExperimentSets"][0]["TrainingDocuments"]: 
                 file = trainingDoc[-10:-4] 
                 folder = self.items[file]['Sushi Folder']
                 
@@ -259,247 +426,154 @@ class RunGenerator:
         
         Handles:
         - Query construction based on topic fields (Title, Description).
-        - Executing search on all active models.
+        - Executing one batched search (all topics at once) per active model.
         - Routing between Early Fusion ('docs') and Late Fusion ('folders').
         - Triggering Expansion logic based on configuration.
+
+        Fusion and expansion also work on the results of all topics at once (see `fusion.fuse_runs` and `FolderRelationGraph.expand_batch`).
         """
-        results = []
         topics = list(self.ecf['ExperimentSets'][0]['Topics'].keys())
-        
-        i = 0
-        for j in range(len(topics)):
-            results.append({})
-            results[i]['Id'] = topics[j]
+        queries = self.build_queries()
+        expand = len(self.expansion) > 0 and self.run_type != 'all_documents'
+
+        # 1. Get Raw Results from all models (one batched search per model)
+        raw_results_map = self.search_active_models(queries)
+
+        # 2. Pipeline Logic Branching
+        if self.rrf_input == 'folders':
+            expanded_map = {}
+            for model_name, raw_df in raw_results_map.items():
+                # Check if it should expand or just take raw scores
+                if expand:
+                    expanded_map[model_name] = self.get_relations().expand_batch(raw_df, self.expansion, self.expansion_ceiling_k)
+                else:
+                    expanded_map[model_name] = raw_df[['qid', 'folder', 'score']]
+
+            if len(self.models) > 1:
+                final_ranked_df = self.apply_folder_level_rrf(expanded_map)
+            else:
+                final_ranked_df = expanded_map[self.models[0]]
 
-            title = self.ecf['ExperimentSets'][0]['Topics'][topics[j]].get('TITLE', '')
-            description = self.ecf['ExperimentSets'][0]['Topics'][topics[j]].get('DESCRIPTION', '')
-            narrative = self.ecf['ExperimentSets'][0]['Topics'][topics[j]].get('NARRATIVE', '')
+        elif self.rrf_input == 'docs':
+            if len(self.models) > 1:
+                fused_docs_df = self.apply_document_level_rrf(raw_results_map)
+            else:
+                fused_docs_df = raw_results_map[self.models[0]]
+
+            # Expand the fused list
+            if expand:
+                final_ranked_df = self.get_relations().expand_batch(fused_docs_df, self.expansion, self.expansion_ceiling_k)
+            else:
+                # If no expansion, just aggregate doc scores to folders
+                final_ranked_df = fused_docs_df.groupby(['qid', 'folder'], as_index=False, sort=False)['score'].max()
+
+        # 3. Sort and Format
+        return run_to_ranked_lists(final_ranked_df, topics)
+    
+    def search_active_models(self, queries):
+        """
+        Runs one batched search per active model.
+
+        Args:
+            queries (dict): {topic_id: query} (see `build_queries`).
+
+        Returns:
+            dict: {model_name: pd.DataFrame} with the 'qid', 'docno', 'folder' and 'score' of every retrieved document.
+        """
+        return {model_name: model_instance.search_batch(queries) for model_name, model_instance in self.active_models.items()}
+
+    def build_queries(self, ecf=None):
+        """
+        Builds the query string of every topic of the ECF for the current query field ('T', 'TD' or 'TDN').
+
+        Returns:
+            dict: {topic_id: query}, in ECF topic order.
+        """
+        ecf = ecf if ecf is not None else self.ecf
+        queries = {}
+        for topic_id, topic in ecf['ExperimentSets'][0]['Topics'].items():
+            title = topic.get('TITLE', '')
+            description = topic.get('DESCRIPTION', '')
+            narrative = topic.get('NARRATIVE', '')
 
             if self.current_query_field == "TDN":
-                query = f"{title} {description} {narrative}".strip()
+                queries[topic_id] = f"{title} {description} {narrative}".strip()
             elif self.current_query_field == "TD":
-                query = f"{title}. {description}".strip()
+                queries[topic_id] = f"{title}. {description}".strip()
             else:
-                query = title.strip()
-
-            # 1. Get Raw Results from all models
-            raw_results_map = {}
-            for model_name, model_instance in self.active_models.items():
-                raw_results_map[model_name] = model_instance.search(query)
-
-            # 2. Pipeline Logic Branching
-            if self.rrf_input == 'folders':
-                expanded_map = {}
-                for model_name, raw_df in raw_results_map.items():
-                    # Check if it should expand or just take raw scores
-                    if len(self.expansion) > 0 and self.run_type != 'all_documents':
-                        expanded_map[model_name] = self.produce_expansion_results(raw_df)
-                    else:
-                        expanded_map[model_name] = raw_df[['folder', 'score']]
-                
-                if len(self.models) > 1:
-                    final_ranked_df = self.apply_folder_level_rrf(expanded_map)
-                else:
-                    final_ranked_df = expanded_map[self.models[0]]
-            
-            elif self.rrf_input == 'docs':
-                if len(self.models) > 1:
-                    fused_docs_df = self.apply_document_level_rrf(raw_results_map)
-                else:
-                    fused_docs_df = raw_results_map[self.models[0]]
-                
-                # Expand the fused list
-                if len(self.expansion) > 0 and self.run_type != 'all_documents':
-                    final_ranked_df = self.produce_expansion_results(fused_docs_df)
-                else:
-                    # If no expansion, just aggregate doc scores to folders
-                    final_ranked_df = fused_docs_df.groupby('folder', as_index=False)['score'].max()
-
-            # 3. Sort and Format
-            if 'score' in final_ranked_df.columns:
-                final_ranked_df = final_ranked_df.sort_values('score', ascending=False)
-            elif 'rrf_score' in final_ranked_df.columns:
-                 final_ranked_df = final_ranked_df.sort_values('rrf_score', ascending=False)
-                 
-            ranked_list = final_ranked_df['folder'].drop_duplicates().tolist()
-            results[i]['RankedList'] = ranked_list
-
-            i += 1
-        return results
-    
+                queries[topic_id] = title.strip()
+        return queries
+
     def apply_document_level_rrf(self, dfs_dict):
         """
-        Performs Reciprocal Rank Fusion on DOCUMENT lists.
-        """
-        processed_dfs = []
-        for model in self.models:
-            df = dfs_dict[model].copy()
-            weight = RFF_WEIGHTS.get(model, 1.0)
-            
-            df = df.sort_values(by='score', ascending=False).reset_index(drop=True)
-            df['rank'] = df.index + 1
-            df['rr_score'] = weight * (1 / (RRF_R_PARAMETER + df['rank']))
-            
-            processed_dfs.append(df[['docno', 'folder', 'rr_score']])
-
-        combined_df = pd.concat(processed_dfs, ignore_index=True)
-        final_df = combined_df.groupby(['docno', 'folder'], as_index=False)['rr_score'].sum()
-        final_df = final_df.rename(columns={'rr_score': 'score'})
-        return final_df.sort_values(by='score', ascending=False).reset_index(drop=True)
+        Performs Reciprocal Rank Fusion on DOCUMENT lists (all topics at once, weighted by `RFF_WEIGHTS`).
+
+        Args:
+            dfs_dict (dict): {model_name: pd.DataFrame} with 'qid', 'docno', 'folder' and 'score'.
+
+        Returns:
+            pd.DataFrame: 'qid', 'docno', 'folder' and the fused 'score', sorted by score within each topic.
+        """
+        return fuse_runs({model: dfs_dict[model] for model in self.models}, keys=['docno', 'folder'], weights=RFF_WEIGHTS, method='rrf', k=RRF_R_PARAMETER)
     
     def apply_folder_level_rrf(self, dfs_dict):
         """
-        Performs Reciprocal Rank Fusion on FOLDER lists.
-        """
-        processed_dfs = []
-        for model in self.models:
-            df = dfs_dict[model].copy()
-            weight = RFF_WEIGHTS.get(model, 1.0)
-            df.sort_values(by='score', ascending=False).reset_index(drop=True)
-            df['rank'] = df.index + 1
-            df['rr_score'] = weight * (1 / (RRF_R_PARAMETER + df['rank']))
-            processed_dfs.append(df[['folder', 'rr_score']])
-
-        combined_df = pd.concat(processed_dfs, ignore_index=True)
-        final_df = combined_df.groupby('folder', as_index=False)['rr_score'].sum()
-        final_df = final_df.rename(columns={'rr_score': 'rrf_score'})
-        final_ranking = final_df.sort_values(by='rrf_score', ascending=False).reset_index(drop=True)
-        return final_ranking[['folder', 'rrf_score']]
+        Performs Reciprocal Rank Fusion on FOLDER lists (all topics at once, weighted by `RFF_WEIGHTS`).
+
+        Each model's rows are ranked by their score; a folder listed several times by a model (one row per document) collects the contribution of every row.
+
+        Args:
+            dfs_dict (dict): {model_name: pd.DataFrame} with 'qid', 'folder' and 'score'.
+
+        Returns:
+            pd.DataFrame: 'qid', 'folder' and the fused 'score', sorted by score within each topic.
+        """
+        return fuse_runs({model: dfs_dict[model] for model in self.models}, keys=['folder'], weights=RFF_WEIGHTS, method='rrf', k=RRF_R_PARAMETER)
     
     def create_folder_relations_for_expansion(self, trainingSet):
         """
         Builds a graph of relationships between training documents and all known folders.
         
-        This dictionary drives the expansion logic. It maps every target folder to lists of 'neighbor' documents from the training set based on heuristics:
+        This graph drives the expansion logic. It maps every target folder to 'neighbor' documents from the training set based on heuristics:
         - Same Box
         - Same SNC (Classification Code)
         - Close Date + Same SNC
         - Similar SNC (Hierarchical match)
-        """
-        def close_enough(item, folder):
-            """Checks if item date falls within folder's start/end dates."""
-            itemDate = item['date']
-            folderStart = folder['date']
-            folderEnd = folder['endDate']
-            if itemDate!='Unknown' and folderStart!='Unknown' and folderEnd!='Unknown':
-                if datetime.strptime(folderStart, '%m/%d/%Y')<datetime.strptime(itemDate, '%Y-%m-%d') and datetime.strptime(folderEnd, '%m/%d/%Y')>datetime.strptime(itemDate, '%Y-%m-%d'):
-                    return True
-            return False
-
-        def similar_snc(snc1, snc2):
-            """Checks if two SNC codes share the same parent hierarchy."""
-            s1=[snc1, '', '']
-            if ' ' in snc1:
-                s1[0], s1[1] = snc1.split()
-                if '-' in s1[1]:
-                    s1[1], s1[2] = s1[1].split('-')
-            s2 = [snc2, '', '']
-            if ' ' in snc2:
-                s2[0], s2[1] = snc2.split()
-                if '-' in s2[1]:
-                    s2[1], s2[2] = s2[1].split('-')
-            if s1[0]==s2[0]:
-                if s1[0]!='POL':
-                    return True
-                elif s1[1]==s2[1]:
-                    return True
-            return False
-
-        relations = {}
-        for folder in self.folderMetadata:
-            relations[folder] = {}
-            relations[folder]['same folder'] = []
-            relations[folder]['same box'] = []
-            relations[folder]['adjacent box'] = []
-            relations[folder]['same snc close date'] = []
-            relations[folder]['same snc'] = []
-            relations[folder]['similar snc'] = []
-
-            for doc in trainingSet:
-                if doc['folder']==folder: # Documents from the same folder as the current one
-                    relations[folder]['same folder'].append(doc['docno'])
-                if doc['box']==self.folderMetadata[folder]['box']: # Documents from the same box as the current one
-                    relations[folder]['same box'].append(doc['docno'])
-                if doc['box'][0]==self.folderMetadata[folder]['box'][0] and abs(int(doc['box'][1:])-int(self.folderMetadata[folder]['box'][1:]))<2: # Documents from the box after
-                    #print(f"For docno {doc['docno']} Box {doc['box']} is adjacent to box {folderMetadata[folder]['box']}")
-                    relations[folder]['adjacent box'].append(doc['docno'])
-                file_snc = self.folderMetadata[doc['folder']]['snc']
-                folder_snc = self.folderMetadata[folder]['snc']
-                if file_snc!='Unknown' and file_snc==folder_snc: # Documents with the same SNC
-                    relations[folder]['same snc'].append(doc['docno']) 
-                    if close_enough(self.items[doc['docno']], self.folderMetadata[folder]):
-                        relations[folder]['same snc close date'].append(doc['docno']) # Documents with same SNC and with date between the start and end of the folder
-                if file_snc!='Unknown' and folder_snc!='Unknown' and similar_snc(file_snc,folder_snc): # Documents with Similar SNC in the first two levels
-                    relations[folder]['similar snc'].append(doc['docno'])
-
-        return relations
-
-    def produce_expansion_results(self, result):
-        """
-        Applies the Expansion logic.
-        
-        1. Takes initial retrieval results (Direct Hits).
-        2. Identifies 'empty' folders that were not retrieved.
-        3. Uses `relations` to find neighbors of retrieved docs pointing to these empty folders.
-        4. Calculates inferred scores based on neighbor evidence.
-        5. Applies 'Safety Ceiling' to ensure inferred results don't outrank top direct hits.
-        """
-        scores = {}
-        folder_score = {}
-        new_folder_scores = {}
-        
-        for i, row in result.iterrows():
-            scores[row['docno']] = row['score']
-            if row['folder'] not in folder_score:
-                folder_score[row['folder']] = row['score']
-            elif row['score'] > folder_score[row['folder']]:
-                folder_score[row['folder']] = row['score']
-
-        for folder in self.relations:
-            if folder not in folder_score: 
-                candidate_sets = []
-                technique_map = {
-                    'same_box': 'same box',
-                    'same_snc': 'same snc',
-                    'close_date': 'same snc close date',
-                    'similar_snc': 'similar snc'
-                }
-
-                for tech_arg in self.expansion:
-                    rel_key = technique_map.get(tech_arg)
-                    if rel_key:
-                        docs = self.relations[folder][rel_key]
-                        valid_docs = {doc for doc in docs if doc in scores}
-                        candidate_sets.append(valid_docs)
-
-                if not candidate_sets:
-                    final_docs = set()
-                else:
-                    final_docs = candidate_sets[0]
-                    for s in candidate_sets[1:]:
-                        final_docs = final_docs.intersection(s)
-
-                expansion_scores = [scores[doc] for doc in final_docs]
 
-                if len(expansion_scores) > 0:
-                    folder_score[folder] = statistics.mean(expansion_scores)
-                    new_folder_scores[folder] = folder_score[folder]
-
-        sorted_scores = sorted(scores.values(), reverse=True)
+        The graph is assembled from precomputed box/SNC/date indexes (see `folder_relations.build_folder_relations`) and stored as sparse folder x document matrices (see `folder_relations.FolderRelationGraph`).
+        """
+        return FolderRelationGraph.build(trainingSet, self.folderMetadata)
 
-        top_score = sorted_scores[min(self.expansion_ceiling_k - 1, len(sorted_scores) - 1)]
-        sorted_new_folder_scores = sorted(new_folder_scores.values(), reverse=True)
+    def select_relations(self, trainingSet):
+        """
+        Points the expansion logic at the relation graph of `trainingSet`, without building it yet.
 
-        if len(sorted_scores)>0 and len(sorted_new_folder_scores)>0 and sorted_new_folder_scores[0] > top_score:
-            penalty = sorted_new_folder_scores[0] - top_score + 0.001
-            for folder in new_folder_scores:
-                folder_score[folder] = max(0, folder_score[folder] - penalty)
-                new_folder_scores[folder] = folder_score[folder]
+        The graph only depends on the training documents (docno, folder, box, date) and the folder metadata, so every searching field, query field and model run on the same ECF shares it.
+        """
+        self.relations_source = trainingSet
+        self.relations_key = IndexCache.make_key(
+            'relations',
+            self.folder_metadata_key,
+            [[doc['docno'], doc['folder'], doc['box'], doc['date']] for doc in trainingSet]
+        )
+        self.relations = self.relation_graphs.get(self.relations_key)
+
+    def get_relations(self):
+        """
+        Returns the relation graph selected by `select_relations`.
 
-        folder_score = dict(sorted(folder_score.items(), key=lambda item: item[1], reverse=True))
-        df = pd.DataFrame(list(folder_score.items()), columns=['folder', 'score'])
+        Graphs are memoized in memory and persisted as NPZ files in `RELATION_GRAPH_CACHE_DIR`, so each ECF's graph is built once, even across processes and runs.
+        """
+        if self.relations is None:
+            def build(directory):
+                os.makedirs(directory)
+                graph = self.create_folder_relations_for_expansion(self.relations_source)
+                graph.save(os.path.join(directory, RELATION_GRAPH_FILE))
 
-        return df
+            entry_path = self.relation_graph_cache.get_or_build(self.relations_key, build)
+            self.relations = FolderRelationGraph.load(os.path.join(entry_path, RELATION_GRAPH_FILE))
+            self.relation_graphs[self.relations_key] = self.relations
+        return self.relations
 
     def saving_folder_name(self):
         """Generates a consistent, descriptive folder name for the experiment results."""
@@ -527,6 +601,24 @@ class RunGenerator:
 
         return f"4perBox-{search_field_name}{uneven}_{expansion_name[:-1]}_{query_fields_name}_{model_name}"
 
+_WORKER_GENERATOR = None
+
+def _init_seed_worker(config, workers):
+    """
+    Process-pool initializer: builds the worker's RunGenerator and splits the CPU threads between workers.
+    """
+    global _WORKER_GENERATOR
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _WORKER_GENERATOR = RunGenerator(**config)
+
+def _run_seed_worker(random_seed, searching_field, query_field, metrics_output_folder, run_file_path):
+    """
+    Process-pool task: runs and evaluates one seed with the worker's RunGenerator.
+    """
+    _WORKER_GENERATOR.current_searching_field = searching_field
+    _WORKER_GENERATOR.current_query_field = query_field
+    return _WORKER_GENERATOR.run_and_evaluate_seed(random_seed, searching_field, query_field, metrics_output_folder, run_file_path)
+
 if __name__ == "__main__":
    gen = RunGenerator()
    gen.run_experiments()
\ No newline at end of file
@@ -0,0 +1,210 @@
+import os
+import re
+import copy
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from nltk.stem.porter import PorterStemmer
+
+# --- Terrier's stopword list (stopword-list.txt of terrier-core, vendored) ---
+STOPWORD_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stopword-list.txt')
+
+# --- Terrier's English tokeniser rules ---
+MAX_TERM_LENGTH = 20
+MAX_DIGITS_PER_TERM = 4
+MAX_REPEATED_CHARS = 3
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_REPEATED_CHARS_PATTERN = re.compile(r'(.)\1{%d,}' % MAX_REPEATED_CHARS)
+
+def load_terrier_stopwords(path=STOPWORD_LIST_PATH):
+    """
+    Loads Terrier's stopword list (one word per line).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return frozenset(line.strip() for line in f if line.strip())
+
+class TermPipeline:
+    """
+    Text analysis mirroring Terrier's default indexing pipeline.
+
+    1. Tokenises on non-alphanumeric characters and lowercases (EnglishTokeniser), dropping tokens longer than 20 characters, with more than 4 digits, or with more than 3 identical consecutive characters.
+    2. Removes the stopwords of Terrier's `stopword-list.txt` (see `load_terrier_stopwords`).
+    3. Applies the original Porter stemmer (as Terrier's PorterStemmer, not NLTK's extended mode).
+
+    Stems are memoized, since the same words recur across documents and queries.
+    """
+    def __init__(self):
+        self.stemmer = PorterStemmer(mode=PorterStemmer.ORIGINAL_ALGORITHM)
+        self.stopwords = load_terrier_stopwords()
+        self._stems = {}
+
+    def __call__(self, text):
+        terms = []
+        for token in _TOKEN_PATTERN.findall(str(text).lower()):
+            if len(token) > MAX_TERM_LENGTH or token in self.stopwords:
+                continue
+            if sum(char.isdigit() for char in token) > MAX_DIGITS_PER_TERM or _REPEATED_CHARS_PATTERN.search(token):
+                continue
+            if token not in self._stems:
+                self._stems[token] = self.stemmer.stem(token)
+            terms.append(self._stems[token])
+        return terms
+
+class SparseBM25:
+    """
+    In-memory BM25/BM25F engine over SciPy sparse matrices (JVM-free alternative to PyTerrier).
+
+    Builds one CSR term-document matrix per field and folds the weighting model into a single document-term weight matrix, so a batch of queries is scored with one sparse matrix product.
+    The formulas follow Terrier's implementations:
+    - BM25:  idf * (k1 + 1) * tf / (k1 * ((1 - b) + b * len / avg_len) + tf) * (k3 + 1) * qtf / (k3 + qtf)
+    - BM25F: idf * tfn / (k1 + tfn) * qtf, with tfn = sum_f w_f * tf_f / ((1 - c_f) + c_f * len_f / avg_len_f)
+    where idf = log2((N - df + 0.5) / (df + 0.5)).
+
+    Attributes:
+        field_params (list | None): One (w, c) pair per field for BM25F (a single field is BM25F on that field, as Terrier's BM25F with w.0/c.0). None means standard BM25.
+    """
+    def __init__(self,
+                 field_params=None,
+                 k1=1.2,
+                 b=0.75,
+                 k3=8.0):
+        self.field_params = field_params
+        self.k1 = k1
+        self.b = b
+        self.k3 = k3
+        self.pipeline = TermPipeline()
+
+        self.vocabulary = {}
+        self.field_tf = []
+        self.weights = None
+
+    @property
+    def is_bm25f(self):
+        return self.field_params is not None
+
+    def fit(self, documents, text_attrs):
+        """
+        Indexes the documents.
+
+        Args:
+            documents (list[dict]): Documents holding the text of every attr in `text_attrs`.
+            text_attrs (list[str]): Fields to index (in the same order as `field_params`).
+        """
+        field_entries = [([], [], []) for _ in text_attrs]
+        for row, doc in enumerate(documents):
+            for field_idx, attr in enumerate(text_attrs):
+                rows, cols, counts = field_entries[field_idx]
+                for term, count in Counter(self.pipeline(doc[attr])).items():
+                    rows.append(row)
+                    cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                    counts.append(count)
+
+        shape = (len(documents), len(self.vocabulary))
+        self.field_tf = [
+            sp.csr_matrix((np.asarray(counts, dtype=np.float64), (rows, cols)), shape=shape)
+            for rows, cols, counts in field_entries
+        ]
+        self.field_lengths = [np.asarray(tf.sum(axis=1)).ravel() for tf in self.field_tf]
+
+        presence = sum(self.field_tf[1:], self.field_tf[0]).astype(bool).astype(np.float64)
+        self.presence = presence.tocsr()
+        self._compute_weights()
+        return self
+
+    def set_field_params(self, field_params):
+        """
+        Changes the BM25F (w, c) pairs and recomputes the weight matrix; the term statistics are reused.
+        """
+        self.field_params = field_params
+        self._compute_weights()
+
+    def restrict_to_queries(self, queries):
+        """
+        Returns a copy of the engine that only keeps the terms of `queries`.
+
+        Term statistics (IDF, field lengths) are unchanged, so the copy scores these queries exactly like the full engine, but `set_field_params` only re-weights a few hundred columns (e.g. for BM25F parameter tuning).
+        """
+        terms = {term for query in queries for term in self.pipeline(query) if term in self.vocabulary}
+        columns = np.array(sorted(self.vocabulary[term] for term in terms), dtype=np.int64)
+
+        engine = copy.copy(self)
+        engine.vocabulary = {term: position for position, term in enumerate(sorted(terms, key=self.vocabulary.get))}
+        engine.field_tf = [tf[:, columns] for tf in self.field_tf]
+        engine.presence = self.presence[:, columns]
+        engine._compute_weights()
+        return engine
+
+    def _compute_weights(self):
+        """
+        Folds term statistics, length normalisation and saturation into the document-term weight matrix.
+        """
+        num_docs = self.presence.shape[0]
+        doc_freq = np.asarray(self.presence.sum(axis=0)).ravel()
+        idf = np.log2((num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        if self.is_bm25f:
+            tfn = None
+            for tf, lengths, (w, c) in zip(self.field_tf, self.field_lengths, self.field_params):
+                avg_length = lengths.mean() if num_docs else 0.0
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    norm = np.where(lengths > 0, w / ((1 - c) + c * lengths / avg_length), 0.0)
+                field_tfn = sp.diags(norm) @ tf
+                tfn = field_tfn if tfn is None else tfn + field_tfn
+
+            weights = tfn.tocsr()
+            weights.data = weights.data / (self.k1 + weights.data)
+        else:
+            tf = sum(self.field_tf[1:], self.field_tf[0]).tocsr()
+            lengths = sum(self.field_lengths[1:], self.field_lengths[0])
+            avg_length = lengths.mean() if num_docs else 0.0
+            doc_k = self.k1 * ((1 - self.b) + self.b * lengths / avg_length)
+
+            weights = tf.copy()
+            row_of_entry = np.repeat(np.arange(num_docs), np.diff(tf.indptr))
+            weights.data = (self.k1 + 1) * tf.data / (doc_k[row_of_entry] + tf.data)
+
+        weights.data = weights.data * idf[weights.indices]
+        self.weights = weights
+
+    def query_matrix(self, queries):
+        """
+        Builds the (terms x queries) matrix of query-term weights. Terms unknown to the index are ignored.
+        """
+        rows, cols, values = [], [], []
+        for col, query in enumerate(queries):
+            for term, qtf in Counter(self.pipeline(query)).items():
+                if term not in self.vocabulary:
+                    continue
+                rows.append(self.vocabulary[term])
+                cols.append(col)
+                values.append(qtf if self.is_bm25f else (self.k3 + 1) * qtf / (self.k3 + qtf))
+        return sp.csr_matrix((values, (rows, cols)), shape=(len(self.vocabulary), len(queries)))
+
+    def rank(self, queries, num_results=1000, active_rows=None):
+        """
+        Scores a batch of queries and returns the ranking of each one.
+
+        Only documents matching at least one query term are ranked (as in Terrier); ties keep index order.
+
+        Args:
+            queries (list[str]): Query strings.
+            num_results (int): Maximum number of documents per query.
+            active_rows (np.ndarray, optional): Boolean mask of the documents allowed in the results.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: For each query, the ranked document rows and their scores.
+        """
+        query_matrix = self.query_matrix(queries)
+        scores = (self.weights @ query_matrix).toarray()
+        matched = (self.presence @ query_matrix.astype(bool).astype(np.float64)).toarray() > 0
+        if active_rows is not None:
+            matched &= active_rows[:, None]
+
+        rankings = []
+        for col in range(len(queries)):
+            rows = np.flatnonzero(matched[:, col])
+            rows = rows[np.argsort(-scores[rows, col], kind='stable')][:num_results]
+            rankings.append((rows, scores[rows, col]))
+        return rankings
@@ -1,17 +1,28 @@
 import os
+import sys
+import copy
 import json
+import time
+import random
+import argparse
 import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import pyterrier as pt
 import pytrec_eval
 from tqdm import tqdm
 
-# Setup PyTerrier
-if not pt.java.started():
-    if os.name == 'nt':
-        os.environ["JAVA_HOME"] = r'C:\Program Files\Java\jdk-11'
-    pt.java.init()
-pt.java.set_log_level('ERROR')
+try:
+    import optuna
+except ImportError:
+    optuna = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from metadata_store import MetadataStore
+from sparse_bm25 import SparseBM25
+from data_loader import DataLoader, RANDOM_SEED_LIST
 
 # --- CONFIGURATION ---
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
@@ -20,36 +31,241 @@ FOLDER_METADATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'folders_metadata', 'F
 FOLDER_QRELS_PATH = os.path.join(PROJECT_ROOT, 'qrels', 'formal-folder-qrel.txt')
 TOPICS_PATH = os.path.join(PROJECT_ROOT, "src", "data_creation", "topics_output.txt")
 ECF_PATH = os.path.join(PROJECT_ROOT, 'ecf', 'random_generated', 'ECF_ALL_TRAINING_SET.json')
+INDEX_DIR = "./tuning_index"
+RESULTS_CSV = "bm25f_tuning_results.csv"
+NUM_RESULTS = 100
+METRIC = 'ndcg_cut_10'
+COMBINATION_CHUNK = 16 # Combinations sent to a worker at once
+ALL_DOCS_ECF = 'all' # 'ecf' label of the results tuned on ECF_ALL_TRAINING_SET.json
+LEGACY_BACKEND = 'terrier' # Backend of the results saved before the 'backend' column existed
 
 # w = weight, c = saturation
 PARAM_GRID = {
     'title':       {'w': [1.0, 2.3, 4.0],       'c': [0.2, 0.5, 0.8]},
-    #'ocr':         {'w': [0.5],       'c': [0.4]},
+    'ocr':         {'w': [0.5],       'c': [0.4]},
     'folderlabel': {'w': [0.5, 1.3, 2.7],       'c': [0.3, 0.65, 0.8]},
     'summary':     {'w': [0.5, 1.0, 2.3],       'c': [0.5, 0.85, 1.5]}
 }
 
+# (low, high) ranges of the adaptive strategies
+PARAM_SPACE = {
+    'title':       {'w': (0.1, 5.0),       'c': (0.05, 1.5)},
+    'ocr':         {'w': (0.0, 3.0),       'c': (0.05, 1.5)},
+    'folderlabel': {'w': (0.1, 5.0),       'c': (0.05, 1.5)},
+    'summary':     {'w': (0.1, 5.0),       'c': (0.05, 1.5)}
+}
+PARAM_DECIMALS = 2 # Proposed values are rounded, so nearby proposals share one evaluation
+SEARCH_STRATEGIES = ['grid', 'coordinate', 'random', 'tpe']
+EVALUATION_BUDGET = 200 # New evaluations per adaptive search (resumed results are free)
+COORDINATE_POINTS = 7 # Values tried per parameter in each coordinate ascent line search
+MAX_STALE_BATCHES = 20 # Random/TPE stop after this many batches without a new combination
+
+def init_pyterrier():
+    """Starts the JVM for PyTerrier (only the 'terrier' backend needs it)."""
+    if not pt.java.started():
+        if os.name == 'nt':
+            os.environ["JAVA_HOME"] = r'C:\Program Files\Java\jdk-11'
+        pt.java.init()
+    pt.java.set_log_level('ERROR')
+
+class CombinationScorer:
+    """
+    Scores BM25F parameter combinations: retrieval of every topic on every tuning collection, folder max-pooling and mean nDCG@10.
+
+    Holds only what scoring needs, so it can be sent to worker processes:
+    - 'sparse' backend: one `SparseBM25` engine per collection, restricted to the query terms (see `SparseBM25.restrict_to_queries`), so a combination only re-weights a few hundred term columns and scores every topic with one sparse product.
+    - 'terrier' backend: the path of each collection's Terrier index (reopened once per process) and one `pt.BatchRetrieve` per combination.
+
+    The `pytrec_eval.RelevanceEvaluator` is built once per process and reused for every combination.
+
+    Attributes:
+        engines (list[SparseBM25]): 'sparse' backend, one engine per collection (e.g. one per seed ECF).
+        folders (list[np.ndarray]): 'sparse' backend, the folder of every document row of each engine.
+        index_dirs (list[str]): 'terrier' backend, one index directory per collection.
+    """
+    def __init__(self, backend, fields, topics_df, qrels, index_dirs=None, engines=None, folders=None):
+        self.backend = backend
+        self.fields = fields
+        self.topics_df = topics_df
+        self.qrels = qrels
+        self.index_dirs = index_dirs
+        self.engines = engines
+        self.folders = folders
+        self._indexes = {}
+        self._evaluator = None
+
+    def __getstate__(self):
+        # Java objects and the pytrec_eval evaluator are rebuilt in each process
+        state = self.__dict__.copy()
+        state['_indexes'] = {}
+        state['_evaluator'] = None
+        return state
+
+    @property
+    def evaluator(self):
+        if self._evaluator is None:
+            self._evaluator = pytrec_eval.RelevanceEvaluator(self.qrels, {METRIC})
+        return self._evaluator
+
+    @property
+    def num_collections(self):
+        return len(self.engines) if self.backend == 'sparse' else len(self.index_dirs)
+
+    def retrieve(self, combination, collection=0):
+        """
+        Runs every topic on one collection with one BM25F configuration ((w, c) per field).
+
+        Returns:
+            pd.DataFrame: 'qid', 'folder' and 'score' of the top `NUM_RESULTS` documents of every topic.
+        """
+        if self.backend == 'sparse':
+            engine = self.engines[collection]
+            engine.set_field_params(list(combination))
+            rankings = engine.rank(self.topics_df['query'].tolist(), num_results=NUM_RESULTS)
+            rows = np.concatenate([ranked_rows for ranked_rows, _ in rankings])
+            return pd.DataFrame({
+                'qid': np.repeat(self.topics_df['qid'].to_numpy(dtype=object), [len(ranked_rows) for ranked_rows, _ in rankings]),
+                'folder': self.folders[collection][rows],
+                'score': np.concatenate([scores for _, scores in rankings])
+            })
+
+        if collection not in self._indexes:
+            init_pyterrier()
+            self._indexes[collection] = pt.IndexFactory.of(os.path.join(self.index_dirs[collection], 'data.properties'))
+
+        # Map the combination to PyTerrier controls (w.0, c.0, w.1, c.1...)
+        controls = {}
+        for i, (w, c) in enumerate(combination):
+            controls[f'w.{i}'] = w
+            controls[f'c.{i}'] = c
+        bm25f = pt.BatchRetrieve(self._indexes[collection], wmodel="BM25F", controls=controls, metadata=['docno', 'folder'], num_results=NUM_RESULTS)
+        return bm25f.transform(self.topics_df)[['qid', 'folder', 'score']]
+
+    def for_topics(self, qids):
+        """
+        Returns a copy of the scorer that only runs and evaluates the topics in `qids` (e.g. the training folds of a cross-validation). Indexes and engines are shared.
+        """
+        qids = set(qids)
+        scorer = copy.copy(self)
+        scorer.topics_df = self.topics_df[self.topics_df['qid'].isin(qids)].reset_index(drop=True)
+        scorer.qrels = {qid: judgments for qid, judgments in self.qrels.items() if qid in qids}
+        scorer._indexes = {}
+        scorer._evaluator = None
+        return scorer
+
+    def folder_run(self, results):
+        """
+        Max-pools document scores per (topic, folder) into the {qid: {folder: score}} run of `pytrec_eval`.
+        """
+        pooled = results.groupby(['qid', 'folder'], sort=False)['score'].max().reset_index()
+        run = {}
+        for qid, folder, score in zip(pooled['qid'].astype(str), pooled['folder'], pooled['score'].astype(float)):
+            run.setdefault(qid, {})[folder] = score
+        return run
+
+    def topic_scores(self, combination):
+        """
+        Returns the nDCG@10 of one combination on every topic: {qid: [nDCG@10 on each collection]}.
+        """
+        scores = {}
+        for collection in range(self.num_collections):
+            metrics = self.evaluator.evaluate(self.folder_run(self.retrieve(combination, collection)))
+            for qid, m in metrics.items():
+                scores.setdefault(qid, []).append(m[METRIC])
+        return scores
+
+    def __call__(self, combination):
+        """
+        Returns the logged parameters and the nDCG@10 of one combination, averaged over every (collection, topic) pair.
+        """
+        ndcg_scores = [score for scores in self.topic_scores(combination).values() for score in scores]
+
+        entry = {}
+        for field_name, (w, c) in zip(self.fields, combination):
+            entry[f'{field_name}_w'] = w
+            entry[f'{field_name}_c'] = c
+        entry['ndcg_10'] = sum(ndcg_scores) / len(ndcg_scores) if ndcg_scores else 0.0
+        return entry
+
 class BM25FTuner:
-    def __init__(self):
+    """
+    Search of the BM25F field weights (w) and saturations (c) on the topics, with folder-level nDCG@10.
+
+    Strategies (see `search`):
+    - 'grid': every combination of `PARAM_GRID`.
+    - 'coordinate': coordinate ascent over `PARAM_SPACE`, one line search per parameter, narrowing the lines when a full pass brings no improvement.
+    - 'random': uniform samples of `PARAM_SPACE`.
+    - 'tpe': Tree-structured Parzen Estimator (Bayesian optimization), with the optional `optuna` package.
+
+    Every evaluated combination is kept (with the label of the ECFs it was tuned on) in `results_csv`. Later searches resume from it: known combinations are never evaluated again, the adaptive strategies start from the best known ones and the budget only counts new evaluations.
+
+    Attributes:
+        backend (str): 'terrier' (PyTerrier BM25F, as in the original tuner and the runs) or 'sparse' (in-memory `SparseBM25`, no JVM).
+        workers (int): Number of worker processes scoring combinations (1 = serial).
+        fields (list): Tuned fields, in the order of PyTerrier's w.0, w.1... index mapping.
+        seeds (list[int] | None): Tune on the sampled ECF of each seed (the sparse setting of the runs). None tunes on ECF_ALL_TRAINING_SET.json.
+        sampling (str): Sampling strategy of the seed ECFs ('uniform' or 'uneven').
+        results_csv (str | None): Where the evaluated combinations are saved (and resumed from). None keeps them in memory only.
+        resume (bool): If False, previous results are ignored and `results_csv` is overwritten.
+    """
+    def __init__(self,
+                 backend='terrier',
+                 workers=1,
+                 fields=['title', 'folderlabel', 'summary'],
+                 seeds=None,
+                 sampling='uniform',
+                 results_csv=RESULTS_CSV,
+                 resume=True):
+        self.backend = backend
+        self.workers = workers
+        self.seeds = seeds
+        self.sampling = sampling
+        self.results_csv = results_csv
         self.load_data()
         self.qrels = self.load_qrels()
-        
+
         # Define fields order strictly to match PyTerrier's w.0, w.1 index mapping
-        self.fields = ['title', 'folderlabel', 'summary']
-        
+        self.fields = fields
+        self.scorer = None
+        self._executor = None
+
+        self.ecf_label = ALL_DOCS_ECF if seeds is None else f"{sampling}:" + ",".join(str(seed) for seed in seeds)
+        self.load_results(resume)
+
+    @classmethod
+    def from_scorer(cls, scorer, ecf_label, workers=1):
+        """
+        Builds a tuner around an already indexed scorer (e.g. restricted to some topics with `CombinationScorer.for_topics`), without loading any data. Its results are only kept in memory.
+        """
+        tuner = cls.__new__(cls)
+        tuner.backend = scorer.backend
+        tuner.workers = workers
+        tuner.fields = scorer.fields
+        tuner.scorer = scorer
+        tuner._executor = None
+        tuner.results_csv = None
+        tuner.ecf_label = ecf_label
+        tuner.load_results(resume=False)
+        return tuner
+
     def load_data(self):
-        """Loads metadata and topics."""
-        with open(ITEMS_METADATA_PATH) as f: self.items = json.load(f)
-        with open(FOLDER_METADATA_PATH) as f: self.folder_metadata = json.load(f)
-        with open(ECF_PATH) as f: self.ecf = json.load(f)
-        
+        """Loads metadata, topics and the tuning ECFs (ECF_ALL_TRAINING_SET.json, or one sampled ECF per seed)."""
+        self.items = MetadataStore.open(ITEMS_METADATA_PATH)
+        self.folder_metadata = MetadataStore.open(FOLDER_METADATA_PATH)
+        if self.seeds is None:
+            with open(ECF_PATH) as f:
+                self.collections = [(ALL_DOCS_ECF, json.load(f))]
+        else:
+            loader = DataLoader(PROJECT_ROOT)
+            self.collections = [(f"Random{seed}", loader.create_random_ecf(seed, self.sampling)) for seed in self.seeds]
+
         # Load Topics
         with open(TOPICS_PATH, 'r', encoding='utf-8') as f:
             topics_raw = json.load(f)
-        
+
         # Convert to DataFrame for PyTerrier
         self.topics_df = pd.DataFrame([
-            {'qid': t['ID'], 'query': t['TITLE'] + ". " + t['DESCRIPTION']} 
+            {'qid': t['ID'], 'query': t['TITLE'] + ". " + t['DESCRIPTION']}
             for t in topics_raw.values()
         ])
 
@@ -63,14 +279,48 @@ class BM25FTuner:
                 qrels[qid][docno] = int(label.strip())
         return qrels
 
-    def prepare_training_data(self):
+    def load_results(self, resume=True):
+        """
+        Loads the previous results of `results_csv` and indexes those of the current backend, fields and ECFs by combination.
+
+        Results saved before the 'ecf' column existed were tuned on ECF_ALL_TRAINING_SET.json, and those without a 'backend' were scored by Terrier. A row matches when it has the same backend and ECFs, every tuned field has values and no other field does (scores of different backends are never mixed).
+        """
+        self.previous_results = pd.DataFrame()
+        self.new_results = []
+        self.evaluated = {}
+        if not resume or self.results_csv is None or not os.path.exists(self.results_csv):
+            return
+
+        self.previous_results = pd.read_csv(self.results_csv)
+        if 'ecf' not in self.previous_results:
+            self.previous_results['ecf'] = ALL_DOCS_ECF
+        self.previous_results['backend'] = self.previous_results.get('backend', pd.Series(index=self.previous_results.index, dtype=object)).fillna(LEGACY_BACKEND)
+
+        param_columns = [column for column in self.previous_results.columns if column.endswith(('_w', '_c'))]
+        tuned_columns = [f'{field}_{param}' for field in self.fields for param in ['w', 'c']]
+        if not set(tuned_columns) <= set(param_columns):
+            return
+        other_columns = [column for column in param_columns if column not in tuned_columns]
+
+        matches = self.previous_results[
+            (self.previous_results['ecf'] == self.ecf_label)
+            & (self.previous_results['backend'] == self.backend)
+            & self.previous_results[tuned_columns].notna().all(axis=1)
+            & self.previous_results[other_columns].isna().all(axis=1)
+        ]
+        for entry in matches.to_dict('records'):
+            entry = {column: entry[column] for column in tuned_columns + ['ndcg_10', 'ecf', 'backend']}
+            self.evaluated[self.combination_of(entry)] = entry
+        print(f">>> Resumed {len(self.evaluated)} evaluated combinations from {self.results_csv}")
+
+    def prepare_training_data(self, ecf):
         """Prepares the generator for indexing."""
-        for trainingDoc in self.ecf["ExperimentSets"][0]["TrainingDocuments"]:
+        for trainingDoc in ecf["ExperimentSets"][0]["TrainingDocuments"]:
             file = trainingDoc[-10:-4]
             if file not in self.items: continue
-            
+
             folder = self.items[file]['Sushi Folder']
-            
+
             # Base data
             doc_entry = {
                 'docno': file,
@@ -91,109 +341,300 @@ class BM25FTuner:
             yield doc_entry
 
     def index_collection(self):
-        """Creates the Terrier index once with all fields."""
-        print(">>> Indexing Collection...")
-        index_dir = "./tuning_index"
-        
-        indexer = pt.IterDictIndexer(
-            index_dir,
-            meta={'docno': 20, 'folder': 20},
-            text_attrs=self.fields, # Index these specific fields
-            meta_reverse=['docno'], 
-            overwrite=True,
-            fields=True
-        )
-        
-        indexref = indexer.index(self.prepare_training_data())
-        self.index = pt.IndexFactory.of(indexref)
+        """Indexes every tuning collection once with all fields (Terrier index or in-memory per-field term statistics)."""
+        print(f">>> Indexing {len(self.collections)} Collection(s)...")
+        if self.backend == 'sparse':
+            engines, folders = [], []
+            for _, ecf in self.collections:
+                documents = list(self.prepare_training_data(ecf))
+                engine = SparseBM25(field_params=[(1.0, 0.5)] * len(self.fields)).fit(documents, self.fields)
+                engines.append(engine.restrict_to_queries(self.topics_df['query'].tolist()))
+                folders.append(np.array([doc['folder'] for doc in documents], dtype=object))
+            self.scorer = CombinationScorer('sparse', self.fields, self.topics_df, self.qrels, engines=engines, folders=folders)
+        else:
+            init_pyterrier()
+            index_dirs = []
+            for name, ecf in self.collections:
+                index_dir = os.path.abspath(INDEX_DIR if name == ALL_DOCS_ECF else os.path.join(INDEX_DIR, name))
+                indexer = pt.IterDictIndexer(
+                    index_dir,
+                    meta={'docno': 20, 'folder': 20},
+                    text_attrs=self.fields, # Index these specific fields
+                    meta_reverse=['docno'],
+                    overwrite=True,
+                    fields=True
+                )
+                indexer.index(self.prepare_training_data(ecf))
+                index_dirs.append(index_dir)
+            self.scorer = CombinationScorer('terrier', self.fields, self.topics_df, self.qrels, index_dirs=index_dirs)
         print(">>> Indexing Complete.")
 
-    def run_grid_search(self):
-        """Iterates through parameter combinations and evaluates."""
-        
-        # 1. Generate all combinations
-        # We need a list of (w, c) tuples for each field
-        keys = self.fields 
-        value_lists = []
-        
-        for field in keys:
-            # Create pairs of (w, c) for this field
-            # e.g., [(1.0, 0.5), (1.0, 0.65), (2.3, 0.5)...]
-            pairs = list(itertools.product(PARAM_GRID[field]['w'], PARAM_GRID[field]['c']))
-            value_lists.append(pairs)
-        
-        # Cartesian product of all field configurations
-        # combination structure: ((w_title, c_title), (w_folder, c_folder), ...)
-        combinations = list(itertools.product(*value_lists))
-        
+    def make_combinations(self, param_grid=PARAM_GRID):
+        """
+        Builds the Cartesian product of the (w, c) pairs of every field.
+
+        Returns:
+            list[tuple]: Combinations ((w_title, c_title), (w_folder, c_folder), ...), in `self.fields` order.
+        """
+        value_lists = [list(itertools.product(param_grid[field]['w'], param_grid[field]['c'])) for field in self.fields]
+        return list(itertools.product(*value_lists))
+
+    def combination_of(self, params):
+        """
+        Builds the (rounded) combination of a {'<field>_w': w, '<field>_c': c} dictionary.
+        """
+        return tuple((round(float(params[f'{field}_w']), PARAM_DECIMALS), round(float(params[f'{field}_c']), PARAM_DECIMALS))
+                     for field in self.fields)
+
+    def evaluate_combinations(self, combinations):
+        """
+        Scores combinations serially, or in a pool of `workers` processes (kept open until `close`; each worker receives the scorer once).
+
+        Returns:
+            list[dict]: One entry per combination (parameters and 'ndcg_10'), in input order.
+        """
+        if self.workers <= 1:
+            return [self.scorer(comb) for comb in tqdm(combinations, desc="Tuning", leave=False)]
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_tuning_worker,
+                                                 initargs=(self.scorer,))
+        chunksize = max(1, min(COMBINATION_CHUNK, len(combinations) // self.workers))
+        return list(tqdm(self._executor.map(_score_combination, combinations, chunksize=chunksize),
+                         total=len(combinations), desc=f"Tuning ({self.workers} workers)", leave=False))
+
+    def close(self):
+        """Shuts the worker pool down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def evaluate(self, combinations, budget=None):
+        """
+        Returns the nDCG@10 of each combination, only scoring those that were never evaluated (in this search or a resumed one).
+
+        Args:
+            combinations (list[tuple]): Combinations, as built by `combination_of`.
+            budget (int, optional): Maximum number of new evaluations; combinations beyond it are not scored and get None.
+
+        Returns:
+            list[float | None]: nDCG@10 of every combination, in input order.
+        """
+        pending = [comb for comb in dict.fromkeys(combinations) if comb not in self.evaluated]
+        if budget is not None:
+            pending = pending[:max(0, budget)]
+
+        for comb, entry in zip(pending, self.evaluate_combinations(pending)):
+            entry['ecf'] = self.ecf_label
+            entry['backend'] = self.backend
+            self.evaluated[comb] = entry
+            self.new_results.append(entry)
+        return [self.evaluated[comb]['ndcg_10'] if comb in self.evaluated else None for comb in combinations]
+
+    def best_combinations(self, n=1):
+        """
+        Returns the `n` best evaluated combinations (current fields and ECFs), best first.
+        """
+        return sorted(self.evaluated, key=lambda comb: self.evaluated[comb]['ndcg_10'], reverse=True)[:n]
+
+    def run_grid_search(self, param_grid=PARAM_GRID):
+        """Evaluates every parameter combination of `param_grid` (combinations already evaluated are skipped)."""
+        combinations = [tuple((round(w, PARAM_DECIMALS), round(c, PARAM_DECIMALS)) for w, c in comb)
+                        for comb in self.make_combinations(param_grid)]
         print(f">>> Starting Grid Search with {len(combinations)} combinations...")
-        
-        results = []
-
-        # 2. Iterate
-        for comb in tqdm(combinations, desc="Tuning"):
-            controls = {}
-            params_log = {}
-            
-            # Map combination back to PyTerrier controls (w.0, c.0, w.1, c.1...)
-            for i, (w, c) in enumerate(comb):
-                controls[f'w.{i}'] = w
-                controls[f'c.{i}'] = c
-                
-                # For logging results later
-                field_name = self.fields[i]
-                params_log[f'{field_name}_w'] = w
-                params_log[f'{field_name}_c'] = c
-
-            # 3. Retrieval
-            # We use BM25F model with dynamic controls
-            bm25f = pt.BatchRetrieve(
-                self.index, 
-                wmodel="BM25F", 
-                controls=controls,
-                metadata=['docno', 'folder'],
-                num_results=100
-            )
-
-            res = bm25f.transform(self.topics_df)
-
-            # 4. Evaluation (In-Memory)
-            # Convert PyTerrier result to pytrec_eval format
-            # Result needs to be mapped to Folder ID if your QRELs are folder-based
-            run_dict = {}
-            for _, row in res.iterrows():
-                qid = str(row['qid'])
-                folder = row['folder']
-                score = float(row['score'])
-                
-                if qid not in run_dict: run_dict[qid] = {}
-                # Handle multiple docs per folder: keep max score for that folder
-                if folder not in run_dict[qid] or score > run_dict[qid][folder]:
-                    run_dict[qid][folder] = score
-
-            evaluator = pytrec_eval.RelevanceEvaluator(self.qrels, {'ndcg_cut_10'})
-            metrics = evaluator.evaluate(run_dict)
-
-            # Calculate Mean nDCG@10
-            ndcg_scores = [m['ndcg_cut_10'] for m in metrics.values()]
-            mean_ndcg = sum(ndcg_scores) / len(ndcg_scores) if ndcg_scores else 0.0
-
-            # Store result
-            entry = {**params_log, 'ndcg_10': mean_ndcg}
-            results.append(entry)
-
-        # 5. Output Results
-        results_df = pd.DataFrame(results)
+        self.evaluate(combinations)
+
+    def sample_combination(self, rng, param_space=PARAM_SPACE):
+        """
+        Draws one uniformly random combination of `param_space`.
+        """
+        return tuple((round(rng.uniform(*param_space[field]['w']), PARAM_DECIMALS), round(rng.uniform(*param_space[field]['c']), PARAM_DECIMALS))
+                     for field in self.fields)
+
+    def run_random_search(self, budget=EVALUATION_BUDGET, param_space=PARAM_SPACE, random_state=0):
+        """Evaluates `budget` new uniformly random combinations of `param_space`."""
+        print(f">>> Starting Random Search with a budget of {budget} evaluations...")
+        rng = random.Random(random_state)
+        spent, stale = 0, 0
+        while spent < budget and stale < MAX_STALE_BATCHES:
+            proposals = set()
+            for _ in range((budget - spent) * 10):
+                comb = self.sample_combination(rng, param_space)
+                if comb not in self.evaluated:
+                    proposals.add(comb)
+                if len(proposals) == budget - spent:
+                    break
+            num_evaluated = len(self.evaluated)
+            self.evaluate(sorted(proposals), budget - spent)
+            spent += len(self.evaluated) - num_evaluated
+            stale = stale + 1 if not proposals else 0
+
+    def run_coordinate_ascent(self, budget=EVALUATION_BUDGET, param_space=PARAM_SPACE):
+        """
+        Coordinate ascent over `param_space`, starting from the best known combination (or the center of the space).
+
+        Each parameter in turn is searched on `COORDINATE_POINTS` evenly spaced values around its current value (the other parameters fixed) and moved to the best one. The first lines span the whole range; after a full pass without improvement their radius is halved, until it is below the rounding precision or the budget of new evaluations is spent.
+        """
+        print(f">>> Starting Coordinate Ascent with a budget of {budget} evaluations...")
+        dimensions = [(field_idx, param_idx) for field_idx in range(len(self.fields)) for param_idx in range(2)]
+        bounds = [param_space[self.fields[field_idx]]['wc'[param_idx]] for field_idx, param_idx in dimensions]
+        radius = [high - low for low, high in bounds]
+
+        if self.evaluated:
+            current = self.best_combinations()[0]
+        else:
+            current = tuple((round(sum(param_space[field]['w']) / 2, PARAM_DECIMALS), round(sum(param_space[field]['c']) / 2, PARAM_DECIMALS))
+                            for field in self.fields)
+        num_evaluated = len(self.evaluated)
+        self.evaluate([current], budget)
+        spent = len(self.evaluated) - num_evaluated
+        if current not in self.evaluated:
+            return
+
+        while spent < budget and max(radius) >= 10 ** -PARAM_DECIMALS:
+            improved = False
+            for dimension, ((field_idx, param_idx), (low, high)) in enumerate(zip(dimensions, bounds)):
+                value = current[field_idx][param_idx]
+                line = []
+                for point in np.linspace(max(low, value - radius[dimension]), min(high, value + radius[dimension]), COORDINATE_POINTS):
+                    pair = list(current[field_idx])
+                    pair[param_idx] = round(float(point), PARAM_DECIMALS)
+                    line.append(current[:field_idx] + (tuple(pair),) + current[field_idx + 1:])
+
+                num_evaluated = len(self.evaluated)
+                scores = self.evaluate(line, budget - spent)
+                spent += len(self.evaluated) - num_evaluated
+
+                best_score, best = max((score, comb) for score, comb in zip(scores, line) if score is not None)
+                if best_score > self.evaluated[current]['ndcg_10']:
+                    current, improved = best, True
+                if spent >= budget:
+                    break
+            if not improved:
+                radius = [r / 2 for r in radius]
+
+    def run_tpe_search(self, budget=EVALUATION_BUDGET, param_space=PARAM_SPACE, random_state=0):
+        """
+        Tree-structured Parzen Estimator search (optuna), warm-started with every known combination that lies in `param_space`.
+
+        Trials are proposed `workers` at a time, so a pool scores them in parallel.
+        """
+        if optuna is None:
+            raise ImportError("The 'tpe' search strategy needs the 'optuna' package.")
+        print(f">>> Starting TPE Search with a budget of {budget} evaluations...")
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+        distributions = {f'{field}_{param}': optuna.distributions.FloatDistribution(*param_space[field][param], step=10 ** -PARAM_DECIMALS)
+                         for field in self.fields for param in ['w', 'c']}
+        study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=random_state))
+        for entry in self.evaluated.values():
+            params = {name: entry[name] for name in distributions}
+            if all(dist.low <= params[name] <= dist.high for name, dist in distributions.items()):
+                study.add_trial(optuna.trial.create_trial(params=params, distributions=distributions, value=entry['ndcg_10']))
+
+        spent, stale = 0, 0
+        while spent < budget and stale < MAX_STALE_BATCHES:
+            trials = [study.ask(distributions) for _ in range(min(max(1, self.workers), budget - spent))]
+            combinations = [self.combination_of(trial.params) for trial in trials]
+
+            num_evaluated = len(self.evaluated)
+            scores = self.evaluate(combinations, budget - spent)
+            new_evaluations = len(self.evaluated) - num_evaluated
+            spent += new_evaluations
+            stale = stale + 1 if new_evaluations == 0 else 0
+
+            for trial, score in zip(trials, scores):
+                study.tell(trial, score, state=None if score is not None else optuna.trial.TrialState.PRUNED)
+
+    def search(self, strategy='grid', budget=EVALUATION_BUDGET, random_state=0):
+        """
+        Runs one search strategy (see `SEARCH_STRATEGIES`), then saves and reports the results.
+
+        Args:
+            strategy (str, optional): 'grid', 'coordinate', 'random' or 'tpe'. Defaults to 'grid'.
+            budget (int, optional): Maximum number of new evaluations of the adaptive strategies. Defaults to `EVALUATION_BUDGET`.
+            random_state (int, optional): Seed of the 'random' and 'tpe' strategies. Defaults to 0.
+
+        Returns:
+            pd.DataFrame: The evaluated combinations of the current fields and ECFs, best first.
+        """
+        if strategy not in SEARCH_STRATEGIES:
+            raise ValueError(f"Unknown search strategy '{strategy}'. Options: {SEARCH_STRATEGIES}.")
+        if self.scorer is None:
+            self.index_collection()
+
+        start = time.perf_counter()
+        num_evaluated = len(self.evaluated)
+        try:
+            if strategy == 'grid':
+                self.run_grid_search()
+            elif strategy == 'coordinate':
+                self.run_coordinate_ascent(budget)
+            elif strategy == 'random':
+                self.run_random_search(budget, random_state=random_state)
+            else:
+                self.run_tpe_search(budget, random_state=random_state)
+        finally:
+            self.close()
+            self.save_results()
+        print(f">>> Evaluated {len(self.evaluated) - num_evaluated} new combinations in {time.perf_counter() - start:.1f}s")
+        return self.report()
+
+    def save_results(self):
+        """Saves the previous and new results to `results_csv`, best first."""
+        if self.results_csv is None:
+            return
+        results_df = pd.concat([self.previous_results, pd.DataFrame(self.new_results)], ignore_index=True)
         results_df = results_df.sort_values(by='ndcg_10', ascending=False)
-        
-        print("\n>>> Top 5 Configurations:")
-        print(results_df.head(5))
-        
-        # Save to CSV
-        results_df.to_csv("bm25f_tuning_results.csv", index=False)
-        print(">>> Full results saved to bm25f_tuning_results.csv")
+        results_df.to_csv(self.results_csv, index=False)
+        print(f">>> Full results saved to {self.results_csv}")
+
+    def report(self):
+        """Prints the top configurations of the current fields and ECFs and the best one as `BM_25_FIELD_WEIGHTS` entries."""
+        results_df = pd.DataFrame(list(self.evaluated.values()))
+        results_df = results_df.sort_values(by='ndcg_10', ascending=False).reset_index(drop=True)
+
+        print(f"\n>>> Top 5 Configurations (ECF: {self.ecf_label}, backend: {self.backend}):")
+        print(results_df.drop(columns=['ecf', 'backend'], errors='ignore').head(5))
+
+        if not results_df.empty:
+            print("\n>>> Best BM_25_FIELD_WEIGHTS:")
+            for field, (w, c) in zip(self.fields, self.best_combinations()[0]):
+                print(f"    '{field}': {{'index_col': '{field}', 'w': {w}, 'c': {c}}},")
+        return results_df
+
+_WORKER_SCORER = None
+
+def _init_tuning_worker(scorer):
+    """
+    Process-pool initializer: keeps the worker's copy of the scorer.
+    """
+    global _WORKER_SCORER
+    _WORKER_SCORER = scorer
+
+def _score_combination(combination):
+    """
+    Process-pool task: scores one combination with the worker's scorer.
+    """
+    return _WORKER_SCORER(combination)
 
 if __name__ == "__main__":
-    tuner = BM25FTuner()
-    tuner.index_collection()
-    tuner.run_grid_search()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Search of the BM25F field weights and saturations (folder nDCG@10 on the topics).")
+    parser.add_argument('--backend', choices=['terrier', 'sparse'], default='terrier')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--strategy', choices=SEARCH_STRATEGIES, default='grid')
+    parser.add_argument('--budget', type=int, default=EVALUATION_BUDGET, help="New evaluations of the adaptive strategies.")
+    parser.add_argument('--fields', nargs='+', choices=list(PARAM_SPACE), default=['title', 'folderlabel', 'summary'])
+    parser.add_argument('--seeds', type=int, nargs='*', default=None, help="Tune on the sampled ECFs of these seeds (all of RANDOM_SEED_LIST if no seed is given) instead of ECF_ALL_TRAINING_SET.json.")
+    parser.add_argument('--sampling', choices=['uniform', 'uneven'], default='uniform')
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--fresh', action='store_true', help="Ignore (and overwrite) the previous results.")
+    args = parser.parse_args()
+    if args.strategy == 'tpe' and optuna is None:
+        parser.error("--strategy tpe needs the 'optuna' package (pip install optuna, pinned in requirements.txt).")
+
+    seeds = args.seeds if args.seeds is None or args.seeds else RANDOM_SEED_LIST
+    tuner = BM25FTuner(backend=args.backend, workers=args.workers, fields=args.fields, seeds=seeds, sampling=args.sampling, resume=not args.fresh)
+    tuner.search(args.strategy, args.budget, args.random_state)
@@ -0,0 +1,208 @@
+import os
+import sys
+import random
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_loader import RANDOM_SEED_LIST
+from tuning_bm25.bm25_tuning import BM25FTuner, SEARCH_STRATEGIES, EVALUATION_BUDGET, PARAM_SPACE, optuna
+
+# --- CONFIGURATION ---
+NUM_FOLDS = 5
+BM25F_FOLDS_CSV = "cv_bm25f_folds.csv"
+FUSION_FOLDS_CSV = "cv_fusion_folds.csv"
+
+def make_folds(qids, num_folds=NUM_FOLDS, random_state=0):
+    """
+    Splits the topics into `num_folds` folds of (nearly) equal size.
+
+    Topic IDs are sorted, shuffled with `random_state` and dealt round-robin, so the same topics always give the same folds (for BM25F and fusion alike).
+
+    Returns:
+        list[list[str]]: The topic IDs of every fold.
+    """
+    qids = sorted(qids)
+    random.Random(random_state).shuffle(qids)
+    return [qids[fold::num_folds] for fold in range(num_folds)]
+
+def training_topics(folds, fold):
+    """Returns the topic IDs of every fold except `fold`."""
+    return [qid for other, qids in enumerate(folds) if other != fold for qid in qids]
+
+def run_bm25f_fold(scorer, ecf_label, fold, train_qids, test_qids, strategy, budget, random_state):
+    """
+    Runs one BM25F cross-validation fold: searches on the training topics, then scores the chosen combination on the held-out ones.
+
+    Args:
+        scorer (CombinationScorer): The indexed scorer of every topic (shared by all folds).
+        ecf_label (str): ECF label of the tuner (the fold is appended to it).
+        fold (int): Fold number.
+        train_qids (list[str]): Topics the parameters are tuned on.
+        test_qids (list[str]): Held-out topics.
+        strategy (str): Search strategy (see `BM25FTuner.search`).
+        budget (int): New evaluations of the adaptive strategies.
+        random_state (int): Seed of the 'random' and 'tpe' strategies.
+
+    Returns:
+        tuple[dict, dict]: The fold's row (chosen parameters, training and held-out nDCG@10) and the held-out nDCG@10 of every topic (mean over collections).
+    """
+    fold_tuner = BM25FTuner.from_scorer(scorer.for_topics(train_qids), f"{ecf_label}|fold{fold}")
+    fold_tuner.search(strategy, budget, random_state)
+    best = fold_tuner.best_combinations()[0]
+
+    topic_scores = scorer.for_topics(test_qids).topic_scores(best)
+    held_out = [score for scores in topic_scores.values() for score in scores]
+
+    row = {'fold': fold}
+    for field_name, (w, c) in zip(fold_tuner.fields, best):
+        row[f'{field_name}_w'] = w
+        row[f'{field_name}_c'] = c
+    row['train_ndcg_10'] = fold_tuner.evaluated[best]['ndcg_10']
+    row['test_ndcg_10'] = sum(held_out) / len(held_out) if held_out else 0.0
+    row['test_qids'] = " ".join(test_qids)
+    return row, {qid: float(np.mean(scores)) for qid, scores in topic_scores.items()}
+
+def cross_validate_bm25f(tuner, num_folds=NUM_FOLDS, strategy='grid', budget=EVALUATION_BUDGET, random_state=0, workers=1):
+    """
+    k-fold topic cross-validation of the BM25F search.
+
+    The collection is indexed once (`tuner.index_collection`) and every fold searches with a copy of the same scorer restricted to its training topics (`CombinationScorer.for_topics`), so no fold re-indexes. Folds run in a pool of `workers` processes, each receiving the scorer once.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: One row per fold (chosen parameters, training and held-out nDCG@10) and the held-out nDCG@10 of every topic.
+    """
+    if tuner.scorer is None:
+        tuner.index_collection()
+    folds = make_folds(tuner.topics_df['qid'], num_folds, random_state)
+    tasks = [(fold, training_topics(folds, fold), test_qids, strategy, budget, random_state) for fold, test_qids in enumerate(folds)]
+
+    if workers <= 1:
+        results = [run_bm25f_fold(tuner.scorer, tuner.ecf_label, *task) for task in tasks]
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=context,
+                                 initializer=_init_cv_worker,
+                                 initargs=(tuner.scorer, tuner.ecf_label)) as executor:
+            futures = [executor.submit(_bm25f_fold_worker, *task) for task in tasks]
+            results = [future.result() for future in as_completed(futures)]
+
+    folds_df = pd.DataFrame([row for row, _ in results]).sort_values(by='fold').reset_index(drop=True)
+    topic_scores = {qid: score for _, scores in results for qid, score in scores.items()}
+    return folds_df, topic_scores
+
+def cross_validate_fusion(tuner, configs, num_folds=NUM_FOLDS, random_state=0):
+    """
+    k-fold topic cross-validation of the fusion weights, RRF k and ceiling_k.
+
+    Every configuration is evaluated once over the cached rankings (`FusionTuner.evaluate`, seeds x topics), then each fold picks the configuration with the best mean nDCG@5 on its training topics and reports it on the held-out ones. Folds only slice that one array, so they cost no extra retrieval or fusion.
+
+    Returns:
+        tuple[pd.DataFrame, dict, pd.Series]: One row per fold (chosen configuration, training and held-out nDCG@5 with its 95% CI), the held-out nDCG@5 of every topic (mean over seeds), and the best configuration tuned on every topic (the optimistic, non cross-validated choice).
+    """
+    state = tuner.state or tuner.load()
+    ndcg = tuner.evaluate(configs)
+    topics = state['topics']
+    folds = make_folds(topics, num_folds, random_state)
+
+    rows, topic_scores = [], {}
+    for fold, test_qids in enumerate(folds):
+        train_qids = training_topics(folds, fold)
+        train_columns = [topics.index(qid) for qid in train_qids]
+        best = int(np.argmax(ndcg[:, :, train_columns].mean(axis=1).mean(axis=1)))
+
+        train = tuner.summarize([configs[best]], ndcg[[best]], train_qids).iloc[0]
+        test = tuner.summarize([configs[best]], ndcg[[best]], test_qids).iloc[0]
+        row = {'fold': fold}
+        row.update({f"{model_name}_w": weight for model_name, weight in configs[best]['weights'].items()})
+        row.update({'k': configs[best]['k'], 'ceiling_k': configs[best]['ceiling_k'],
+                    'train_ndcg_5': train['ndcg_5'], 'test_ndcg_5': test['ndcg_5'],
+                    'test_lower': test['lower'], 'test_upper': test['upper'], 'test_qids': " ".join(map(str, test_qids))})
+        rows.append(row)
+
+        for qid in test_qids:
+            topic_scores[qid] = float(ndcg[best, :, topics.index(qid)].mean())
+    in_sample = tuner.summarize(configs, ndcg).iloc[0]
+    return pd.DataFrame(rows), topic_scores, in_sample
+
+_WORKER_SCORER = None
+_WORKER_ECF_LABEL = None
+
+def _init_cv_worker(scorer, ecf_label):
+    """
+    Process-pool initializer: keeps the worker's copy of the indexed scorer.
+    """
+    global _WORKER_SCORER, _WORKER_ECF_LABEL
+    _WORKER_SCORER = scorer
+    _WORKER_ECF_LABEL = ecf_label
+
+def _bm25f_fold_worker(fold, train_qids, test_qids, strategy, budget, random_state):
+    """
+    Process-pool task: runs one BM25F fold with the worker's scorer.
+    """
+    return run_bm25f_fold(_WORKER_SCORER, _WORKER_ECF_LABEL, fold, train_qids, test_qids, strategy, budget, random_state)
+
+def report(folds_df, topic_scores, metric, output_csv):
+    """Prints the per-fold choices and the cross-validated score (mean over held-out topics), and saves the folds."""
+    print("\n>>> Per-fold Chosen Parameters:")
+    print(folds_df.drop(columns='test_qids').to_string(index=False))
+    print(f"\n>>> Cross-validated {metric} (held-out topics): {np.mean(list(topic_scores.values())):.4f} over {len(topic_scores)} topics")
+    folds_df.to_csv(output_csv, index=False)
+    print(f">>> Per-fold results saved to {output_csv}")
+
+def main():
+    parser = argparse.ArgumentParser(description="k-fold topic cross-validation of the BM25F and fusion tuning (run from src/).")
+    parser.add_argument('--folds', type=int, default=NUM_FOLDS)
+    parser.add_argument('--random-state', type=int, default=0, help="Seed of the fold split (and of the 'random'/'tpe' searches).")
+    targets = parser.add_subparsers(dest='target', required=True)
+
+    bm25f = targets.add_parser('bm25f', help="BM25F field weights and saturations")
+    bm25f.add_argument('--backend', choices=['terrier', 'sparse'], default='terrier')
+    bm25f.add_argument('--strategy', choices=SEARCH_STRATEGIES, default='grid')
+    bm25f.add_argument('--budget', type=int, default=EVALUATION_BUDGET)
+    bm25f.add_argument('--fields', nargs='+', choices=list(PARAM_SPACE), default=['title', 'folderlabel', 'summary'])
+    bm25f.add_argument('--seeds', type=int, nargs='*', default=None, help="Tune on the sampled ECFs of these seeds (all of RANDOM_SEED_LIST if no seed is given).")
+    bm25f.add_argument('--sampling', choices=['uniform', 'uneven'], default='uniform')
+    bm25f.add_argument('--workers', type=int, default=1, help="Folds run in parallel.")
+
+    fusion = targets.add_parser('fusion', help="RRF weights, RRF k and expansion ceiling")
+    fusion.add_argument('--searching-field', nargs='+', default=['title', 'ocr', 'folderlabel', 'summary'])
+    fusion.add_argument('--query-field', default='TD')
+    fusion.add_argument('--models', nargs='+', default=['bm25', 'embeddings', 'colbert'])
+    fusion.add_argument('--expansion', nargs='*', default=['similar_snc'])
+    fusion.add_argument('--rrf-input', choices=['docs', 'folders'], default='docs')
+    fusion.add_argument('--sampling', choices=['uniform', 'uneven'], default='uniform')
+    fusion.add_argument('--weights', nargs='*', help="Weight grid per model, e.g. embeddings=0.5,0.65,1.0 (defaults to WEIGHT_GRID)")
+    fusion.add_argument('--k', nargs='+', type=float, default=None)
+    fusion.add_argument('--ceilings', nargs='+', type=int, default=None)
+    args = parser.parse_args()
+    if args.target == 'bm25f' and args.strategy == 'tpe' and optuna is None:
+        parser.error("--strategy tpe needs the 'optuna' package (pip install optuna, pinned in requirements.txt).")
+
+    if args.target == 'bm25f':
+        seeds = args.seeds if args.seeds is None or args.seeds else RANDOM_SEED_LIST
+        # The folds keep their results in memory, so the tuner's own results CSV is left untouched
+        tuner = BM25FTuner(backend=args.backend, fields=args.fields, seeds=seeds, sampling=args.sampling, results_csv=None)
+        folds_df, topic_scores = cross_validate_bm25f(tuner, args.folds, args.strategy, args.budget, args.random_state, args.workers)
+        report(folds_df, topic_scores, 'nDCG@10', BM25F_FOLDS_CSV)
+    else:
+        # Imported here: the fusion tuner loads the retrieval models (torch), which the BM25F folds never need
+        from tuning_fusion.fusion_tuning import FusionTuner, parse_weight_grid, K_GRID, CEILING_GRID
+        tuner = FusionTuner(searching_field=args.searching_field,
+                            query_field=args.query_field,
+                            models=args.models,
+                            expansion=args.expansion,
+                            rrf_input=args.rrf_input,
+                            sampling=args.sampling)
+        tuner.collect_rankings()
+        configs = tuner.make_configs(parse_weight_grid(args.weights), args.k or K_GRID, args.ceilings or CEILING_GRID)
+        folds_df, topic_scores, in_sample = cross_validate_fusion(tuner, configs, args.folds, args.random_state)
+        report(folds_df, topic_scores, 'nDCG@5', FUSION_FOLDS_CSV)
+        print(f">>> Tuned on every topic (not cross-validated): {in_sample['ndcg_5']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,677 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+import scipy.stats as st
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from run_generator import (RunGenerator, Style, RANDOM_SEED_LIST, RFF_WEIGHTS, RRF_R_PARAMETER,
+                           SEARCHING_FIELD_MAP, FOLDER_QRELS_PATH, BOX_QRELS_PATH)
+from evaluator import Evaluator
+from folder_relations import FolderRelationGraph, TECHNIQUE_RELATIONS
+from fusion import ranked_lists_to_run, rank_within_groups
+
+# --- CONFIGURATION ---
+RANKINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rankings')
+RESULTS_CSV = "fusion_tuning_results.csv"
+NDCG_CUTOFF = 5
+CONFIG_CHUNK = 64 # Configurations scored together (memory grows with topics x folders x chunk)
+
+# RRF is invariant to scaling all weights, so the first model stays at 1.0
+WEIGHT_GRID = {
+    'bm25':       [1.0],
+    'embeddings': [0.0, 0.25, 0.5, 0.65, 0.8, 1.0, 1.5],
+    'colbert':    [0.0, 0.25, 0.5, 0.65, 0.8, 1.0, 1.5]
+}
+K_GRID = [0, 10, 30, 60]
+CEILING_GRID = [1, 3, 5, 10]
+
+def slots_within(codes):
+    """
+    Position of every row among the rows sharing its code (in order of appearance).
+    """
+    order = np.argsort(codes, kind='stable')
+    slots = np.empty(len(codes), dtype=np.int64)
+    slots[order] = np.arange(len(codes)) - np.searchsorted(codes[order], codes[order], side='left')
+    return slots
+
+def rrf_contributions(rank_matrix, k):
+    """
+    1 / (k + rank) of every (row, model) rank, 0 where the model did not retrieve the row.
+    """
+    return np.where(np.isfinite(rank_matrix), 1.0 / (k + rank_matrix), 0.0)
+
+def weighted_sum(contributions, weights):
+    """
+    Weighted RRF scores of every row for a chunk of configurations, summed in model order as in `fusion.fuse_runs`.
+
+    Args:
+        contributions (np.ndarray): Per-model contributions of shape (rows, models).
+        weights (np.ndarray): Model weights of shape (models, configs).
+
+    Returns:
+        np.ndarray: Scores of shape (configs, rows).
+    """
+    scores = np.zeros((weights.shape[1], len(contributions)))
+    for m in range(len(weights)):
+        scores += weights[m][:, None] * contributions[:, m]
+    return scores
+
+def contiguous_runs(values):
+    """
+    Returns the (value, slice) of every run of equal consecutive values.
+    """
+    bounds = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts, ends = np.r_[0, bounds], np.r_[bounds, len(values)]
+    return [(values[start], slice(start, end)) for start, end in zip(starts, ends)]
+
+def group_max(values, rows, starts, sizes):
+    """
+    Max of `values[:, rows]` (configs x rows) over groups of consecutive entries of `rows` starting at `starts`, with `sizes` entries each.
+    """
+    result = values[:, rows[starts]]
+    for offset in range(1, sizes.max(initial=1)):
+        longer = np.flatnonzero(sizes > offset)
+        result[:, longer] = np.maximum(result[:, longer], values[:, rows[starts[longer] + offset]])
+    return result
+
+def top_candidates(topics, slots, scores, num_topics):
+    """
+    Finds the rows that can reach the top `NDCG_CUTOFF` of their (config, topic): those scoring at least the cutoff-th best score.
+
+    Args:
+        topics (np.ndarray): Topic of every row (sorted).
+        slots (np.ndarray): Position of every row within its topic (see `slots_within`).
+        scores (np.ndarray): Scores of shape (configs, rows).
+        num_topics (int): Number of topics.
+
+    Returns:
+        tuple: (config, row) index arrays of the candidates, and the cutoff-th best score of every (config, topic) (-inf when a topic has fewer rows).
+    """
+    width = slots.max() + 1 if len(slots) else 0
+    if width < NDCG_CUTOFF:
+        configs, rows = np.nonzero(np.ones(scores.shape, dtype=bool))
+        return configs, rows, np.full((len(scores), num_topics), -np.inf)
+
+    dense = np.full((len(scores), num_topics * width), -np.inf)
+    dense[:, topics * width + slots] = scores
+    dense = dense.reshape(len(scores), num_topics, width)
+    dense.partition(width - NDCG_CUTOFF, axis=2)
+    threshold = dense[:, :, width - NDCG_CUTOFF]
+    configs, rows = np.nonzero(scores >= np.repeat(threshold, np.bincount(topics, minlength=num_topics), axis=1))
+    return configs, rows, threshold
+
+class FusionTuner:
+    """
+    Tunes the fusion of a RunGenerator configuration (per-model RRF weights, RRF k and the expansion `ceiling_k`) without retraining any model.
+
+    1. `collect_rankings` runs every seed once and persists each model's raw per-topic rankings (and the seed's expansion relation graph) in `rankings_dir`.
+    2. `sweep` replays fusion, expansion and nDCG@5 over the cached rankings for every configuration, vectorized across seeds, topics, folders and a chunk of configurations (see `evaluate`).
+
+    The replay follows `RunGenerator.produce_topics_results` (weighted RRF, folder max-pooling, expansion with the safety ceiling) for whole chunks of configurations, including its tie order (order of first appearance, direct hits before inferred folders), so nDCG@5 matches the pipeline's (up to the rounding of exactly tied inferred scores).
+    Results are summarized like `Evaluator.generate_aggregated_metrics`: per-topic means across seeds, then the mean and 95% CI over topics.
+
+    Attributes:
+        models (list): Names of the fused runs (model names, or any name given to `add_ranked_lists`).
+        expansion (list): Expansion techniques replayed by the sweep (empty for no expansion).
+        rrf_input (str): 'docs' (fuse documents, then expand) or 'folders' (expand each model, then fuse folders), as in RunGenerator.
+        run_dir (str): Folder of this configuration's cached rankings.
+    """
+    def __init__(self,
+                 searching_field=['title', 'ocr', 'folderlabel', 'summary'],
+                 query_field='TD',
+                 models=['bm25', 'embeddings', 'colbert'],
+                 expansion=['similar_snc'],
+                 rrf_input='docs',
+                 sampling='uniform',
+                 seeds=RANDOM_SEED_LIST,
+                 rankings_dir=RANKINGS_DIR,
+                 generator_kwargs=None):
+        self.searching_field = searching_field
+        self.query_field = query_field
+        self.models = models
+        self.expansion = expansion
+        self.rrf_input = rrf_input
+        self.sampling = sampling
+        self.seeds = seeds
+        self.generator_kwargs = generator_kwargs or {}
+        self.run_dir = os.path.join(rankings_dir, self.rankings_name())
+        self.qrels = Evaluator(FOLDER_QRELS_PATH, BOX_QRELS_PATH).qrels
+        self.state = None
+
+    def rankings_name(self):
+        """Name of the rankings folder: searching fields, sampling, query field and models (rankings do not depend on fusion or expansion)."""
+        fields = "".join(SEARCHING_FIELD_MAP.get(field, field) for field in self.searching_field)
+        uneven = "-UNEVEN" if self.sampling == "uneven" else ""
+        return f"{fields}{uneven}_{self.query_field}_{'-'.join(self.models).upper()}"
+
+    def ranking_path(self, model_name, seed):
+        return os.path.join(self.run_dir, model_name, f"Random{seed}.feather")
+
+    def graph_path(self, seed):
+        return os.path.join(self.run_dir, 'graphs', f"Random{seed}.npz")
+
+    def topics_path(self):
+        return os.path.join(self.run_dir, 'topics.json')
+
+    def collect_rankings(self, force=False):
+        """
+        Runs every seed once (training and batched search of all models) and saves the raw rankings and relation graph of each seed.
+
+        Seeds whose files already exist are skipped unless `force`, so an interrupted collection resumes where it stopped.
+        """
+        generator = None
+        for seed in tqdm(self.seeds, desc=f"Collecting rankings ({self.rankings_name()})"):
+            paths = [self.ranking_path(model_name, seed) for model_name in self.models] + [self.graph_path(seed)]
+            if not force and all(os.path.exists(path) for path in paths):
+                continue
+
+            if generator is None:
+                generator = RunGenerator(searching_fields=[self.searching_field],
+                                         query_fields=[self.query_field],
+                                         models=self.models,
+                                         sampling=self.sampling,
+                                         expansion=self.expansion,
+                                         rrf_input=self.rrf_input,
+                                         **self.generator_kwargs)
+
+            generator.train_seed_models(seed, self.searching_field, self.query_field)
+            queries = generator.build_queries()
+            for model_name, ranking in generator.search_active_models(queries).items():
+                self._save_ranking(model_name, seed, ranking[['qid', 'docno', 'folder', 'score']])
+
+            os.makedirs(os.path.dirname(self.graph_path(seed)), exist_ok=True)
+            generator.get_relations().save(self.graph_path(seed))
+            self._save_topics(list(queries.keys()))
+
+    def add_ranked_lists(self, name, seed, results):
+        """
+        Caches final ranked lists ([{'Id': ..., 'RankedList': [...]}, ...]) as the ranking of run `name`, e.g. the outputs fused by `hybrid_models.perform_hybrid_fusion`.
+
+        These rankings are folder lists, so tune them with rrf_input='folders' and no expansion.
+        """
+        self._save_ranking(name, seed, ranked_lists_to_run(results))
+        self._save_topics([item['Id'] for item in results])
+
+    def _save_ranking(self, model_name, seed, ranking):
+        path = self.ranking_path(model_name, seed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ranking.reset_index(drop=True).to_feather(path)
+        self.state = None
+
+    def _save_topics(self, topics):
+        if not os.path.exists(self.topics_path()):
+            with open(self.topics_path(), 'w', encoding='utf-8') as f:
+                json.dump(topics, f)
+
+    def load(self):
+        """
+        Loads the cached rankings into integer-coded arrays (seed x topic queries, folders, per-model ranks) and precomputes everything that does not depend on the fusion configuration.
+        """
+        with open(self.topics_path(), 'r', encoding='utf-8') as f:
+            topics = json.load(f)
+        # Rankings cached with `add_ranked_lists` have no relation graph
+        graphs = []
+        if all(os.path.exists(self.graph_path(seed)) for seed in self.seeds):
+            graphs = [FolderRelationGraph.load(self.graph_path(seed)) for seed in self.seeds]
+        elif self.expansion:
+            raise FileNotFoundError(f"Expansion needs the relation graphs saved by collect_rankings in '{self.run_dir}'.")
+
+        rankings = {model_name: [pd.read_feather(self.ranking_path(model_name, seed)) for seed in self.seeds] for model_name in self.models}
+
+        # Folder axis: folder metadata order (graph rows, identical for every seed), then any other retrieved folder
+        folders = list(graphs[0].folders) if graphs else []
+        folder_index = {folder: idx for idx, folder in enumerate(folders)}
+        for frames in rankings.values():
+            for frame in frames:
+                for folder in pd.unique(frame['folder']):
+                    if folder not in folder_index:
+                        folder_index[folder] = len(folders)
+                        folders.append(folder)
+
+        num_topics = len(topics)
+        topic_index = pd.Index(topics)
+        state = {'topics': topics, 'folders': folders, 'seeds': []}
+
+        # nDCG@5: gain of every (topic, folder) and ideal DCG of every topic
+        gains = np.zeros((num_topics, len(folders)))
+        ideal = np.zeros(num_topics)
+        discounts = 1.0 / np.log2(np.arange(NDCG_CUTOFF) + 2)
+        for t, topic in enumerate(topics):
+            topic_qrels = self.qrels.get(str(topic), {})
+            for folder, relevance in topic_qrels.items():
+                if folder in folder_index:
+                    gains[t, folder_index[folder]] = max(relevance, 0)
+            best = sorted((max(rel, 0) for rel in topic_qrels.values()), reverse=True)[:NDCG_CUTOFF]
+            ideal[t] = np.sum(np.asarray(best) * discounts[:len(best)])
+        state['gains'] = gains
+        state['ideal'] = ideal
+
+        for s in range(len(self.seeds)):
+            graph = graphs[s] if graphs else None
+            if self.rrf_input == 'docs':
+                state['seeds'].append(self._load_docs_seed(rankings, s, topic_index, folder_index, graph))
+            else:
+                state['seeds'].append({
+                    'rankings': [rankings[model_name][s] for model_name in self.models],
+                    'graph': graph,
+                    'topic_index': topic_index,
+                    'folder_index': folder_index,
+                    'lists': {}
+                })
+
+        self.state = state
+        return state
+
+    def _load_docs_seed(self, rankings, s, topic_index, folder_index, graph):
+        """
+        Per-seed arrays of the 'docs' pipeline: one row per retrieved (topic, document) pair with the rank given by every model, its (topic, folder) group, and the expansion candidates.
+        """
+        frames = [rankings[model_name][s].assign(model=m) for m, model_name in enumerate(self.models)]
+        rows = pd.concat(frames, ignore_index=True)
+        topic_codes = topic_index.get_indexer(rows['qid'])
+        rows = rows[topic_codes >= 0]
+        topic_codes = topic_codes[topic_codes >= 0]
+        num_topics, num_folders = len(topic_index), len(folder_index)
+
+        # Ranks per model, as `fusion.fuse_runs` computes them
+        model_codes = rows['model'].to_numpy()
+        ranks = rank_within_groups(model_codes * num_topics + topic_codes, rows['score'].to_numpy(dtype=np.float64))
+
+        pair_codes, pair_keys = pd.factorize(pd.MultiIndex.from_arrays([topic_codes, rows['docno'].to_numpy()]), sort=False)
+        rank_matrix = np.full((len(pair_keys), len(self.models)), np.inf)
+        rank_matrix[pair_codes, model_codes] = ranks
+
+        first_rows = np.unique(pair_codes, return_index=True)[1]
+        pair_topic = topic_codes[first_rows]
+        pair_folder = np.array([folder_index[folder] for folder in rows['folder'].to_numpy()[first_rows]], dtype=np.int64)
+        pair_docno = rows['docno'].to_numpy()[first_rows]
+
+        # Direct hits: pairs sorted by (topic, folder), one group per retrieved folder
+        pair_keys = pair_topic * num_folders + pair_folder
+        direct_order = np.argsort(pair_keys, kind='stable')
+        group_starts = np.flatnonzero(np.diff(pair_keys[direct_order], prepend=-1))
+        group_topic = pair_topic[direct_order][group_starts]
+
+        seed_state = {
+            'rank_matrix': rank_matrix,
+            'pair_topic': pair_topic,
+            'slots': slots_within(pair_topic),
+            'docs_per_topic': np.bincount(pair_topic, minlength=num_topics),
+            'direct_order': direct_order,
+            'group_starts': group_starts,
+            'group_topic': group_topic,
+            'group_folder': pair_folder[direct_order][group_starts],
+            'group_slots': slots_within(group_topic),
+            'rrf': {}
+        }
+
+        relation_keys = [TECHNIQUE_RELATIONS[tech] for tech in self.expansion if tech in TECHNIQUE_RELATIONS]
+        if graph is not None and relation_keys:
+            evidence = graph.incidence[relation_keys[0]]
+            for relation in relation_keys[1:]:
+                evidence = evidence.multiply(graph.incidence[relation])
+            evidence = evidence.tocsr()
+
+            pair_doc = np.array([graph.doc_index.get(docno, -1) for docno in pair_docno], dtype=np.int64)
+            known = pair_doc >= 0
+            hits = np.zeros((len(graph.docnos), num_topics))
+            hits[pair_doc[known], pair_topic[known]] = 1.0
+            counts = (evidence @ hits).T
+
+            # Candidates: (topic, folder) with related retrieved documents and no direct hit
+            retrieved = np.zeros(counts.shape, dtype=bool)
+            in_graph = pair_folder < counts.shape[1]
+            retrieved[pair_topic[in_graph], pair_folder[in_graph]] = True
+            candidate_topic, candidate_folder = np.nonzero((counts > 0) & ~retrieved)
+
+            seed_state.update({
+                'evidence': evidence,
+                'pair_doc': pair_doc,
+                'known': known,
+                'candidate_topic': candidate_topic,
+                'candidate_folder': candidate_folder,
+                'candidate_counts': counts[candidate_topic, candidate_folder]
+            })
+        return seed_state
+
+    def _rrf_state(self, seed_state, k):
+        """
+        Per-k arrays of one seed in 'docs' mode (memoized): the RRF contribution of every model to each pair and, with expansion, the mean contribution of every model over the related documents of each candidate.
+
+        Inferred folder scores are means of fused document scores, hence linear in the weights.
+        """
+        if k not in seed_state['rrf']:
+            contributions = rrf_contributions(seed_state['rank_matrix'], k)
+            rrf = {'contributions': contributions}
+            if 'evidence' in seed_state:
+                known = seed_state['known']
+                num_docs, num_topics, num_models = seed_state['evidence'].shape[1], len(seed_state['docs_per_topic']), contributions.shape[1]
+                doc_scores = np.zeros((num_docs, num_topics, num_models))
+                doc_scores[seed_state['pair_doc'][known], seed_state['pair_topic'][known]] = contributions[known]
+                sums = (seed_state['evidence'] @ doc_scores.reshape(num_docs, -1)).reshape(-1, num_topics, num_models)
+                rrf['inferred'] = sums[seed_state['candidate_folder'], seed_state['candidate_topic']] / seed_state['candidate_counts'][:, None]
+            seed_state['rrf'][k] = rrf
+        return seed_state['rrf'][k]
+
+    def _folder_rows(self, seed_state, ceiling_k):
+        """
+        Returns the (topic, folder) groups of every model's folder list on one seed, expanded with `ceiling_k` when expansion is on (memoized per ceiling).
+        """
+        if ceiling_k not in seed_state['lists']:
+            num_folders = len(seed_state['folder_index'])
+            topics, folders, ranks, models = [], [], [], []
+            for m, ranking in enumerate(seed_state['rankings']):
+                if self.expansion:
+                    folder_list = seed_state['graph'].expand_batch(ranking, self.expansion, ceiling_k)
+                else:
+                    folder_list = ranking[['qid', 'folder', 'score']]
+                topic_codes = seed_state['topic_index'].get_indexer(folder_list['qid'])
+                keep = topic_codes >= 0
+                topics.append(topic_codes[keep])
+                ranks.append(rank_within_groups(topic_codes[keep], folder_list['score'].to_numpy(dtype=np.float64)[keep]))
+                folders.append(np.array([seed_state['folder_index'][folder] for folder in folder_list['folder'].to_numpy()[keep]], dtype=np.int64))
+                models.append(np.full(keep.sum(), m))
+
+            topics, folders = np.concatenate(topics), np.concatenate(folders)
+            row_keys = topics * num_folders + folders
+            _, first_rows, group_codes = np.unique(row_keys, return_index=True, return_inverse=True)
+            seed_state['lists'][ceiling_k] = {
+                'ranks': np.concatenate(ranks),
+                'models': np.concatenate(models),
+                'group_codes': group_codes,
+                'group_topic': topics[first_rows],
+                'group_folder': folders[first_rows],
+                # Ties follow the first appearance of each folder in the lists (models in order), as in `fusion.fuse_runs`
+                'group_ties': first_rows,
+                'group_slots': slots_within(topics[first_rows]),
+                'vectors': {}
+            }
+        return seed_state['lists'][ceiling_k]
+
+    def _folder_vectors(self, rows, k):
+        """
+        Returns the RRF contribution of every model to each group of `_folder_rows` (groups x models, memoized per k).
+
+        Scores are then summed in model order; when one model lists several documents of the same folder (no expansion), its contributions are added before weighting, which only differs from the pipeline by rounding.
+        """
+        if k not in rows['vectors']:
+            vectors = np.zeros((len(rows['group_topic']), len(self.models)))
+            np.add.at(vectors, (rows['group_codes'], rows['models']), 1.0 / (k + rows['ranks']))
+            rows['vectors'][k] = vectors
+        return rows['vectors'][k]
+
+    def make_configs(self, weight_grid=None, k_grid=K_GRID, ceiling_grid=CEILING_GRID):
+        """
+        Builds the Cartesian product of per-model weights, RRF k and ceiling_k (ceiling only with expansion).
+
+        Returns:
+            list[dict]: Configurations {'weights': {model: weight}, 'k': k, 'ceiling_k': ceiling_k}.
+        """
+        weight_grid = weight_grid or WEIGHT_GRID
+        weight_lists = [weight_grid.get(model_name, [RFF_WEIGHTS.get(model_name, 1.0)]) for model_name in self.models]
+        ceilings = ceiling_grid if self.expansion else [None]
+
+        configs = []
+        for weights, k, ceiling_k in itertools.product(itertools.product(*weight_lists), k_grid, ceilings):
+            configs.append({'weights': dict(zip(self.models, weights)), 'k': k, 'ceiling_k': ceiling_k})
+        return configs
+
+    def evaluate(self, configs):
+        """
+        Computes nDCG@5 of every configuration, seed and topic from the cached rankings.
+
+        Configurations are sorted by k (and ceiling_k) and scored in chunks of `CONFIG_CHUNK`, so every k and ceiling covers a contiguous block of a chunk. Scores are (configs x folders) arrays per seed, and only the folders that can reach the top 5 of their (config, topic) are sorted (see `top_candidates`).
+
+        Returns:
+            np.ndarray: nDCG@5 of shape (configs, seeds, topics).
+        """
+        state = self.state or self.load()
+        ndcg = np.zeros((len(configs), len(self.seeds), len(state['topics'])))
+        # 'docs' mode shares the fused documents across ceilings, 'folders' mode the expanded lists across k
+        if self.rrf_input == 'docs':
+            order = sorted(range(len(configs)), key=lambda c: (configs[c]['k'], configs[c]['ceiling_k'] or 0))
+        else:
+            order = sorted(range(len(configs)), key=lambda c: (configs[c]['ceiling_k'] or 0, configs[c]['k']))
+        for start in range(0, len(order), CONFIG_CHUNK):
+            indices = order[start:start + CONFIG_CHUNK]
+            chunk = [configs[c] for c in indices]
+            for s, seed_state in enumerate(state['seeds']):
+                ndcg[indices, s] = self._ndcg(self._candidates(seed_state, chunk), len(chunk), state)
+        return ndcg
+
+    def top_folders(self, config, seed):
+        """
+        Top 5 folders of every topic for one configuration and seed, as replayed by `evaluate` (e.g. to check it against the pipeline).
+
+        Returns:
+            dict: {topic_id: [folder, ...]}.
+        """
+        state = self.state or self.load()
+        candidates = self._candidates(state['seeds'][self.seeds.index(seed)], [config])
+        topic_codes, folder_codes, _, _ = self._top_ranked(candidates, len(state['topics']))
+        top = {topic: [] for topic in state['topics']}
+        for t, f in zip(topic_codes, folder_codes):
+            top[state['topics'][t]].append(state['folders'][f])
+        return top
+
+    def _candidates(self, seed_state, chunk):
+        """
+        Replays a chunk of configurations on one seed with the pipeline of `rrf_input` (see `_docs_candidates` and `_folders_candidates`).
+        """
+        weights = np.array([[config['weights'].get(model_name, 0.0) for config in chunk] for model_name in self.models])
+        ks = np.array([config['k'] for config in chunk], dtype=np.float64)
+        ceilings = np.array([config['ceiling_k'] or 0 for config in chunk], dtype=np.int64)
+        if self.rrf_input == 'docs':
+            return self._docs_candidates(seed_state, weights, ks, ceilings)
+        return self._folders_candidates(seed_state, weights, ks, ceilings)
+
+    def _docs_candidates(self, seed_state, weights, ks, ceilings):
+        """
+        Replays document-level RRF, folder max-pooling and expansion for a chunk of configurations.
+
+        Returns:
+            tuple: (topic, folder, config, score, tie order) arrays of the folders that can reach the top 5; a lower tie order ranks first among equal scores.
+        """
+        num_topics = len(seed_state['docs_per_topic'])
+        runs = contiguous_runs(ks)
+
+        # 1. Weighted RRF over all (topic, document) pairs, for every configuration
+        fused = np.zeros((len(ks), len(seed_state['rank_matrix'])))
+        for k, columns in runs:
+            fused[columns] = weighted_sum(self._rrf_state(seed_state, k)['contributions'], weights[:, columns])
+
+        # 2. Direct hits: max document score per (topic, folder)
+        order, starts = seed_state['direct_order'], seed_state['group_starts']
+        sizes = np.diff(starts, append=len(order))
+        group_scores = group_max(fused, order, starts, sizes)
+        configs, groups, fifth_best = top_candidates(seed_state['group_topic'], seed_state['group_slots'], group_scores, num_topics)
+        scores = group_scores[configs, groups]
+
+        # Ties follow the first document reaching the max (only needed for the candidates)
+        entries = np.repeat(np.arange(len(groups)), sizes[groups])
+        offsets = np.arange(len(entries)) - np.repeat(np.cumsum(sizes[groups]) - sizes[groups], sizes[groups])
+        pairs = order[starts[groups][entries] + offsets]
+        at_max = fused[configs[entries], pairs] == scores[entries]
+        ties = np.full(len(groups), len(order))
+        np.minimum.at(ties, entries[at_max], pairs[at_max])
+
+        direct = (seed_state['group_topic'][groups], seed_state['group_folder'][groups], configs, scores, ties)
+        if 'evidence' not in seed_state:
+            return direct
+
+        # 3. Inferred folders: mean fused score of the related retrieved documents
+        values = np.zeros((len(ks), len(seed_state['candidate_topic'])))
+        for k, columns in runs:
+            values[columns] = weights[:, columns].T @ self._rrf_state(seed_state, k)['inferred'].T
+
+        # 4. Safety ceiling: the ceiling_k-th best document score of each topic
+        width = max(1, seed_state['docs_per_topic'].max())
+        ranked_docs = np.full((len(ks), num_topics * width), np.inf)
+        ranked_docs[:, seed_state['pair_topic'] * width + seed_state['slots']] = -fused
+        ranked_docs = ranked_docs.reshape(len(ks), num_topics, width)
+        positions = np.clip(np.minimum(ceilings[:, None] - 1, seed_state['docs_per_topic'][None, :] - 1), 0, None)
+        ranked_docs.partition(positions.max(), axis=2)
+        ranked_docs = np.sort(ranked_docs[:, :, :positions.max() + 1], axis=2)
+        top_score = -np.take_along_axis(ranked_docs, positions[:, :, None], axis=2)[:, :, 0]
+
+        candidate_topic = seed_state['candidate_topic']
+        counts = np.bincount(candidate_topic, minlength=num_topics)
+        topic_starts = np.searchsorted(candidate_topic, np.arange(num_topics))
+        best_new = np.full((len(ks), num_topics), -np.inf)
+        has_candidates = counts > 0
+        best_new[:, has_candidates] = np.maximum.reduceat(values, topic_starts[has_candidates], axis=1)
+        penalty = np.where(best_new > top_score, best_new - top_score + 0.001, 0.0)
+
+        # Inferred folders rank after direct hits with the same score, so they must beat the 5th best direct hit
+        # (shifting only lowers scores, so that filter can run before the shift)
+        configs, rows = np.nonzero(values > np.repeat(fifth_best, counts, axis=1))
+        topics = candidate_topic[rows]
+        inferred_scores = values[configs, rows]
+        shift = penalty[configs, topics]
+        inferred_scores = np.where(shift > 0, np.maximum(0, inferred_scores - shift), inferred_scores)
+
+        # Inferred folders follow folder metadata order
+        folders = seed_state['candidate_folder'][rows]
+        inferred = (topics, folders, configs, inferred_scores, len(order) + folders)
+        return tuple(np.concatenate(arrays) for arrays in zip(direct, inferred))
+
+    def _folders_candidates(self, seed_state, weights, ks, ceilings):
+        """
+        Replays folder-level RRF over the (expanded) folder lists of every model for a chunk of configurations (same output as `_docs_candidates`).
+        """
+        num_topics = len(seed_state['topic_index'])
+        parts = []
+        for ceiling_k, columns in contiguous_runs(ceilings):
+            rows = self._folder_rows(seed_state, int(ceiling_k))
+            group_scores = np.zeros((columns.stop - columns.start, len(rows['group_topic'])))
+            for k, sub_columns in contiguous_runs(ks[columns]):
+                group_scores[sub_columns] = weighted_sum(self._folder_vectors(rows, k), weights[:, columns][:, sub_columns])
+
+            configs, groups, _ = top_candidates(rows['group_topic'], rows['group_slots'], group_scores, num_topics)
+            parts.append((rows['group_topic'][groups], rows['group_folder'][groups], columns.start + configs,
+                          group_scores[configs, groups], rows['group_ties'][groups]))
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def _top_ranked(self, candidates, num_topics):
+        """
+        Keeps the top-5 candidates of every (config, topic).
+
+        Candidates are ordered by (score, tie order) before the first 5 of each (config, topic) are kept, so ties at the cutoff resolve as in the pipeline.
+
+        Returns:
+            tuple: (topic, folder, config, position) arrays of the kept candidates, in rank order.
+        """
+        topic_codes, folder_codes, config_codes, scores, ties = candidates
+        order = np.lexsort((ties, -scores, topic_codes, config_codes))
+        topic_codes, folder_codes, config_codes = topic_codes[order], folder_codes[order], config_codes[order]
+
+        groups = config_codes * num_topics + topic_codes
+        positions = np.arange(len(groups)) - np.searchsorted(groups, groups, side='left')
+        keep = positions < NDCG_CUTOFF
+        return topic_codes[keep], folder_codes[keep], config_codes[keep], positions[keep]
+
+    def _ndcg(self, candidates, num_configs, state):
+        """
+        nDCG@5 of every (config, topic) from its top-5 candidates (see `_top_ranked`).
+
+        Returns:
+            np.ndarray: nDCG@5 of shape (configs, topics).
+        """
+        num_topics = len(state['topics'])
+        topic_codes, folder_codes, config_codes, positions = self._top_ranked(candidates, num_topics)
+
+        discounts = 1.0 / np.log2(np.arange(NDCG_CUTOFF) + 2)
+        gains = state['gains'][topic_codes, folder_codes] * discounts[positions]
+        groups = config_codes * num_topics + topic_codes
+        dcg = np.bincount(groups, weights=gains, minlength=num_configs * num_topics).reshape(num_configs, num_topics)
+        return np.divide(dcg, state['ideal'][None, :], out=np.zeros_like(dcg), where=state['ideal'][None, :] > 0)
+
+    def summarize(self, configs, ndcg, qids=None):
+        """
+        Summarizes nDCG@5 per configuration like `Evaluator.generate_aggregated_metrics`: per-topic means across seeds, then their mean and 95% CI.
+
+        Args:
+            configs (list[dict]): The evaluated configurations.
+            ndcg (np.ndarray): Output of `evaluate`.
+            qids (list, optional): Topics to summarize (e.g. the training folds of a cross-validation). Defaults to every topic.
+
+        Returns:
+            pd.DataFrame: One row per configuration (weights, k, ceiling_k, ndcg_5, margin, lower, upper), best first.
+        """
+        topics = self.state['topics']
+        columns = [topics.index(qid) for qid in qids] if qids is not None else list(range(len(topics)))
+        topic_means = ndcg[:, :, columns].mean(axis=1)
+
+        num_topics = topic_means.shape[1]
+        means = topic_means.mean(axis=1)
+        if num_topics > 1:
+            sem = topic_means.std(axis=1, ddof=1) / np.sqrt(num_topics)
+            margins = np.where(means == 0.0, 0.0, st.t.ppf(0.975, df=num_topics - 1) * sem)
+        else:
+            margins = np.zeros_like(means)
+
+        rows = []
+        for config, mean, margin in zip(configs, means, margins):
+            row = {f"{model_name}_w": weight for model_name, weight in config['weights'].items()}
+            row.update({'k': config['k'], 'ceiling_k': config['ceiling_k'], 'ndcg_5': mean, 'margin': margin,
+                        'lower': max(0.0, mean - margin), 'upper': min(1.0, mean + margin)})
+            rows.append(row)
+        return pd.DataFrame(rows).sort_values(by='ndcg_5', ascending=False, kind='stable').reset_index(drop=True)
+
+    def sweep(self, configs=None, qids=None):
+        """
+        Evaluates every configuration (default: `make_configs()`) over the cached rankings and summarizes them (see `summarize`).
+        """
+        configs = configs or self.make_configs()
+        start = time.perf_counter()
+        ndcg = self.evaluate(configs)
+        elapsed = time.perf_counter() - start
+        print(f"{Style.BOLD}{Style.GREEN}> Evaluated {len(configs)} fusion configurations x {len(self.seeds)} seeds in {elapsed:.1f}s{Style.RESET}")
+        return self.summarize(configs, ndcg, qids)
+
+def parse_weight_grid(values):
+    """Parses ['model=w1,w2', ...] into {model: [w1, w2]}."""
+    grid = {}
+    for value in values or []:
+        model_name, weights = value.split('=')
+        grid[model_name] = [float(weight) for weight in weights.split(',')]
+    return grid or None
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunes RRF weights, RRF k and the expansion ceiling over cached per-model rankings (run from src/).")
+    parser.add_argument('--searching-field', nargs='+', default=['title', 'ocr', 'folderlabel', 'summary'])
+    parser.add_argument('--query-field', default='TD')
+    parser.add_argument('--models', nargs='+', default=['bm25', 'embeddings', 'colbert'])
+    parser.add_argument('--expansion', nargs='*', default=['similar_snc'])
+    parser.add_argument('--rrf-input', choices=['docs', 'folders'], default='docs')
+    parser.add_argument('--sampling', choices=['uniform', 'uneven'], default='uniform')
+    parser.add_argument('--weights', nargs='*', help="Weight grid per model, e.g. embeddings=0.5,0.65,1.0 (defaults to WEIGHT_GRID)")
+    parser.add_argument('--k', nargs='+', type=float, default=K_GRID)
+    parser.add_argument('--ceilings', nargs='+', type=int, default=CEILING_GRID)
+    parser.add_argument('--force', action='store_true', help="Re-collect rankings even if they are cached")
+    args = parser.parse_args()
+
+    tuner = FusionTuner(searching_field=args.searching_field,
+                        query_field=args.query_field,
+                        models=args.models,
+                        expansion=args.expansion,
+                        rrf_input=args.rrf_input,
+                        sampling=args.sampling)
+    tuner.collect_rankings(force=args.force)
+
+    results = tuner.sweep(tuner.make_configs(parse_weight_grid(args.weights), args.k, args.ceilings))
+    print("\n>>> Top 5 Configurations:")
+    print(results.head(5))
+    print(f">>> Current RunGenerator setting: RFF_WEIGHTS={RFF_WEIGHTS}, RRF_R_PARAMETER={RRF_R_PARAMETER}")
+
+    results.to_csv(RESULTS_CSV, index=False)
+    print(f">>> Full results saved to {RESULTS_CSV}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import json
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+VECTOR_INDEX_CONFIG_FILE = 'vector_index.json'
+
+def normalize(embeddings):
+    """
+    L2-normalizes rows (as float32), so that inner product equals cosine similarity.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+class VectorIndex(ABC):
+    """
+    Abstract nearest-neighbour index over L2-normalized embeddings (cosine similarity).
+
+    Every backend exposes the same contract:
+    - `build(embeddings)` indexes a (docs x dim) matrix; row positions are the document IDs.
+    - `search(queries, k, active_rows)` returns the (scores, rows) of the `k` best documents per query, optionally restricted to `active_rows` (e.g. one seed's ECF). Missing results are padded with row -1.
+    - `save(directory)` / `VectorIndex.load(directory)` persist the index with its configuration.
+
+    Attributes:
+        params (dict): Backend knobs (recall/latency trade-offs), saved with the index.
+    """
+    backend = None
+
+    def __init__(self, **params):
+        self.params = params
+        self.num_vectors = 0
+
+    @abstractmethod
+    def build(self, embeddings):
+        pass
+
+    @abstractmethod
+    def search(self, queries, k, active_rows=None):
+        pass
+
+    @abstractmethod
+    def _save(self, directory):
+        pass
+
+    @abstractmethod
+    def _load(self, directory):
+        pass
+
+    def save(self, directory):
+        """
+        Writes the index and its configuration to `directory`.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._save(directory)
+        with open(os.path.join(directory, VECTOR_INDEX_CONFIG_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'backend': self.backend, 'params': self.params, 'num_vectors': self.num_vectors}, f)
+
+    @staticmethod
+    def load(directory):
+        """
+        Loads an index written by `save`, whatever its backend.
+        """
+        with open(os.path.join(directory, VECTOR_INDEX_CONFIG_FILE), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        index = make_vector_index(config['backend'], **config['params'])
+        index._load(directory)
+        index.num_vectors = config['num_vectors']
+        return index
+
+class NumpyFlatIndex(VectorIndex):
+    """
+    Exact search with a NumPy matrix product (no extra dependency). Masks are applied before scoring.
+    """
+    backend = 'numpy'
+
+    def build(self, embeddings):
+        self.embeddings = normalize(embeddings)
+        self.num_vectors = len(self.embeddings)
+        return self
+
+    def search(self, queries, k, active_rows=None):
+        queries = normalize(queries)
+        candidates = np.arange(self.num_vectors) if active_rows is None else np.asarray(active_rows)
+        k = min(k, len(candidates))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        scores = queries @ self.embeddings[candidates].T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), candidates[top]
+
+    def _save(self, directory):
+        np.save(os.path.join(directory, 'embeddings.npy'), self.embeddings)
+
+    def _load(self, directory):
+        self.embeddings = np.load(os.path.join(directory, 'embeddings.npy'), mmap_mode='r')
+
+class FaissIndex(VectorIndex):
+    """
+    Index backed by faiss (inner-product metric). Masks are passed to faiss as an `IDSelectorBatch`, so filtering happens during the search instead of after it.
+
+    Backends and knobs:
+    - 'faiss-flat': exact search.
+    - 'faiss-ivf': inverted lists; `nlist` (default 4 * sqrt(N)) clusters, `nprobe` (default 8) clusters visited per query.
+    - 'faiss-hnsw': HNSW graph; `M` (default 32) links per node, `ef_construction` (default 200), `ef_search` (default 128, raised to k when smaller).
+    """
+    def __init__(self, backend, **params):
+        if faiss is None:
+            raise ImportError("The faiss vector index backends need the 'faiss-cpu' package.")
+        super().__init__(**params)
+        self.backend = backend
+        self.index = None
+
+    def build(self, embeddings):
+        embeddings = normalize(embeddings)
+        self.num_vectors, dim = embeddings.shape
+
+        if self.backend == 'faiss-flat':
+            self.index = faiss.IndexFlatIP(dim)
+        elif self.backend == 'faiss-ivf':
+            nlist = self.params.get('nlist') or max(1, int(4 * np.sqrt(self.num_vectors)))
+            nlist = min(nlist, self.num_vectors)
+            self.params['nlist'] = nlist
+            self.quantizer = faiss.IndexFlatIP(dim)
+            self.index = faiss.IndexIVFFlat(self.quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            self.index.train(embeddings)
+        elif self.backend == 'faiss-hnsw':
+            self.index = faiss.IndexHNSWFlat(dim, self.params.get('M', 32), faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = self.params.get('ef_construction', 200)
+        else:
+            raise ValueError(f"Unknown faiss backend '{self.backend}'.")
+
+        self.index.add(embeddings)
+        return self
+
+    def _search_parameters(self, k, active_rows):
+        selector = None
+        if active_rows is not None:
+            self._selector_ids = np.ascontiguousarray(active_rows, dtype=np.int64)
+            selector = faiss.IDSelectorBatch(self._selector_ids)
+
+        if self.backend == 'faiss-ivf':
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.params.get('nprobe', 8))
+        if self.backend == 'faiss-hnsw':
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=max(self.params.get('ef_search', 128), k))
+        return None if selector is None else faiss.SearchParameters(sel=selector)
+
+    def search(self, queries, k, active_rows=None):
+        queries = normalize(queries)
+        k = min(k, self.num_vectors if active_rows is None else len(active_rows))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        params = self._search_parameters(k, active_rows)
+        if params is None:
+            return self.index.search(queries, k)
+        return self.index.search(queries, k, params=params)
+
+    def _save(self, directory):
+        faiss.write_index(self.index, os.path.join(directory, 'index.faiss'))
+
+    def _load(self, directory):
+        self.index = faiss.read_index(os.path.join(directory, 'index.faiss'))
+
+def make_vector_index(backend='numpy', **params):
+    """
+    Creates an (empty) vector index.
+
+    Args:
+        backend (str): 'numpy' (exact, pure NumPy), 'faiss-flat' (exact), 'faiss-ivf' or 'faiss-hnsw' (approximate).
+        **params: Backend knobs (see `FaissIndex`).
+    """
+    if backend == 'numpy':
+        return NumpyFlatIndex(**params)
+    if backend in ('faiss-flat', 'faiss-ivf', 'faiss-hnsw'):
+        return FaissIndex(backend, **params)
+    raise ValueError(f"Unknown vector index backend '{backend}'.")
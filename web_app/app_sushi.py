@@ -234,7 +234,7 @@ def run_sushi_visualization_ui():
                         with sub_t2:
                             st.markdown(f"**Title:** {u2.get_smart_title(meta, selected_doc_id)}")
                             if "summary" in meta: st.info(f"**Summary:** {meta['summary']}")
-                            st.json(meta)
+                            st.json(dict(meta))
                             if "ocr" in meta and meta["ocr"]:
                                 with st.expander("Show OCR Text"): st.text(meta["ocr"][0])
 
@@ -243,7 +243,7 @@ def run_sushi_visualization_ui():
                                 st.markdown(f"**Document Sushi Folder Metadata:**")
                                 f_meta = folders_meta.get(sushi_folder_id, {})
                                 if f_meta:
-                                    st.json(f_meta)
+                                    st.json(dict(f_meta))
                                 else: st.warning("No metadata found.")
 
         with tab_folders:
@@ -260,7 +260,7 @@ def run_sushi_visualization_ui():
                     if selected_folder_id:
                         f_meta = folders_meta.get(selected_folder_id, {})
                         if f_meta:
-                            st.json(f_meta)
+                            st.json(dict(f_meta))
                         else: st.warning("No metadata found.")
 
         with tab_boxes:
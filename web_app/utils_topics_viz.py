@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import base64
 import streamlit as st
@@ -15,19 +16,20 @@ PATH_QRELS_DOCS = os.path.join(PROJECT_ROOT, 'qrels', 'formal-document-qrel.txt'
 PATH_QRELS_FOLDERS = os.path.join(PROJECT_ROOT, 'qrels', 'formal-folder-qrel.txt')
 PATH_QRELS_BOXES = os.path.join(PROJECT_ROOT, 'qrels', 'formal-box-qrel.txt')
 
-@st.cache_data
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+from metadata_store import MetadataStore
+
+@st.cache_resource
 def load_metadata():
-    """Load folders and items metadata JSON files."""
+    """Open the folders and items metadata as memory-mapped stores (shared by all sessions, not copied per rerun)."""
     folders_data, items_data = {}, {}
     try:
-        with open(PATH_FOLDERS_JSON, 'r', encoding='utf-8') as f:
-            folders_data = json.load(f)
+        folders_data = MetadataStore.open(PATH_FOLDERS_JSON)
     except FileNotFoundError:
         print('folders_data file not found')
         pass
     try:
-        with open(PATH_ITEMS_JSON, 'r', encoding='utf-8') as f:
-            items_data = json.load(f)
+        items_data = MetadataStore.open(PATH_ITEMS_JSON)
     except FileNotFoundError:
         print('items_data file not found')
         pass